@@ -0,0 +1,749 @@
+'''
+Title: HIFLD Benchmark
+Authors: Caitlin Hartig, Justine Jedlicka
+Date: October 2026
+
+This script benchmarks the pure-Python functions in HIFLD_Engine.py on synthetic data, so that changes to the HIFLD toolbox can be measured on any machine without an ArcGIS license or a copy of the HERE Full Transportation Dataset.
+Each benchmark prints a table with one line per data size. The time per row should stay roughly flat as the size grows if a function scales linearly.
+The parallel benchmark (benchmark_parallel) runs the same stages on spatial tiles in a pool of worker processes and prints the speedup for each number of workers.
+The stage benchmark (benchmark_stages) generates a full synthetic HERE dataset at each size (see HIFLD_Synthetic.py), runs the pure-Python versions of the four HIFLD stages on it, and prints the time of every step at every size.
+
+Libraries Utilized: datetime, math, os, random, shutil, time, tracemalloc, numpy, HIFLD_Chunked, HIFLD_Engine, HIFLD_Synthetic, HIFLD_Thin, Toolbox_Instrumentation
+'''
+
+import datetime, math, os, random, shutil, time, tracemalloc
+import HIFLD_Engine, HIFLD_Synthetic, Toolbox_Instrumentation
+
+# '''
+#     Purpose - Function legacy_delete(rows, lst_del) is a copy of the original overlap deletion loop from create_initial_roads, which checks every row against a Python list. It is only used as the baseline for benchmark_oid_deletion(sizes, fraction, legacy_limit).
+#     Inputs - rows: A list of rows whose first value is the OBJECTID Ex) [(1,), (2,), (3,)].
+#              lst_del: A list of OBJECTIDs to delete Ex) [2].
+#     Outputs - rows_deleted: The number of rows deleted.
+# '''
+def legacy_delete(rows, lst_del):
+    rows_deleted = 0
+
+    for row in rows:
+        if row[0] in lst_del:
+            rows_deleted += 1
+
+    return rows_deleted
+
+# '''
+#     Purpose - Function benchmark_oid_deletion(sizes, fraction, legacy_limit) times the overlap deletion engine (HIFLD_Engine.oid_where_clauses and HIFLD_Engine.sweep_delete) on synthetic OBJECTID sets of increasing size, and prints a scaling table.
+#               The original list-based loop is also timed for sizes up to legacy_limit, since it grows with the square of the number of rows and would take hours on the larger sizes.
+#     Inputs - sizes: A list of table sizes (number of rows) to benchmark Ex) [10000, 100000, 1000000].
+#              fraction: The fraction of rows to delete Ex) 0.2.
+#              legacy_limit: The largest table size for which the original list-based loop is also timed Ex) 20000.
+#     Outputs - lst_results: A list of dictionaries, one per size, holding the timings in seconds.
+# '''
+def benchmark_oid_deletion(sizes, fraction=0.2, legacy_limit=20000):
+    lst_results = []
+    rng = random.Random(0) # Fixed seed so that every run deletes the same OBJECTIDs
+
+    print('{0:>12} {1:>12} {2:>12} {3:>12} {4:>14} {5:>12}'.format('rows', 'deleted', 'clauses (s)', 'sweep (s)', 'ns per row', 'legacy (s)'))
+
+    for size in sizes:
+        rows = [(oid,) for oid in range(1, size + 1)]
+        lst_del = rng.sample(range(1, size + 1), int(size * fraction))
+
+        start = time.perf_counter()
+        lst_clauses = HIFLD_Engine.oid_where_clauses('OBJECTID', lst_del)
+        time_clauses = time.perf_counter() - start
+
+        start = time.perf_counter()
+        rows_kept, rows_scanned, rows_deleted = HIFLD_Engine.sweep_delete(rows, lst_del)
+        time_sweep = time.perf_counter() - start
+
+        time_legacy = None
+        if size <= legacy_limit:
+            start = time.perf_counter()
+            legacy_delete(rows, lst_del)
+            time_legacy = time.perf_counter() - start
+
+        ns_per_row = (time_clauses + time_sweep) / size * 1e9
+        legacy_text = '{0:.3f}'.format(time_legacy) if time_legacy is not None else 'skipped'
+        print('{0:>12} {1:>12} {2:>12.3f} {3:>12.3f} {4:>14.1f} {5:>12}'.format(size, rows_deleted, time_clauses, time_sweep, ns_per_row, legacy_text))
+
+        lst_results.append({'rows': size, 'deleted': rows_deleted, 'clauses': len(lst_clauses), 'time_clauses': time_clauses, 'time_sweep': time_sweep, 'time_legacy': time_legacy})
+
+    print()
+    return lst_results
+
+# '''
+#     Purpose - Function synthetic_roads(size, duplicate_rate, null_rate, seed) creates a list of synthetic (OBJECTID, ROUTE_TYPE, coords) rows, where roughly duplicate_rate of the rows reuse the shape of an earlier row and roughly null_rate of the rows have a NULL route type.
+#     Inputs - size: The number of rows to create Ex) 100000.
+#              duplicate_rate: The fraction of rows that copy the shape of an earlier row Ex) 0.15.
+#              null_rate: The fraction of rows with a NULL route type Ex) 0.3.
+#              seed: The random seed, so that each run creates the same rows Ex) 0.
+#     Outputs - rows: A list of (OBJECTID, ROUTE_TYPE, coords) tuples.
+# '''
+def synthetic_roads(size, duplicate_rate=0.15, null_rate=0.3, seed=0):
+    rng = random.Random(seed)
+    rows = []
+
+    for oid in range(1, size + 1):
+        if len(rows) != 0 and rng.random() < duplicate_rate:
+            coords = rows[rng.randrange(len(rows))][2] # Reuse the shape of an earlier road
+        else:
+            x = rng.uniform(-125.0, -67.0)
+            y = rng.uniform(25.0, 49.0)
+            coords = [(x + 0.001 * step, y + 0.001 * rng.random()) for step in range(rng.randint(2, 6))]
+
+        route_type = None if rng.random() < null_rate else rng.randint(1, 4)
+        rows.append((oid, route_type, coords))
+
+    return rows
+
+# '''
+#     Purpose - Function legacy_duplicate_shapes(rows) reproduces the original FindIdentical / Sort / SearchCursor grouping from create_initial_roads in memory, so that its result can be compared against HIFLD_Engine.resolve_duplicate_shapes(rows, xy_tolerance).
+#     Inputs - rows: A list of (OBJECTID, ROUTE_TYPE, coords) tuples.
+#     Outputs - set_del: A set of the OBJECTIDs to delete.
+# '''
+def legacy_duplicate_shapes(rows):
+    dict_feat_seq = {} # Stand-in for the FEAT_SEQ field written by FindIdentical
+    for oid, route_type, coords in rows:
+        dict_feat_seq.setdefault(tuple(coords), len(dict_feat_seq))
+
+    dict_roads = {}
+    for oid, route_type, coords in rows:
+        if route_type is not None:
+            dict_roads.setdefault(dict_feat_seq[tuple(coords)], []).append((route_type, oid))
+
+    set_del = set()
+    for lst_tuple in dict_roads.values():
+        lst_tuple.sort()
+        for item in lst_tuple[1:]:
+            set_del.add(item[1])
+
+    return set_del
+
+# '''
+#     Purpose - Function benchmark_duplicate_shapes(sizes) times HIFLD_Engine.resolve_duplicate_shapes(rows, xy_tolerance) on synthetic roads, checks that it deletes the same records as the original grouping logic, and prints a scaling table.
+#     Inputs - sizes: A list of table sizes (number of rows) to benchmark Ex) [10000, 100000].
+#     Outputs - lst_results: A list of dictionaries, one per size, holding the timings in seconds.
+# '''
+def benchmark_duplicate_shapes(sizes):
+    lst_results = []
+
+    print('{0:>12} {1:>12} {2:>12} {3:>14} {4:>8}'.format('rows', 'deleted', 'engine (s)', 'ns per row', 'parity'))
+
+    for size in sizes:
+        rows = synthetic_roads(size)
+
+        start = time.perf_counter()
+        set_del, count_shapes = HIFLD_Engine.resolve_duplicate_shapes(rows)
+        time_engine = time.perf_counter() - start
+
+        parity = set_del == legacy_duplicate_shapes(rows)
+        print('{0:>12} {1:>12} {2:>12.3f} {3:>14.1f} {4:>8}'.format(size, len(set_del), time_engine, time_engine / size * 1e9, str(parity)))
+
+        lst_results.append({'rows': size, 'deleted': len(set_del), 'time_engine': time_engine, 'parity': parity})
+
+    print()
+    return lst_results
+
+# '''
+#     Purpose - Function benchmark_enrichment(sizes) times the in-memory attribute join (HIFLD_Engine.build_lookup and HIFLD_Engine.enrich_row) on synthetic Link, LinkAttribute, and Status lookups, and prints a scaling table.
+#     Inputs - sizes: A list of road counts to benchmark Ex) [10000, 100000].
+#     Outputs - lst_results: A list of dictionaries, one per size, holding the timings in seconds.
+# '''
+def benchmark_enrichment(sizes):
+    lst_results = []
+    rng = random.Random(0)
+    lst_status_ids = [2, 33, 37, 41]
+
+    print('{0:>12} {1:>14} {2:>12} {3:>14}'.format('rows', 'lookups (s)', 'apply (s)', 'ns per row'))
+
+    for size in sizes:
+        link_rows = [(link_id, rng.choice([4, 32, 34, 290]), rng.choice(lst_status_ids), rng.choice(['Y', 'N'])) for link_id in range(size)]
+        link_attribute_rows = [(link_id, rng.choice([None, 9, 12])) for link_id in range(0, size, 2)]
+        status_rows = [(status_id, rng.choice(['Y', 'N'])) for status_id in lst_status_ids]
+        road_link_ids = [rng.randrange(size) for index in range(size)]
+
+        start = time.perf_counter()
+        dict_link = HIFLD_Engine.build_lookup(link_rows)
+        dict_link_attribute = HIFLD_Engine.build_lookup(link_attribute_rows)
+        dict_status = HIFLD_Engine.build_lookup(status_rows)
+        time_lookups = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for link_id in road_link_ids:
+            HIFLD_Engine.enrich_row(link_id, dict_link, dict_link_attribute, dict_status)
+        time_apply = time.perf_counter() - start
+
+        print('{0:>12} {1:>14.3f} {2:>12.3f} {3:>14.1f}'.format(size, time_lookups, time_apply, (time_lookups + time_apply) / size * 1e9))
+        lst_results.append({'rows': size, 'time_lookups': time_lookups, 'time_apply': time_apply})
+
+    print()
+    return lst_results
+
+# '''
+#     Purpose - Function synthetic_heirarchy_table(size, seed) creates a list of synthetic (Link_ID, ROUTE_TYPE, FuncClass, Paved, URBAN) rows with NULLs and with some Link_IDs shared by more than one road, for checking the Hierarchy classifier.
+#     Inputs - size: The number of rows to create Ex) 100000.
+#              seed: The random seed, so that each run creates the same rows Ex) 0.
+#     Outputs - rows: A list of (Link_ID, ROUTE_TYPE, FuncClass, Paved, URBAN) tuples.
+# '''
+def synthetic_heirarchy_table(size, seed=0):
+    rng = random.Random(seed)
+    rows = []
+
+    for index in range(size):
+        link_id = None if rng.random() < 0.01 else rng.randrange(int(size * 0.8) + 1) # Roughly 20% of the roads share a Link_ID with another road
+        route_type = rng.choice([None, None, 1, 2, 3, 4, 5])
+        func_class = rng.choice([None, 1, 2, 3, 4, 5, 5, 5])
+        paved = rng.choice([None, 'Y', 'Y', 'N'])
+        urban = rng.choice([None, 'Y', 'N'])
+        rows.append((link_id, route_type, func_class, paved, urban))
+
+    return rows
+
+# '''
+#     Purpose - Function legacy_heirarchy(rows) reproduces the original Step 6 of add_attributes in memory: for each query in reverse order, it selects the matching roads and then assigns the query number to every road sharing a Link_ID with a selected road.
+#     Inputs - rows: A list of (Link_ID, ROUTE_TYPE, FuncClass, Paved, URBAN) tuples.
+#     Outputs - lst_heirarchy: A list holding the Hierarchy value (or None) for each row.
+# '''
+def legacy_heirarchy(rows):
+    lst_queries = [
+        lambda rt, fc, pv, ur: ((rt in (1, 2, 3, 4) and fc in (1, 2, 3, 4, 5)) or fc in (1, 2, 3, 4)) and pv == 'Y',
+        lambda rt, fc, pv, ur: ((rt in (1, 2, 3, 4) and fc in (1, 2, 3, 4, 5)) or fc in (1, 2, 3, 4)) and pv == 'N',
+        lambda rt, fc, pv, ur: fc in (5,) and pv == 'Y' and ur == 'N',
+        lambda rt, fc, pv, ur: fc in (5,) and pv == 'N' and ur == 'N',
+        lambda rt, fc, pv, ur: fc in (5,) and pv == 'Y' and ur == 'Y',
+        lambda rt, fc, pv, ur: fc in (5,) and pv == 'N' and ur == 'Y']
+
+    lst_heirarchy = [None] * len(rows)
+
+    for i in range(len(lst_queries), 0, -1):
+        query = lst_queries[i - 1]
+        set_selected = {row[0] for row in rows if query(*row[1:]) and row[0] is not None} # Link_IDs of the selected roads (stand-in for hifld_query0..5)
+        for index, row in enumerate(rows): # Stand-in for the KEEP_COMMON join on Link_ID and CalculateField
+            if row[0] in set_selected:
+                lst_heirarchy[index] = i - 1
+
+    return lst_heirarchy
+
+# '''
+#     Purpose - Function benchmark_heirarchy(sizes) checks that the one-pass Hierarchy classifier (HIFLD_Engine.heirarchy_by_link, and HIFLD_Engine.classify_heirarchy_arrays if NumPy is installed) gives the same result as the original reverse-order assignment on a synthetic table, and prints a timing comparison.
+#     Inputs - sizes: A list of table sizes (number of rows) to benchmark Ex) [10000, 100000].
+#     Outputs - lst_results: A list of dictionaries, one per size, holding the timings in seconds and the parity results.
+# '''
+def benchmark_heirarchy(sizes):
+    lst_results = []
+
+    try:
+        import numpy as np
+    except ImportError:
+        np = None
+        print('NumPy is not installed; skipping classify_heirarchy_arrays.')
+
+    print('{0:>12} {1:>12} {2:>12} {3:>12} {4:>8} {5:>8}'.format('rows', 'legacy (s)', 'engine (s)', 'numpy (s)', 'parity', 'np parity'))
+
+    for size in sizes:
+        rows = synthetic_heirarchy_table(size)
+
+        start = time.perf_counter()
+        lst_legacy = legacy_heirarchy(rows)
+        time_legacy = time.perf_counter() - start
+
+        start = time.perf_counter()
+        dict_heirarchy = HIFLD_Engine.heirarchy_by_link(rows)
+        lst_engine = [dict_heirarchy.get(row[0]) for row in rows]
+        time_engine = time.perf_counter() - start
+
+        parity = lst_engine == lst_legacy
+        time_numpy = None
+        np_parity = None
+
+        if np is not None:
+            NULL = -1
+            link_id = np.array([NULL if row[0] is None else row[0] for row in rows])
+            route_type = np.array([NULL if row[1] is None else row[1] for row in rows])
+            func_class = np.array([NULL if row[2] is None else row[2] for row in rows])
+            paved = np.array(['' if row[3] is None else row[3] for row in rows])
+            urban = np.array(['' if row[4] is None else row[4] for row in rows])
+
+            start = time.perf_counter()
+            heirarchy = HIFLD_Engine.classify_heirarchy_arrays(route_type, func_class, paved, urban, link_id, NULL)
+            time_numpy = time.perf_counter() - start
+
+            np_parity = [None if value < 0 else int(value) for value in heirarchy] == lst_legacy
+
+        numpy_text = '{0:.3f}'.format(time_numpy) if time_numpy is not None else 'skipped'
+        print('{0:>12} {1:>12.3f} {2:>12.3f} {3:>12} {4:>8} {5:>8}'.format(size, time_legacy, time_engine, numpy_text, str(parity), str(np_parity)))
+        lst_results.append({'rows': size, 'time_legacy': time_legacy, 'time_engine': time_engine, 'time_numpy': time_numpy, 'parity': parity, 'np_parity': np_parity})
+
+    print()
+    return lst_results
+
+# '''
+#     Purpose - Function brute_force_inside(x, y, lst_rings) tests whether a point is inside a set of rings by checking every edge of every ring (even-odd rule). It is only used to check HIFLD_Engine.PolygonGridIndex.
+# '''
+def brute_force_inside(x, y, lst_rings):
+    inside = False
+
+    for ring in lst_rings:
+        for index in range(len(ring)):
+            x1, y1 = ring[index - 1]
+            x2, y2 = ring[index]
+            if (y1 > y) != (y2 > y) and x < x1 + (y - y1) * (x2 - x1) / (y2 - y1):
+                inside = not inside
+
+    return inside
+
+# '''
+#     Purpose - Function benchmark_inside_outside(sizes, polygons, vertices, check) times the inside / outside classifier (HIFLD_Engine.PolygonGridIndex and HIFLD_Engine.split_inside_outside) on synthetic roads and polygons and prints a scaling table.
+#               For the first check pieces of each size, the midpoint of the piece is tested against every polygon edge to make sure the piece was marked correctly.
+#     Inputs - sizes: A list of road counts to benchmark Ex) [10000, 100000].
+#              polygons: The number of synthetic polygons Ex) 200.
+#              vertices: The number of vertices in each polygon Ex) 500.
+#              check: The number of pieces checked against the brute force test Ex) 200.
+#     Outputs - lst_results: A list of dictionaries, one per size, holding the timings in seconds.
+# '''
+def benchmark_inside_outside(sizes, polygons=200, vertices=500, check=200):
+    lst_results = []
+    lst_rings = HIFLD_Synthetic.synthetic_polygons(polygons, vertices)
+
+    start = time.perf_counter()
+    index = HIFLD_Engine.PolygonGridIndex(lst_rings)
+    time_index = time.perf_counter() - start
+    print('Index built over {0} edges in {1:.3f} s.'.format(len(index.edges), time_index))
+
+    print('{0:>12} {1:>12} {2:>12} {3:>12} {4:>14} {5:>10}'.format('rows', 'inside', 'outside', 'split (s)', 'ns per row', 'checked'))
+
+    for size in sizes:
+        rows = synthetic_roads(size, duplicate_rate=0, null_rate=0, seed=1)
+        lst_pieces = []
+
+        start = time.perf_counter()
+        for row in rows:
+            lst_pieces.append(HIFLD_Engine.split_inside_outside(row[2], index))
+        time_split = time.perf_counter() - start
+
+        count_inside = sum(1 for lst_inside, lst_outside in lst_pieces if len(lst_inside) != 0)
+        count_outside = sum(1 for lst_inside, lst_outside in lst_pieces if len(lst_outside) != 0)
+
+        count_checked = 0
+        count_wrong = 0
+        for lst_inside, lst_outside in lst_pieces:
+            for inside, lst_parts in ((True, lst_inside), (False, lst_outside)):
+                for part in lst_parts:
+                    if count_checked < check:
+                        (x1, y1), (x2, y2) = part[0], part[1]
+                        if brute_force_inside((x1 + x2) / 2, (y1 + y2) / 2, lst_rings) != inside:
+                            count_wrong += 1
+                        count_checked += 1
+
+        print('{0:>12} {1:>12} {2:>12} {3:>12.3f} {4:>14.1f} {5:>10}'.format(size, count_inside, count_outside, time_split, time_split / size * 1e9, '{0} ok'.format(count_checked - count_wrong)))
+        lst_results.append({'rows': size, 'inside': count_inside, 'outside': count_outside, 'time_index': time_index, 'time_split': time_split, 'checked': count_checked, 'wrong': count_wrong})
+
+    print()
+    return lst_results
+
+# '''
+#     Purpose - Function benchmark_link_diff(sizes, change_rate) times the change detection of the incremental rebuild (HIFLD_Engine.hash_link_rows, HIFLD_Engine.diff_link_hashes, and HIFLD_Engine.affected_links) on two synthetic releases, where change_rate of the links were edited, added, or removed between them, and prints a scaling table.
+#     Inputs - sizes: A list of link counts to benchmark Ex) [10000, 100000].
+#              change_rate: The fraction of links that change between the two releases Ex) 0.02.
+#     Outputs - lst_results: A list of dictionaries, one per size, holding the timings in seconds.
+# '''
+def benchmark_link_diff(sizes, change_rate=0.02):
+    lst_results = []
+    rng = random.Random(0)
+
+    print('{0:>12} {1:>10} {2:>10} {3:>10} {4:>10} {5:>12} {6:>12} {7:>10}'.format('links', 'added', 'removed', 'changed', 'rebuild', 'hash (s)', 'diff (s)', 'found'))
+
+    for size in sizes:
+        rows = synthetic_roads(size, duplicate_rate=0.05, null_rate=0.85)
+        old_rows = [(oid, (route_type, tuple(coords))) for oid, route_type, coords in rows]
+        new_rows = list(old_rows)
+        set_expected = set()
+
+        for index in rng.sample(range(size), int(size * change_rate)):
+            link_id, values = new_rows[index]
+            set_expected.add(link_id)
+            if index % 3 == 0: # Edited attribute
+                new_rows[index] = (link_id, (5, values[1]))
+            elif index % 3 == 1: # Removed link
+                new_rows[index] = None
+            else: # Replaced by a new link
+                new_rows[index] = (size + index + 1, values)
+                set_expected.add(size + index + 1)
+        new_rows = [row for row in new_rows if row is not None]
+
+        dict_old_shapes = {oid: HIFLD_Engine.shape_key(coords) for oid, route_type, coords in rows}
+        dict_new_shapes = {link_id: HIFLD_Engine.shape_key(values[1]) for link_id, values in new_rows}
+
+        start = time.perf_counter()
+        dict_old = HIFLD_Engine.hash_link_rows(old_rows)
+        dict_new = HIFLD_Engine.hash_link_rows(new_rows)
+        time_hash = time.perf_counter() - start
+
+        start = time.perf_counter()
+        set_added, set_removed, set_changed = HIFLD_Engine.diff_link_hashes(dict_old, dict_new)
+        set_affected = HIFLD_Engine.affected_links(set_added | set_removed | set_changed, dict_old_shapes, dict_new_shapes)
+        time_diff = time.perf_counter() - start
+
+        found = set_expected <= (set_added | set_removed | set_changed)
+        print('{0:>12} {1:>10} {2:>10} {3:>10} {4:>10} {5:>12.3f} {6:>12.3f} {7:>10}'.format(size, len(set_added), len(set_removed), len(set_changed), len(set_affected), time_hash, time_diff, str(found)))
+        lst_results.append({'links': size, 'added': len(set_added), 'removed': len(set_removed), 'changed': len(set_changed), 'affected': len(set_affected), 'time_hash': time_hash, 'time_diff': time_diff, 'found': found})
+
+    print()
+    return lst_results
+
+# '''
+#     Purpose - Function legacy_label_route(name) is a copy of the original character loop of the labels stage of the HIFLD toolbox, which calls int(char) inside a try / except for every character of the BASE_NAME value.
+# '''
+def legacy_label_route(name):
+    str_name = ''
+
+    for char in name:
+        try:
+            int(char)
+            str_name += char
+        except:
+            ALT = '-ALT'
+            if name.endswith(ALT):
+                if char == name[-(len(ALT))]:
+                    str_name += 'A'
+
+    return str_name
+
+# '''
+#     Purpose - Function synthetic_route_names(size, seed) creates a list of BASE_NAME values with the same mix of route numbers, '-ALT' suffixes, street names, and NULLs as the synthetic HERE dataset (see HIFLD_Synthetic.base_name), plus a few unusual names that test the edge cases of the label rules.
+# '''
+def synthetic_route_names(size, seed=0):
+    rng = random.Random(seed)
+    lst_names = ['-ALT', '12-ALT', 'I-90-ALT-ALT', 'US-1 ALT', 'SR-7-alt', '', 'CR-\uff15\uff10', 'SR 12A', '1-2-3']
+
+    while len(lst_names) < size:
+        lst_names.append(HIFLD_Synthetic.base_name(rng, rng.choice([1, 2, 3, 4])))
+
+    return lst_names[:size]
+
+# '''
+#     Purpose - Function benchmark_labels(sizes) checks that the label engine (HIFLD_Engine.label_route and HIFLD_Engine.label_routes) gives the same BASENAME_ID values as the original character loop, and prints a timing comparison of the original loop, the precompiled pattern on every name, and the precompiled pattern memoized per distinct name.
+#     Inputs - sizes: A list of numbers of names to benchmark Ex) [10000, 100000].
+#     Outputs - lst_results: A list of dictionaries, one per size, holding the timings in seconds and the parity result.
+# '''
+def benchmark_labels(sizes):
+    lst_results = []
+
+    print('{0:>12} {1:>12} {2:>12} {3:>12} {4:>10} {5:>8}'.format('names', 'legacy (s)', 'pattern (s)', 'memo (s)', 'distinct', 'parity'))
+
+    for size in sizes:
+        lst_names = synthetic_route_names(size)
+
+        start = time.perf_counter()
+        lst_legacy = [None if name is None else legacy_label_route(name) for name in lst_names]
+        time_legacy = time.perf_counter() - start
+
+        start = time.perf_counter()
+        lst_pattern = [None if name is None else HIFLD_Engine.label_route(name) for name in lst_names]
+        time_pattern = time.perf_counter() - start
+
+        start = time.perf_counter()
+        dict_labels = {}
+        lst_memo = HIFLD_Engine.label_routes(lst_names, dict_labels)
+        time_memo = time.perf_counter() - start
+
+        parity = lst_legacy == lst_pattern == lst_memo
+        print('{0:>12} {1:>12.3f} {2:>12.3f} {3:>12.3f} {4:>10} {5:>8}'.format(size, time_legacy, time_pattern, time_memo, len(dict_labels), str(parity)))
+        lst_results.append({'names': size, 'time_legacy': time_legacy, 'time_pattern': time_pattern, 'time_memo': time_memo, 'distinct': len(dict_labels), 'parity': parity})
+
+    print()
+    return lst_results
+
+# '''
+#     Purpose - Function benchmark_stages(sizes, folder, duplicate_rate, keep) generates a synthetic HERE dataset for each size, runs the pure-Python HIFLD stages on it (HIFLD_Synthetic.run_pipeline), and prints a scaling table with the wall time of every step at every size.
+#               A run report and Chrome trace file are saved for each size in a RunReports folder inside the folder (see Toolbox_Instrumentation).
+#     Inputs - sizes: A list of road counts to benchmark Ex) [10000, 100000, 1000000].
+#              folder: The folder pathway to save the synthetic datasets in Ex) r'C:\Users\caitl\OneDrive\Documents\Tools\Benchmark'.
+#              duplicate_rate: The fraction of roads that copy the shape of a recent road Ex) 0.05.
+#              keep: True to keep the synthetic datasets after the benchmark, False to delete them.
+#     Outputs - lst_results: A list of dictionaries, one per size, holding the generation time and the wall time of each step in seconds.
+# '''
+def benchmark_stages(sizes, folder, duplicate_rate=0.05, keep=False):
+    lst_results = []
+    lst_steps = [] # (depth, name) of each step, in the order they first ran
+
+    if not os.path.exists(folder):
+        os.makedirs(folder)
+
+    for size in sizes:
+        path = os.path.join(folder, 'HERE_synthetic_{0}.sqlite'.format(size))
+
+        start = time.perf_counter()
+        dict_counts = HIFLD_Synthetic.generate_dataset(path, size, duplicate_rate)
+        time_generate = time.perf_counter() - start
+        print('{0} roads generated in {1:.1f} s: {2}'.format(size, time_generate, dict_counts))
+
+        conn = HIFLD_Synthetic.open_dataset(path)
+        recorder = Toolbox_Instrumentation.start_run('HIFLD_Synthetic_{0}'.format(size), lambda text: None, HIFLD_Synthetic.row_counter(conn))
+        try:
+            HIFLD_Synthetic.run_pipeline(conn)
+            report = recorder.report()
+        finally:
+            Toolbox_Instrumentation.finish_run(os.path.join(folder, 'RunReports'))
+            conn.close()
+
+        dict_times = {}
+        for record in report['stages']:
+            step = (record['depth'], record['name'])
+            if step not in lst_steps:
+                lst_steps.append(step)
+            dict_times[step] = dict_times.get(step, 0) + record['wall_seconds']
+
+        lst_results.append({'rows': size, 'time_generate': time_generate, 'counts': dict_counts, 'times': dict_times, 'peak_memory_mb': report['peak_memory_mb']})
+
+        if not keep:
+            os.remove(path)
+
+    print()
+    print('{0:<45}'.format('step (s)') + ''.join('{0:>12}'.format(size) for size in sizes))
+    for step in lst_steps:
+        depth, name = step
+        print('{0:<45}'.format(('  ' * depth + name)[:45]) + ''.join('{0:>12.3f}'.format(result['times'][step]) if step in result['times'] else '{0:>12}'.format('-') for result in lst_results))
+
+    lst_total = [sum(time_step for step, time_step in result['times'].items() if step[0] == 0) for result in lst_results]
+    print('{0:<45}'.format('total') + ''.join('{0:>12.3f}'.format(total) for total in lst_total))
+    print('{0:<45}'.format('us per road') + ''.join('{0:>12.2f}'.format(total / size * 1e6) for total, size in zip(lst_total, sizes)))
+    print('{0:<45}'.format('peak memory (MB)') + ''.join('{0:>12}'.format('{0:.0f}'.format(result['peak_memory_mb']) if result['peak_memory_mb'] is not None else 'n/a') for result in lst_results))
+    print()
+
+    return lst_results
+
+# '''
+#     Purpose - Function benchmark_chunked_dedup(sizes, folder, budget_mb) runs the create_initial_roads stage of HIFLD_Synthetic on the same synthetic dataset twice, once resolving all duplicate shapes at once and once in chunked mode (see HIFLD_Chunked.ShapeStore), checks that both keep the same roads, and prints the time and the peak Python memory (measured with tracemalloc) of each.
+#     Inputs - sizes: A list of numbers of roads to benchmark Ex) [10000, 100000].
+#              folder: The folder to create the synthetic datasets in. They are deleted afterwards.
+#              budget_mb: The memory budget for chunked mode Ex) 64.
+#     Outputs - lst_results: A list of dictionaries, one per size, holding the timings in seconds, the peak memory in megabytes, and the parity result.
+# '''
+def benchmark_chunked_dedup(sizes, folder, budget_mb=64):
+    import HIFLD_Chunked # Imported before tracemalloc starts, so that the import is not counted as part of the chunked run
+    lst_results = []
+
+    if not os.path.exists(folder):
+        os.makedirs(folder)
+
+    print('{0:>12} {1:>14} {2:>14} {3:>14} {4:>14} {5:>8}'.format('rows', 'in-memory (s)', 'chunked (s)', 'in-mem (MB)', 'chunked (MB)', 'parity'))
+
+    for size in sizes:
+        path = os.path.join(folder, 'HERE_synthetic_{0}.sqlite'.format(size))
+        path_chunked = os.path.join(folder, 'HERE_synthetic_{0}_chunked.sqlite'.format(size))
+        HIFLD_Synthetic.generate_dataset(path, size)
+        shutil.copyfile(path, path_chunked)
+
+        lst_kept = []
+        lst_times = []
+        lst_peaks = []
+        for dataset_path, budget in [(path, None), (path_chunked, budget_mb)]:
+            conn = HIFLD_Synthetic.open_dataset(dataset_path)
+
+            tracemalloc.start()
+            start = time.perf_counter()
+            initial_roads = HIFLD_Synthetic.create_initial_roads(conn, budget)
+            lst_times.append(time.perf_counter() - start)
+            lst_peaks.append(tracemalloc.get_traced_memory()[1] / 1048576)
+            tracemalloc.stop()
+
+            lst_kept.append([row[0] for row in conn.execute('SELECT OBJECTID FROM {0} ORDER BY OBJECTID'.format(initial_roads))])
+            conn.close()
+            os.remove(dataset_path)
+
+        parity = lst_kept[0] == lst_kept[1]
+        print('{0:>12} {1:>14.3f} {2:>14.3f} {3:>14.1f} {4:>14.1f} {5:>8}'.format(size, lst_times[0], lst_times[1], lst_peaks[0], lst_peaks[1], str(parity)))
+        lst_results.append({'rows': size, 'time_memory': lst_times[0], 'time_chunked': lst_times[1], 'peak_memory_mb': lst_peaks[0], 'peak_chunked_mb': lst_peaks[1], 'parity': parity})
+
+    print()
+    return lst_results
+
+# '''
+#     Purpose - Function benchmark_parallel(size, folder, lst_workers, tiles_per_worker) generates one synthetic dataset, runs the four HIFLD stages on it in a single process, and then for each number of workers splits it into tiles (HIFLD_Synthetic.split_tiles) and runs the tiles in a pool of worker processes (HIFLD_Synthetic.run_tiles).
+#               It checks that the merged tile outputs hold the same roads as the single run, and prints the split time, the tile time, and the speedup of the tile time over the single run.
+#     Inputs - size: The number of roads Ex) 1000000.
+#              folder: The folder to create the synthetic dataset and the tile files in. They are deleted afterwards.
+#              lst_workers: A list of numbers of workers to benchmark Ex) [1, 2, 4, 8].
+#              tiles_per_worker: The number of tiles per worker Ex) 4.
+#     Outputs - lst_results: A list of dictionaries, one per number of workers, holding the timings in seconds, the speedup, and the parity result.
+# '''
+def benchmark_parallel(size, folder, lst_workers, tiles_per_worker=4):
+    lst_results = []
+    fields = 'Link_ID, ROUTE_TYPE, ADDR_TYPE, L_REFADDR, R_REFADDR, ACCESS_ID, STATUS_ID, POI_ACCESS, EXPANDED_INCLUSION, URBAN, Heirarchy, Minus_ID, BASENAME_ID, Shape'
+
+    if not os.path.exists(folder):
+        os.makedirs(folder)
+
+    path = os.path.join(folder, 'HERE_synthetic_{0}.sqlite'.format(size))
+    path_single = os.path.join(folder, 'HERE_synthetic_{0}_single.sqlite'.format(size))
+    HIFLD_Synthetic.generate_dataset(path, size)
+    shutil.copyfile(path, path_single)
+
+    conn = HIFLD_Synthetic.open_dataset(path_single)
+    start = time.perf_counter()
+    hifld_plus_gtac = HIFLD_Synthetic.run_pipeline(conn, thin=False) # The tiles are not thinned either, since thinning needs the whole network
+    time_single = time.perf_counter() - start
+    lst_single = sorted(conn.execute('SELECT {0} FROM {1}'.format(fields, hifld_plus_gtac)), key=repr)
+    conn.close()
+    os.remove(path_single)
+
+    print('{0} roads, single process: {1:.3f} s'.format(size, time_single))
+    print('{0:>8} {1:>8} {2:>10} {3:>10} {4:>10} {5:>8}'.format('workers', 'tiles', 'split (s)', 'tiles (s)', 'speedup', 'parity'))
+
+    for workers in lst_workers:
+        tile_folder = os.path.join(folder, 'Tiles_{0}'.format(workers))
+
+        start = time.perf_counter()
+        lst_tiles = HIFLD_Synthetic.split_tiles(path, tile_folder, workers * tiles_per_worker)
+        time_split = time.perf_counter() - start
+
+        start = time.perf_counter()
+        HIFLD_Synthetic.run_tiles(lst_tiles, workers)
+        time_tiles = time.perf_counter() - start
+
+        lst_merged = []
+        for count, tile_path in lst_tiles:
+            conn = HIFLD_Synthetic.open_dataset(tile_path)
+            lst_merged.extend(conn.execute('SELECT {0} FROM hifld_plus_gtac'.format(fields)))
+            conn.close()
+        parity = sorted(lst_merged, key=repr) == lst_single
+        shutil.rmtree(tile_folder)
+
+        print('{0:>8} {1:>8} {2:>10.3f} {3:>10.3f} {4:>10.2f} {5:>8}'.format(workers, len(lst_tiles), time_split, time_tiles, time_single / time_tiles, str(parity)))
+        lst_results.append({'workers': workers, 'tiles': len(lst_tiles), 'time_split': time_split, 'time_tiles': time_tiles, 'speedup': time_single / time_tiles, 'parity': parity})
+
+    os.remove(path)
+    print()
+    return lst_results
+
+# '''
+#     Purpose - Function synthetic_network(size, spacing, seed) builds a synthetic road network with about size roads, for benchmark_thinning(sizes, lst_min_lengths). The roads follow a jittered grid with some blocks missing: every tenth grid line is a Hierarchy 0 highway, every fifth a Hierarchy 2 road, and the rest are Hierarchy 4 local roads. Each grid edge is drawn as one to three links, and short Hierarchy 5 or NULL dead ends hang off some nodes.
+#     Inputs - size: The rough number of roads Ex) 100000.
+#              spacing: The grid spacing in meters Ex) 800.
+#              seed: The random seed, so that the same network is created each time Ex) 0.
+#     Outputs - A (start_xy, end_xy, lengths, heirarchy) tuple of NumPy arrays, with the coordinates and lengths in meters and -1 for a NULL Hierarchy.
+# '''
+def synthetic_network(size, spacing=800.0, seed=0):
+    import numpy as np
+    rng = random.Random(seed)
+    side = max(2, int(math.sqrt(size / 4.0)))
+    lst_start, lst_end, lst_heirarchy = [], [], []
+
+    dict_nodes = {(column, row): (column * spacing + rng.uniform(-0.2, 0.2) * spacing, row * spacing + rng.uniform(-0.2, 0.2) * spacing) for column in range(side) for row in range(side)}
+
+    def line_heirarchy(index):
+        return 0 if index % 10 == 0 else 2 if index % 5 == 0 else 4
+
+    def add_edge(point_a, point_b, heirarchy):
+        links = rng.randint(1, 3)
+        lst_points = [(point_a[0] + (point_b[0] - point_a[0]) * step / links, point_a[1] + (point_b[1] - point_a[1]) * step / links) for step in range(links + 1)]
+        for index in range(links):
+            lst_start.append(lst_points[index])
+            lst_end.append(lst_points[index + 1])
+            lst_heirarchy.append(heirarchy)
+
+    for column in range(side):
+        for row in range(side):
+            heirarchy_row = line_heirarchy(row)
+            heirarchy_column = line_heirarchy(column)
+            if column + 1 < side and (heirarchy_row < 4 or rng.random() > 0.1):
+                add_edge(dict_nodes[(column, row)], dict_nodes[(column + 1, row)], heirarchy_row)
+            if row + 1 < side and (heirarchy_column < 4 or rng.random() > 0.1):
+                add_edge(dict_nodes[(column, row)], dict_nodes[(column, row + 1)], heirarchy_column)
+            if rng.random() < 0.3:
+                x, y = dict_nodes[(column, row)]
+                angle = rng.uniform(0, 2 * math.pi)
+                length = rng.uniform(100, 1500)
+                lst_start.append((x, y))
+                lst_end.append((x + length * math.cos(angle), y + length * math.sin(angle)))
+                lst_heirarchy.append(5 if rng.random() < 0.8 else -1)
+
+    start_xy = np.array(lst_start)
+    end_xy = np.array(lst_end)
+    return start_xy, end_xy, np.hypot(*(end_xy - start_xy).T), np.array(lst_heirarchy, dtype=np.int64)
+
+# '''
+#     Purpose - Function benchmark_thinning(sizes, lst_min_lengths) builds a synthetic road network for each size (see synthetic_network(size)), loads it into an HIFLD_Thin.RoadGraph, and prints the time to build the graph and to thin it at each minimum length from the same graph.
+#               It also checks that a second run gives the same Generalization values, and that the visible roads are still connected wherever the full network was (the same number of components among the nodes the visible roads touch).
+#     Inputs - sizes: A list of numbers of roads to benchmark Ex) [10000, 100000, 1000000].
+#              lst_min_lengths: A list of minimum lengths in meters, or None for [1000, 2000, 3000, 5000].
+#     Outputs - lst_results: A list of dictionaries, one per size, holding the timings in seconds, the share of roads hidden at each minimum length, and the checks.
+# '''
+def benchmark_thinning(sizes, lst_min_lengths=None):
+    import numpy as np
+    import HIFLD_Thin
+    lst_results = []
+
+    if lst_min_lengths is None:
+        lst_min_lengths = [1000, 2000, 3000, 5000]
+
+    print('{0:>10} {1:>10} {2:>10} {3:>10}'.format('rows', 'strokes', 'build (s)', 'sweep (s)') + ''.join('{0:>14}'.format('hidden@{0}'.format(min_length)) for min_length in lst_min_lengths) + '{0:>14} {1:>10}'.format('deterministic', 'connected'))
+
+    for size in sizes:
+        start_xy, end_xy, lengths, heirarchy = synthetic_network(size)
+
+        start = time.perf_counter()
+        graph = HIFLD_Thin.RoadGraph(start_xy, end_xy, lengths, heirarchy, xy_tolerance=0.01)
+        time_build = time.perf_counter() - start
+
+        start = time.perf_counter()
+        dict_generalization = graph.sweep(lst_min_lengths)
+        time_sweep = time.perf_counter() - start
+
+        deterministic = all(np.array_equal(graph.thin(min_length), generalization) for min_length, generalization in dict_generalization.items())
+
+        connected = True
+        for generalization in dict_generalization.values():
+            visible = generalization == 0
+            labels_all = HIFLD_Thin.connected_components(graph.nodes, graph.road_start, graph.road_end)
+            labels_visible = HIFLD_Thin.connected_components(graph.nodes, graph.road_start[visible], graph.road_end[visible])
+            nodes_visible = np.unique(np.concatenate([graph.road_start[visible], graph.road_end[visible]]))
+            connected = connected and len(np.unique(labels_all[nodes_visible])) == len(np.unique(labels_visible[nodes_visible]))
+
+        dict_hidden = {min_length: float(generalization.mean()) for min_length, generalization in dict_generalization.items()}
+        print('{0:>10} {1:>10} {2:>10.3f} {3:>10.3f}'.format(len(lengths), graph.strokes, time_build, time_sweep) + ''.join('{0:>14.1%}'.format(dict_hidden[min_length]) for min_length in lst_min_lengths) + '{0:>14} {1:>10}'.format(str(deterministic), str(connected)))
+        lst_results.append({'rows': len(lengths), 'strokes': graph.strokes, 'time_build': time_build, 'time_sweep': time_sweep, 'hidden': dict_hidden, 'deterministic': deterministic, 'connected': connected})
+
+    print()
+    return lst_results
+
+if __name__ == '__main__':
+    print("Job starting!", datetime.datetime.now(), "\n")
+
+    sizes = [10000, 100000, 1000000] # Update me! Number of rows in each synthetic table
+
+    print('Overlap deletion (create_initial_roads):')
+    benchmark_oid_deletion(sizes)
+
+    print('Duplicate shape resolver (create_initial_roads):')
+    benchmark_duplicate_shapes(sizes)
+
+    print('Attribute enrichment (add_attributes):')
+    benchmark_enrichment(sizes)
+
+    print('Hierarchy classifier (add_attributes):')
+    benchmark_heirarchy(sizes)
+
+    print('Inside / outside classifier (mark_inside_outside):')
+    benchmark_inside_outside(sizes)
+
+    print('BASENAME_ID labels (labels):')
+    benchmark_labels(sizes)
+
+    print('Link change detection (incremental rebuild):')
+    benchmark_link_diff(sizes)
+
+    print('Road thinning (Generalization):')
+    benchmark_thinning(sizes)
+
+    print('HIFLD stages on a synthetic HERE dataset:')
+    folder = r'C:\Users\caitl\OneDrive\Documents\Tools\Benchmark' # Update me! Folder for the synthetic datasets
+    benchmark_stages(sizes, folder)
+
+    print('Chunked duplicate shape resolver (create_initial_roads):')
+    benchmark_chunked_dedup(sizes, folder)
+
+    print('Tile-parallel HIFLD stages (parallel mode):')
+    benchmark_parallel(sizes[-1], folder, [1, 2, 4, 8]) # Update me! Numbers of worker processes
+
+    print("Job ending!", datetime.datetime.now(), "\n")
@@ -0,0 +1,426 @@
+'''
+Title: HIFLD Cache
+Authors: Caitlin Hartig, Justine Jedlicka
+Date: October 2026
+
+This module stages the columns of the HERE input tables that the HIFLD toolbox (HIFLD.pyt) needs into a folder of NumPy column files, so that later stages can read them with np.memmap instead of opening a new cursor on the file geodatabase each time.
+Each column is saved as its own file:
+    - Integer columns are saved as int64 values, with NULL saved as -1 (NULL_INT).
+    - One-character text columns (such as Paved, POI_ACCESS, and URBAN) are saved as '<U1' values, with NULL saved as '' (NULL_FLAG).
+    - Other text columns (such as BASE_NAME) are saved as one UTF-8 buffer plus an int64 offset file and a NULL mask.
+    - Geometry is saved as one flat float64 buffer of x, y values, plus offsets into it for each part and for each row.
+A manifest.json file in the cache folder records, for each table, the fingerprint of the source it was staged from (see fingerprint(dataset, content) in HIFLD.pyt), which includes a hash of its rows. The cache for a table is reused until the fingerprint of its source changes.
+This module does not require arcpy. The HIFLD toolbox reads the source tables with arcpy cursors and hands the rows to write_table(cache_folder, table, rows, lst_columns, geometry, dict_fingerprint).
+
+Libraries Utilized: datetime, json, os, numpy, HIFLD_Engine
+'''
+
+import datetime, json, os
+import numpy as np
+
+NULL_INT = -1 # The value saved for NULL in integer columns, which matches the NULL value expected by HIFLD_Engine.classify_heirarchy_arrays
+NULL_FLAG = '' # The value saved for NULL in one-character text columns
+
+# The columns staged from each HERE input table: (field name, kind), where kind is 'int', 'flag' (one-character text), or 'text'
+STREETS_COLUMNS = [('Link_ID', 'int'), ('ROUTE_TYPE', 'int'), ('FuncClass', 'int'), ('Paved', 'flag'), ('BASE_NAME', 'text')]
+LINK_COLUMNS = [('LINK_ID', 'int'), ('ACCESS_ID', 'int'), ('STATUS_ID', 'int'), ('POI_ACCESS', 'flag')]
+LINK_ATTRIBUTE_COLUMNS = [('LINK_ID', 'int'), ('EXPANDED_INCLUSION', 'int')]
+STATUS_COLUMNS = [('STATUS_ID', 'int'), ('URBAN', 'flag')]
+
+# '''
+#     Purpose - Function load_manifest(cache_folder) reads the manifest of a cache folder. If it does not exist or cannot be read, an empty manifest is returned.
+#     Inputs - cache_folder: The folder pathway to the cache Ex) r'C:\Users\caitl\OneDrive\Documents\Tools\HIFLD_Cache_Master_GDB'.
+#     Outputs - manifest: A dictionary Ex) {'tables': {'Streets': {...}}}.
+# '''
+def load_manifest(cache_folder):
+    try:
+        with open(os.path.join(cache_folder, 'manifest.json'), 'r') as infile:
+            manifest = json.load(infile)
+    except (OSError, ValueError):
+        manifest = {}
+
+    manifest.setdefault('tables', {})
+    return manifest
+
+def _save_manifest(cache_folder, manifest):
+    manifest_path = os.path.join(cache_folder, 'manifest.json')
+    temp_path = manifest_path + '.tmp'
+
+    with open(temp_path, 'w') as outfile:
+        json.dump(manifest, outfile, indent=2)
+
+    os.replace(temp_path, manifest_path)
+
+# '''
+#     Purpose - Function is_current(cache_folder, table, dict_fingerprint) returns True if the cache holds a complete copy of a table that was staged from a source with the same fingerprint, meaning that it does not need to be staged again.
+#     Inputs - cache_folder: The folder pathway to the cache.
+#              table: The name of the table Ex) 'Streets'.
+#              dict_fingerprint: The current fingerprint of the source Ex) {'rows': 1000, 'schema': '...', 'extent': '...', 'content': '...', 'mtime': None}.
+#     Outputs - True if the cache is current, otherwise False.
+# '''
+def is_current(cache_folder, table, dict_fingerprint):
+    entry = load_manifest(cache_folder)['tables'].get(table)
+
+    if entry is None or entry.get('fingerprint') != dict_fingerprint:
+        return False
+
+    return all(os.path.exists(os.path.join(cache_folder, file_name)) for file_name in entry['files'])
+
+def _append(outfile, values, dtype):
+    np.asarray(values, dtype=dtype).tofile(outfile)
+
+# '''
+#     Purpose - Function write_table(cache_folder, table, rows, lst_columns, geometry, dict_fingerprint, batch_size) stages the rows of a table into column files and records the table in the manifest. The rows are written in batches, so the whole table is never held in memory.
+#     Inputs - cache_folder: The folder pathway to the cache. It is created if it does not exist.
+#              table: The name of the table Ex) 'Streets'.
+#              rows: Any iterable of rows. Each row is a tuple of values in the order of lst_columns, or, if geometry is True, a (values, coords) tuple where coords is a vertex list as returned by geometry_coords(shape) in HIFLD.pyt Ex) [((101, 1, 3, 'Y', 'I-90'), [(-105.1, 40.2), (-105.2, 40.3)])].
+#              lst_columns: A list of (field name, kind) tuples Ex) STREETS_COLUMNS.
+#              geometry: True to stage the geometry of each row as well.
+#              dict_fingerprint: The fingerprint of the source, saved in the manifest.
+#              batch_size: The number of rows written at a time Ex) 100000.
+#     Outputs - count: The number of rows staged.
+# '''
+def write_table(cache_folder, table, rows, lst_columns, geometry=False, dict_fingerprint=None, batch_size=100000):
+    if not os.path.exists(cache_folder):
+        os.makedirs(cache_folder)
+
+    # The table is removed from the manifest first, so that a crash part way through never leaves a half-written table marked as current
+    manifest = load_manifest(cache_folder)
+    manifest['tables'].pop(table, None)
+    _save_manifest(cache_folder, manifest)
+
+    dict_files = {} # Open file objects, keyed on file name
+    def open_file(file_name):
+        dict_files[file_name] = open(os.path.join(cache_folder, file_name), 'wb')
+        return dict_files[file_name]
+
+    for name, kind in lst_columns:
+        if kind == 'text':
+            open_file('{0}.{1}.bytes'.format(table, name))
+            open_file('{0}.{1}.offsets'.format(table, name)).write(np.zeros(1, dtype=np.int64).tobytes())
+            open_file('{0}.{1}.null'.format(table, name))
+        else:
+            open_file('{0}.{1}.col'.format(table, name))
+
+    if geometry:
+        open_file('{0}.coords'.format(table))
+        open_file('{0}.part_offsets'.format(table)).write(np.zeros(1, dtype=np.int64).tobytes())
+        open_file('{0}.row_offsets'.format(table)).write(np.zeros(1, dtype=np.int64).tobytes())
+
+    dict_text_end = {name: 0 for name, kind in lst_columns if kind == 'text'} # The current length of each text buffer, in bytes
+    vertex_end = 0
+    part_end = 0
+    count = 0
+
+    batch = []
+    def flush(batch):
+        nonlocal vertex_end, part_end
+
+        for index, (name, kind) in enumerate(lst_columns):
+            if geometry:
+                values = [row[0][index] for row in batch]
+            else:
+                values = [row[index] for row in batch]
+
+            if kind == 'int':
+                _append(dict_files['{0}.{1}.col'.format(table, name)], [NULL_INT if value is None else value for value in values], np.int64)
+            elif kind == 'flag':
+                _append(dict_files['{0}.{1}.col'.format(table, name)], [NULL_FLAG if value is None else value[:1] for value in values], '<U1')
+            else:
+                lst_encoded = [b'' if value is None else value.encode('utf-8') for value in values]
+                lst_offsets = []
+                for encoded in lst_encoded:
+                    dict_text_end[name] += len(encoded)
+                    lst_offsets.append(dict_text_end[name])
+                dict_files['{0}.{1}.bytes'.format(table, name)].write(b''.join(lst_encoded))
+                _append(dict_files['{0}.{1}.offsets'.format(table, name)], lst_offsets, np.int64)
+                _append(dict_files['{0}.{1}.null'.format(table, name)], [value is None for value in values], np.bool_)
+
+        if geometry:
+            lst_values = []
+            lst_part_offsets = []
+            lst_row_offsets = []
+            for values, coords in batch:
+                started = False
+                for coord in coords:
+                    if coord is None: # Part separator
+                        if started:
+                            lst_part_offsets.append(vertex_end)
+                            part_end += 1
+                            started = False
+                        continue
+                    lst_values.append(coord[0])
+                    lst_values.append(coord[1])
+                    vertex_end += 1
+                    started = True
+                if started:
+                    lst_part_offsets.append(vertex_end)
+                    part_end += 1
+                lst_row_offsets.append(part_end)
+            _append(dict_files['{0}.coords'.format(table)], lst_values, np.float64)
+            _append(dict_files['{0}.part_offsets'.format(table)], lst_part_offsets, np.int64)
+            _append(dict_files['{0}.row_offsets'.format(table)], lst_row_offsets, np.int64)
+
+    try:
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= batch_size:
+                flush(batch)
+                count += len(batch)
+                batch = []
+        if len(batch) != 0:
+            flush(batch)
+            count += len(batch)
+    finally:
+        for outfile in dict_files.values():
+            outfile.close()
+
+    manifest = load_manifest(cache_folder)
+    manifest['tables'][table] = {'fingerprint': dict_fingerprint, 'count': count, 'columns': [list(column) for column in lst_columns], 'geometry': geometry, 'files': sorted(dict_files), 'staged': datetime.datetime.now().isoformat(timespec='seconds')}
+    _save_manifest(cache_folder, manifest)
+
+    return count
+
+# '''
+#     Purpose - Class TextColumn(cache_folder, table, name, count) reads a variable-length text column. The buffer, offsets, and NULL mask are memory-mapped, so only the values that are used are read from disk.
+# '''
+class TextColumn(object):
+    def __init__(self, cache_folder, table, name, count):
+        self.count = count
+        self.buffer = _memmap(os.path.join(cache_folder, '{0}.{1}.bytes'.format(table, name)), np.uint8)
+        self.offsets = _memmap(os.path.join(cache_folder, '{0}.{1}.offsets'.format(table, name)), np.int64)
+        self.null = _memmap(os.path.join(cache_folder, '{0}.{1}.null'.format(table, name)), np.bool_)
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, index):
+        if self.null[index]:
+            return None
+        return bytes(self.buffer[self.offsets[index]:self.offsets[index + 1]]).decode('utf-8')
+
+    def __iter__(self):
+        for index in range(self.count):
+            yield self[index]
+
+# '''
+#     Purpose - Class GeometryColumn(cache_folder, table) reads the staged geometry of a table. coords(index) returns the vertices of one row in the same form as geometry_coords(shape) in HIFLD.pyt: a list of (x, y) tuples, with the parts separated by None.
+# '''
+class GeometryColumn(object):
+    def __init__(self, cache_folder, table):
+        self.coords_buffer = _memmap(os.path.join(cache_folder, '{0}.coords'.format(table)), np.float64).reshape(-1, 2)
+        self.part_offsets = _memmap(os.path.join(cache_folder, '{0}.part_offsets'.format(table)), np.int64)
+        self.row_offsets = _memmap(os.path.join(cache_folder, '{0}.row_offsets'.format(table)), np.int64)
+
+    def __len__(self):
+        return len(self.row_offsets) - 1
+
+    # Returns the vertices of one part as an (n, 2) array view, without copying
+    def part(self, part_index):
+        return self.coords_buffer[self.part_offsets[part_index]:self.part_offsets[part_index + 1]]
+
+    def coords(self, index):
+        coords = []
+
+        for part_index in range(self.row_offsets[index], self.row_offsets[index + 1]):
+            if len(coords) != 0:
+                coords.append(None)
+            coords.extend(map(tuple, self.part(part_index).tolist()))
+
+        return coords
+
+def _memmap(path, dtype):
+    if os.path.getsize(path) == 0: # np.memmap cannot map an empty file
+        return np.zeros(0, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode='r')
+
+# '''
+#     Purpose - Class CachedTable(cache_folder, table) opens a staged table for reading.
+#               column(name) returns a read-only np.memmap of an integer or one-character text column, text(name) returns a TextColumn, geometry() returns a GeometryColumn, and rows(lst_names) yields plain Python tuples with NULL values turned back into None.
+#     Inputs - cache_folder: The folder pathway to the cache.
+#              table: The name of the table Ex) 'Streets'.
+# '''
+class CachedTable(object):
+    def __init__(self, cache_folder, table):
+        entry = load_manifest(cache_folder)['tables'].get(table)
+        if entry is None:
+            raise KeyError('{0} has not been staged in {1}.'.format(table, cache_folder))
+
+        self.cache_folder = cache_folder
+        self.table = table
+        self.count = entry['count']
+        self.dict_kinds = {name: kind for name, kind in entry['columns']}
+
+    def column(self, name):
+        kind = self.dict_kinds[name]
+        if kind == 'text':
+            return self.text(name)
+        return _memmap(os.path.join(self.cache_folder, '{0}.{1}.col'.format(self.table, name)), np.int64 if kind == 'int' else '<U1')
+
+    def text(self, name):
+        return TextColumn(self.cache_folder, self.table, name, self.count)
+
+    def geometry(self):
+        return GeometryColumn(self.cache_folder, self.table)
+
+    def rows(self, lst_names, batch_size=100000):
+        lst_columns = [self.column(name) for name in lst_names]
+        lst_nulls = [NULL_INT if self.dict_kinds[name] == 'int' else NULL_FLAG for name in lst_names]
+
+        for start in range(0, self.count, batch_size):
+            end = min(self.count, start + batch_size)
+            lst_values = []
+            for column, null, name in zip(lst_columns, lst_nulls, lst_names):
+                if self.dict_kinds[name] == 'text':
+                    values = [column[index] for index in range(start, end)]
+                else:
+                    values = [None if value == null else value for value in column[start:end].tolist()]
+                lst_values.append(values)
+            for row in zip(*lst_values):
+                yield row
+
+# '''
+#     Purpose - Function open_table(cache_folder, table) opens a staged table for reading (see CachedTable).
+# '''
+def open_table(cache_folder, table):
+    return CachedTable(cache_folder, table)
+
+# '''
+#     Purpose - Function join_column(keys, lookup_keys, lookup_values, null) joins a column from a lookup table onto an array of keys, with NumPy instead of a dictionary. Like HIFLD_Engine.build_lookup, the first record of each key in the lookup table is used.
+#     Inputs - keys: The array of keys to look up Ex) the Link_ID column of Streets.
+#              lookup_keys: The key column of the lookup table Ex) the LINK_ID column of Link.
+#              lookup_values: The value column of the lookup table Ex) the STATUS_ID column of Link.
+#              null: The value returned for keys that have no match, or that are NULL Ex) NULL_INT.
+#     Outputs - values: An array holding the joined value for each key.
+# '''
+def join_column(keys, lookup_keys, lookup_values, null):
+    keys = np.asarray(keys)
+    unique_keys, first_index = np.unique(np.asarray(lookup_keys), return_index=True)
+    unique_values = np.asarray(lookup_values)[first_index]
+
+    values = np.full(len(keys), null, dtype=unique_values.dtype)
+    if len(unique_keys) == 0:
+        return values
+
+    position = np.minimum(np.searchsorted(unique_keys, keys), len(unique_keys) - 1)
+    found = (unique_keys[position] == keys) & (keys != NULL_INT)
+    values[found] = unique_values[position[found]]
+
+    return values
+
+# '''
+#     Purpose - Function heirarchy_arrays(cache_folder) works out the Heirarchy value of every road in the staged Streets table with HIFLD_Engine.classify_heirarchy_arrays. URBAN is joined onto the roads through Link (STATUS_ID) and Status, the same as add_attributes does, and every road sharing a Link_ID receives the most important value found for that Link_ID.
+#     Inputs - cache_folder: The folder pathway to the cache, holding the Streets, Link, and Status tables.
+#     Outputs - link_id: The Link_ID column of Streets (NULL_INT for NULL).
+#               heirarchy: An int16 array holding the Heirarchy value of each road, or -1 where the road matches none of the six queries.
+# '''
+def heirarchy_arrays(cache_folder):
+    import HIFLD_Engine
+
+    streets = open_table(cache_folder, 'Streets')
+    link = open_table(cache_folder, 'Link')
+    status = open_table(cache_folder, 'Status')
+
+    link_id = streets.column('Link_ID')
+    status_id = join_column(link_id, link.column('LINK_ID'), link.column('STATUS_ID'), NULL_INT)
+    urban = join_column(status_id, status.column('STATUS_ID'), status.column('URBAN'), NULL_FLAG)
+
+    heirarchy = HIFLD_Engine.classify_heirarchy_arrays(streets.column('ROUTE_TYPE'), streets.column('FuncClass'), streets.column('Paved'), urban, link_id, NULL_INT)
+
+    return link_id, heirarchy
+
+# '''
+#     Purpose - Function heirarchy_by_link(cache_folder) returns the Heirarchy value of every Link_ID (see heirarchy_arrays(cache_folder)) as a dictionary.
+#               Streets holds one record per Link_ID, so this gives the same values as HIFLD_Engine.heirarchy_by_link over the initial_roads layer.
+#     Inputs - cache_folder: The folder pathway to the cache, holding the Streets, Link, and Status tables.
+#     Outputs - dict_heirarchy: A dictionary holding the Heirarchy value of each Link_ID. Link_IDs that match none of the six queries are left out Ex) {101: 0, 102: 4}.
+# '''
+def heirarchy_by_link(cache_folder):
+    link_id, heirarchy = heirarchy_arrays(cache_folder)
+
+    keep = heirarchy >= 0
+    return dict(zip(np.asarray(link_id)[keep].tolist(), heirarchy[keep].tolist()))
+
+# The columns of the link index (see build_link_index(cache_folder)): the values add_attributes writes onto each road, keyed on its Link_ID
+LINK_INDEX_COLUMNS = [('LINK_ID', 'int'), ('ACCESS_ID', 'int'), ('STATUS_ID', 'int'), ('POI_ACCESS', 'flag'), ('EXPANDED_INCLUSION', 'int'), ('URBAN', 'flag'), ('Heirarchy', 'int')]
+
+# '''
+#     Purpose - Function build_link_index(cache_folder) joins the staged Link, LinkAttribute, and Status columns onto every distinct Link_ID of the staged Streets table, works out its Heirarchy value (see heirarchy_arrays(cache_folder)), and saves the result as the 'LinkIndex' table of the cache, sorted by LINK_ID.
+#               Since the index is sorted and memory-mapped, the values of any set of links can be found with a binary search (see link_attributes(cache_folder, link_ids)), and several processes can read it at the same time without each loading their own copy of the lookups.
+#     Inputs - cache_folder: The folder pathway to the cache, holding the Streets, Link, LinkAttribute, and Status tables.
+#     Outputs - count: The number of links in the index.
+# '''
+def build_link_index(cache_folder):
+    link = open_table(cache_folder, 'Link')
+    link_attribute = open_table(cache_folder, 'LinkAttribute')
+    status = open_table(cache_folder, 'Status')
+
+    link_id, heirarchy = heirarchy_arrays(cache_folder)
+    link_id = np.asarray(link_id)
+    keep = link_id != NULL_INT
+    keys, first_index = np.unique(link_id[keep], return_index=True)
+    heirarchy = np.asarray(heirarchy)[keep][first_index] # Every road sharing a Link_ID already has the same value
+
+    status_id = join_column(keys, link.column('LINK_ID'), link.column('STATUS_ID'), NULL_INT)
+    dict_arrays = {
+        'LINK_ID': keys,
+        'ACCESS_ID': join_column(keys, link.column('LINK_ID'), link.column('ACCESS_ID'), NULL_INT),
+        'STATUS_ID': status_id,
+        'POI_ACCESS': join_column(keys, link.column('LINK_ID'), link.column('POI_ACCESS'), NULL_FLAG),
+        'EXPANDED_INCLUSION': join_column(keys, link_attribute.column('LINK_ID'), link_attribute.column('EXPANDED_INCLUSION'), NULL_INT),
+        'URBAN': join_column(status_id, status.column('STATUS_ID'), status.column('URBAN'), NULL_FLAG),
+        'Heirarchy': np.where(heirarchy < 0, NULL_INT, heirarchy)}
+
+    manifest = load_manifest(cache_folder)
+    manifest['tables'].pop('LinkIndex', None)
+    _save_manifest(cache_folder, manifest)
+
+    lst_files = []
+    for name, kind in LINK_INDEX_COLUMNS:
+        file_name = 'LinkIndex.{0}.col'.format(name)
+        np.asarray(dict_arrays[name], dtype=np.int64 if kind == 'int' else '<U1').tofile(os.path.join(cache_folder, file_name))
+        lst_files.append(file_name)
+
+    # The index is current as long as the four tables it was built from are
+    dict_fingerprint = {table: manifest['tables'][table]['fingerprint'] for table in ('Streets', 'Link', 'LinkAttribute', 'Status')}
+    manifest['tables']['LinkIndex'] = {'fingerprint': dict_fingerprint, 'count': len(keys), 'columns': [list(column) for column in LINK_INDEX_COLUMNS], 'geometry': False, 'files': sorted(lst_files), 'staged': datetime.datetime.now().isoformat(timespec='seconds')}
+    _save_manifest(cache_folder, manifest)
+
+    return len(keys)
+
+# '''
+#     Purpose - Function link_index_is_current(cache_folder) returns True if the link index was built from the tables that are staged in the cache now.
+# '''
+def link_index_is_current(cache_folder):
+    manifest = load_manifest(cache_folder)
+    lst_tables = ('Streets', 'Link', 'LinkAttribute', 'Status')
+
+    if any(table not in manifest['tables'] for table in lst_tables):
+        return False
+
+    return is_current(cache_folder, 'LinkIndex', {table: manifest['tables'][table]['fingerprint'] for table in lst_tables})
+
+# '''
+#     Purpose - Function link_attributes(cache_folder, link_ids) looks up the values add_attributes writes onto the roads of a set of links in the link index (see build_link_index(cache_folder)), with a binary search on the memory-mapped LINK_ID column.
+#     Inputs - cache_folder: The folder pathway to the cache.
+#              link_ids: Any iterable or array of Link_IDs Ex) [101, 102].
+#     Outputs - dict_values: A dictionary holding the (ACCESS_ID, STATUS_ID, POI_ACCESS, EXPANDED_INCLUSION, URBAN, Heirarchy) values of each Link_ID found in the index, with NULL values as None Ex) {101: (4, 2, 'N', None, 'N', 3)}.
+# '''
+def link_attributes(cache_folder, link_ids):
+    index = open_table(cache_folder, 'LinkIndex')
+    keys = index.column('LINK_ID')
+
+    link_ids = np.unique(np.asarray(list(link_ids) if not isinstance(link_ids, np.ndarray) else link_ids, dtype=np.int64))
+    if len(keys) == 0 or len(link_ids) == 0:
+        return {}
+
+    position = np.minimum(np.searchsorted(keys, link_ids), len(keys) - 1)
+    found = np.asarray(keys[position]) == link_ids
+    position = position[found]
+
+    lst_values = [link_ids[found].tolist()]
+    for name, kind in LINK_INDEX_COLUMNS[1:]:
+        null = NULL_INT if kind == 'int' else NULL_FLAG
+        lst_values.append([None if value == null else value for value in np.asarray(index.column(name)[position]).tolist()])
+
+    return {row[0]: row[1:] for row in zip(*lst_values)}
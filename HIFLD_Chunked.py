@@ -0,0 +1,217 @@
+'''
+Title: HIFLD Chunked
+Authors: Caitlin Hartig, Justine Jedlicka
+Date: October 2026
+
+This module holds the building blocks of the chunked (out-of-core) mode of the HIFLD toolbox (HIFLD.pyt), for running the national HERE dataset on machines that cannot hold the whole road set in memory as Python rows.
+In chunked mode, the roads are processed one OBJECTID or Link_ID range at a time. Each chunk only keeps compact NumPy arrays (or a dictionary for the Link_IDs of its own range), and the state that crosses chunks is spilled to disk:
+    - The duplicate-shape table of create_initial_roads is kept in a SQLite file (see ShapeStore), which decides which records to delete once every chunk has been added.
+    - The Link, LinkAttribute, and Status lookups and the Heirarchy values of add_attributes are read from the memory-mapped column cache (see HIFLD_Cache), one Link_ID range at a time.
+The chunk size is worked out from a memory budget in megabytes (see rows_per_chunk(budget_mb, bytes_per_row)). The results of each chunk are written straight back into the output layer, so the chunks are merged as they finish.
+This module does not require arcpy.
+
+Libraries Utilized: math, os, sqlite3, numpy, HIFLD_Cache
+'''
+
+import math, os, sqlite3
+import numpy as np
+import HIFLD_Cache
+
+DEDUP_BYTES_PER_ROW = 160 # Estimated memory per road while a chunk of shape keys is being built (OBJECTID, ROUTE_TYPE, 16-byte key, and the Python objects read from the cursor)
+LOOKUP_BYTES_PER_ROW = 400 # Estimated memory per Link_ID for the per-chunk lookup dictionaries of add_attributes
+
+# '''
+#     Purpose - Function rows_per_chunk(budget_mb, bytes_per_row, fraction, minimum) works out how many rows a chunk can hold within a memory budget.
+#               Only part of the budget is given to the chunk (fraction), since arcpy, the SQLite page cache, and the memory-mapped columns need room as well.
+#     Inputs - budget_mb: The memory budget in megabytes Ex) 8192.
+#              bytes_per_row: The estimated memory used per row Ex) DEDUP_BYTES_PER_ROW.
+#              fraction: The part of the budget given to the chunk Ex) 0.5.
+#              minimum: The smallest chunk size, so that a very small budget does not make millions of chunks Ex) 10000.
+#     Outputs - The number of rows per chunk Ex) 26843545.
+# '''
+def rows_per_chunk(budget_mb, bytes_per_row, fraction=0.5, minimum=10000):
+    return max(minimum, int(budget_mb * 1048576 * fraction / bytes_per_row))
+
+# '''
+#     Purpose - Function id_ranges(ids, rows_per_chunk, null, block_rows) splits an integer ID column (such as OBJECTID or Link_ID) into ranges that each hold about rows_per_chunk rows.
+#               The column is read in blocks and counted into a histogram, so it works on a memory-mapped column without loading it all at once. IDs are not assumed to be dense or sorted.
+#     Inputs - ids: An array (or np.memmap) of integer IDs Ex) HIFLD_Cache.open_table(cache_folder, 'Streets').column('Link_ID').
+#              rows_per_chunk: The number of rows wanted per range Ex) 1000000.
+#              null: The value used for NULL, which is left out of every range Ex) HIFLD_Cache.NULL_INT.
+#              block_rows: The number of rows read at a time Ex) 1000000.
+#     Outputs - lst_ranges: A list of (low, high) tuples covering low <= ID < high. The first low and the last high are None, so the ranges together cover every ID Ex) [(None, 5000), (5000, 9100), (9100, None)].
+# '''
+def id_ranges(ids, rows_per_chunk, null=HIFLD_Cache.NULL_INT, block_rows=1000000):
+    count = 0
+    low = None
+    high = None
+
+    for start in range(0, len(ids), block_rows):
+        block = np.asarray(ids[start:start + block_rows])
+        block = block[block != null]
+        if len(block) != 0:
+            count += len(block)
+            low = int(block.min()) if low is None else min(low, int(block.min()))
+            high = int(block.max()) if high is None else max(high, int(block.max()))
+
+    if count <= rows_per_chunk:
+        return [(None, None)]
+
+    # Count the IDs into fine bins, then cut the bins into ranges of about rows_per_chunk rows
+    bins = min(high - low + 1, 64 * int(math.ceil(count / float(rows_per_chunk))))
+    edges = np.unique(np.floor(np.linspace(low, high + 1, bins + 1)).astype(np.int64))
+    histogram = np.zeros(len(edges) - 1, dtype=np.int64)
+
+    for start in range(0, len(ids), block_rows):
+        block = np.asarray(ids[start:start + block_rows])
+        block = block[block != null]
+        histogram += np.bincount(np.searchsorted(edges, block, side='right') - 1, minlength=len(histogram))[:len(histogram)]
+
+    lst_cuts = []
+    running = 0
+    for index, value in enumerate(histogram.tolist()):
+        if running != 0 and running + value > rows_per_chunk:
+            lst_cuts.append(int(edges[index]))
+            running = 0
+        running += value
+
+    lst_bounds = [None] + lst_cuts + [None]
+    return list(zip(lst_bounds[:-1], lst_bounds[1:]))
+
+# '''
+#     Purpose - Function range_clause(field, low, high) builds the where-clause that selects one of the ranges returned by id_ranges(ids, rows_per_chunk).
+#     Inputs - field: The name of the ID field Ex) 'Link_ID'.
+#              low, high: The range Ex) (5000, 9100).
+#     Outputs - The where-clause Ex) 'Link_ID >= 5000 AND Link_ID < 9100'.
+# '''
+def range_clause(field, low, high):
+    lst_clauses = []
+
+    if low is not None:
+        lst_clauses.append('{0} >= {1}'.format(field, low))
+    if high is not None:
+        lst_clauses.append('{0} < {1}'.format(field, high))
+    if len(lst_clauses) == 0:
+        lst_clauses.append('{0} IS NOT NULL'.format(field))
+
+    return ' AND '.join(lst_clauses)
+
+# '''
+#     Purpose - Class ShapeStore(path, cache_mb) is the on-disk version of the duplicate-shape table used by HIFLD_Engine.resolve_duplicate_shapes. It gives the same result (for every shape, the record with the lowest (ROUTE_TYPE, OBJECTID) is kept and all other records with that shape are deleted) without holding a dictionary of every shape in memory.
+#               add(oids, route_types, keys) takes one chunk as NumPy arrays. The chunk is first resolved on its own with NumPy, so that only the best record of each shape in the chunk is written to the SQLite file and the rest go straight to the delete list.
+#               resolve() then compares the best records of all chunks on disk, and deleted_batches(batch_size) reads back the OBJECTIDs to delete in sorted batches.
+#     Inputs - path: The file pathway to the SQLite file. An existing file is replaced Ex) r'C:\Users\caitl\OneDrive\Documents\Tools\HIFLD_shapes.sqlite'.
+#              cache_mb: The size of the SQLite page cache in megabytes Ex) 256.
+# '''
+class ShapeStore(object):
+    def __init__(self, path, cache_mb=256):
+        if os.path.exists(path):
+            os.remove(path)
+
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.execute('PRAGMA journal_mode = OFF')
+        self.conn.execute('PRAGMA synchronous = OFF')
+        self.conn.execute('PRAGMA temp_store = FILE')
+        self.conn.execute('PRAGMA cache_size = -{0}'.format(int(cache_mb * 1024)))
+        self.conn.execute('CREATE TABLE shapes (key BLOB, route_type INTEGER, oid INTEGER, shared INTEGER)')
+        self.conn.execute('CREATE TABLE deleted (oid INTEGER)')
+        self.count_shapes = None
+
+    def add(self, oids, route_types, keys):
+        oids = np.asarray(oids, dtype=np.int64)
+        route_types = np.asarray(route_types, dtype=np.int64)
+        keys = np.asarray(keys, dtype='S16')
+        if len(oids) == 0:
+            return
+
+        order = np.lexsort((oids, route_types, keys)) # Sorted by key, then ROUTE_TYPE, then OBJECTID
+        oids = oids[order]
+        route_types = route_types[order]
+        keys = keys[order]
+
+        first = np.ones(len(keys), dtype=bool) # The first record of each key is the best record of that shape in this chunk
+        first[1:] = keys[1:] != keys[:-1]
+        starts = np.flatnonzero(first)
+        shared = np.diff(np.append(starts, len(keys))) > 1
+
+        self.conn.executemany('INSERT INTO shapes VALUES (?, ?, ?, ?)', zip(keys[first].tolist(), route_types[first].tolist(), oids[first].tolist(), shared.astype(np.int64).tolist()))
+        self.conn.executemany('INSERT INTO deleted VALUES (?)', ((oid,) for oid in oids[~first].tolist()))
+        self.conn.commit()
+
+    def resolve(self):
+        self.conn.execute('CREATE INDEX shapes_key ON shapes (key, route_type, oid)')
+        self.conn.execute('INSERT INTO deleted SELECT oid FROM (SELECT oid, ROW_NUMBER() OVER (PARTITION BY key ORDER BY route_type, oid) AS rank FROM shapes) WHERE rank > 1')
+        self.conn.execute('CREATE INDEX deleted_oid ON deleted (oid)')
+        self.conn.commit()
+
+        self.count_shapes = self.conn.execute('SELECT COUNT(*) FROM (SELECT key FROM shapes GROUP BY key HAVING COUNT(*) > 1 OR MAX(shared) = 1)').fetchone()[0]
+        return self.conn.execute('SELECT COUNT(*) FROM deleted').fetchone()[0], self.count_shapes
+
+    def deleted_batches(self, batch_size=100000):
+        last_oid = None
+
+        while True:
+            if last_oid is None:
+                rows = self.conn.execute('SELECT oid FROM deleted ORDER BY oid LIMIT ?', (batch_size,)).fetchall()
+            else:
+                rows = self.conn.execute('SELECT oid FROM deleted WHERE oid > ? ORDER BY oid LIMIT ?', (last_oid, batch_size)).fetchall()
+            if len(rows) == 0:
+                return
+            yield np.array([row[0] for row in rows], dtype=np.int64)
+            last_oid = rows[-1][0]
+
+    def close(self, remove=True):
+        self.conn.close()
+        if remove and os.path.exists(self.path):
+            os.remove(self.path)
+
+# '''
+#     Purpose - Function range_lookup(table, fields, low, high, block_rows) does the same as HIFLD_Engine.build_lookup for the rows of a staged table whose key falls in one range. The key column is scanned in blocks, so only the matching rows are turned into Python values.
+#     Inputs - table: A staged table (see HIFLD_Cache.open_table) Ex) HIFLD_Cache.open_table(cache_folder, 'Link').
+#              fields: A list of field names, starting with the key field Ex) ['LINK_ID', 'ACCESS_ID', 'STATUS_ID', 'POI_ACCESS'].
+#              low, high: The range of keys, as returned by id_ranges(ids, rows_per_chunk) Ex) (5000, 9100).
+#              block_rows: The number of rows scanned at a time Ex) 1000000.
+#     Outputs - dict_lookup: A dictionary holding the remaining field values as a tuple, keyed on the key field Ex) {5001: (4, 2, 'N')}.
+# '''
+def range_lookup(table, fields, low, high, block_rows=1000000):
+    lst_columns = [table.column(name) for name in fields]
+    lst_nulls = [HIFLD_Cache.NULL_INT if table.dict_kinds[name] == 'int' else HIFLD_Cache.NULL_FLAG for name in fields]
+    dict_lookup = {}
+
+    for start in range(0, table.count, block_rows):
+        keys = np.asarray(lst_columns[0][start:start + block_rows])
+        mask = keys != lst_nulls[0]
+        if low is not None:
+            mask &= keys >= low
+        if high is not None:
+            mask &= keys < high
+        index = np.flatnonzero(mask)
+        if len(index) == 0:
+            continue
+
+        lst_values = [[None if value == null else value for value in np.asarray(column[start:start + block_rows])[index].tolist()] for column, null in zip(lst_columns, lst_nulls)]
+        for row in zip(*lst_values):
+            if row[0] not in dict_lookup: # The first row of each key is kept, the same as HIFLD_Engine.build_lookup
+                dict_lookup[row[0]] = row[1:]
+
+    return dict_lookup
+
+# '''
+#     Purpose - Function range_values(keys, values, low, high, null) returns the (key, value) pairs of two parallel arrays whose key falls in one range, as a dictionary. It is used to hand out the Heirarchy values (see HIFLD_Cache.heirarchy_arrays) one Link_ID range at a time.
+#     Inputs - keys, values: Two parallel arrays Ex) the outputs of HIFLD_Cache.heirarchy_arrays(cache_folder).
+#              low, high: The range of keys Ex) (5000, 9100).
+#              null: The value that marks a missing value, which is left out Ex) -1.
+#     Outputs - A dictionary Ex) {5001: 0, 5002: 4}.
+# '''
+def range_values(keys, values, low, high, null=-1):
+    keys = np.asarray(keys)
+    values = np.asarray(values)
+
+    mask = (keys != HIFLD_Cache.NULL_INT) & (values != null)
+    if low is not None:
+        mask &= keys >= low
+    if high is not None:
+        mask &= keys < high
+
+    return dict(zip(keys[mask].tolist(), values[mask].tolist()))
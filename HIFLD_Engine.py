@@ -0,0 +1,835 @@
+'''
+Title: HIFLD Engine
+Authors: Caitlin Hartig, Justine Jedlicka
+Date: October 2026
+
+This module holds the pure-Python building blocks that the HIFLD toolbox (HIFLD.pyt) uses for its heavy row-by-row work. None of the functions in this module require arcpy, so they work on plain Python values (OBJECTIDs, attribute values, coordinate lists) and can be run and benchmarked on a machine without an ArcGIS license.
+The HIFLD toolbox is responsible for reading and writing the geodatabase with arcpy cursors, and hands the values it reads to the functions in this module.
+
+Libraries Utilized: datetime, hashlib, json, math, os, re, struct
+'''
+
+import datetime, hashlib, json, math, os, re, struct
+
+# '''
+#     Purpose - Function oid_where_clauses(oid_field, oids, chunk_size) takes a collection of OBJECTIDs and builds a list of SQL where-clauses that together select exactly those OBJECTIDs.
+#               The OBJECTIDs are de-duplicated and sorted first. Runs of consecutive OBJECTIDs are written as a single range (OBJECTID >= a AND OBJECTID <= b) and the remaining OBJECTIDs are written as OBJECTID IN (...) lists, with at most chunk_size values per where-clause so that each clause stays a reasonable length for the file geodatabase.
+#     Inputs - oid_field: The name of the OBJECTID field Ex) 'OBJECTID'.
+#              oids: Any iterable of integer OBJECTIDs Ex) {5, 1, 2, 3, 9}.
+#              chunk_size: The maximum number of OBJECTIDs or ranges written into one where-clause Ex) 1000.
+#     Outputs - lst_clauses: A list of where-clauses Ex) ['(OBJECTID >= 1 AND OBJECTID <= 3) OR OBJECTID IN (5, 9)'].
+# '''
+def oid_where_clauses(oid_field, oids, chunk_size=1000):
+    lst_oids = sorted(set(oids))
+    lst_clauses = [] # This list holds the finished where-clauses
+    lst_ranges = [] # This list holds (start, end) tuples for the runs of consecutive OBJECTIDs in the current chunk
+    lst_singles = [] # This list holds the OBJECTIDs in the current chunk that are not part of a run
+    count_terms = 0 # Tracks how many ranges / single OBJECTIDs are in the current chunk
+
+    index = 0
+    while index < len(lst_oids):
+        start = lst_oids[index]
+        end = start
+        while index + 1 < len(lst_oids) and lst_oids[index + 1] == end + 1: # Extend the run for as long as the OBJECTIDs are consecutive
+            index += 1
+            end = lst_oids[index]
+
+        if end - start >= 2: # Runs of 3 or more OBJECTIDs are cheaper to write as a range
+            lst_ranges.append((start, end))
+        else:
+            lst_singles.extend(range(start, end + 1))
+        count_terms += 1
+        index += 1
+
+        if count_terms >= chunk_size: # The current chunk is full, so close it off as a where-clause
+            lst_clauses.append(_oid_clause(oid_field, lst_ranges, lst_singles))
+            lst_ranges = []
+            lst_singles = []
+            count_terms = 0
+
+    if count_terms > 0:
+        lst_clauses.append(_oid_clause(oid_field, lst_ranges, lst_singles))
+
+    return lst_clauses
+
+# '''
+#     Purpose - Function _oid_clause(oid_field, lst_ranges, lst_singles) joins a list of OBJECTID ranges and single OBJECTIDs into one where-clause. Used by oid_where_clauses(oid_field, oids, chunk_size).
+#     Inputs - oid_field: The name of the OBJECTID field Ex) 'OBJECTID'.
+#              lst_ranges: A list of (start, end) tuples Ex) [(1, 3)].
+#              lst_singles: A list of single OBJECTIDs Ex) [5, 9].
+#     Outputs - The where-clause Ex) '(OBJECTID >= 1 AND OBJECTID <= 3) OR OBJECTID IN (5, 9)'.
+# '''
+def _oid_clause(oid_field, lst_ranges, lst_singles):
+    lst_terms = ['({0} >= {1} AND {0} <= {2})'.format(oid_field, start, end) for start, end in lst_ranges]
+
+    if len(lst_singles) != 0:
+        lst_terms.append('{0} IN ({1})'.format(oid_field, ', '.join(str(oid) for oid in lst_singles)))
+
+    return ' OR '.join(lst_terms)
+
+# '''
+#     Purpose - Function sweep_delete(rows, oids) walks through a sequence of rows once and flags the rows whose OBJECTID is in oids. This is the in-memory equivalent of the UpdateCursor used by delete_oids(feature_class, oids) in HIFLD.pyt, and is used to benchmark and check the deletion engine without arcpy.
+#               The OBJECTIDs to delete are held in a set, so each membership check takes the same amount of time no matter how many OBJECTIDs are being deleted.
+#     Inputs - rows: Any iterable of rows whose first value is the OBJECTID Ex) [(1,), (2,), (3,)].
+#              oids: Any iterable of integer OBJECTIDs to delete Ex) [2].
+#     Outputs - rows_kept: A list of the rows that were not deleted.
+#               rows_scanned: The number of rows read.
+#               rows_deleted: The number of rows deleted.
+# '''
+def sweep_delete(rows, oids):
+    set_del = set(oids)
+    rows_kept = []
+    rows_scanned = 0
+    rows_deleted = 0
+
+    for row in rows:
+        rows_scanned += 1
+        if row[0] in set_del:
+            rows_deleted += 1
+        else:
+            rows_kept.append(row)
+
+    return rows_kept, rows_scanned, rows_deleted
+
+_PART_FLOAT = float('inf') # Stand-in value written between the parts of a multipart geometry
+_PART_INT = -2 ** 63
+
+# '''
+#     Purpose - Function shape_key(coords, xy_tolerance) takes the vertices of a geometry and returns a short hash of its canonical vertex sequence, so that identical shapes produce the same key.
+#               If xy_tolerance is given, every coordinate is first snapped to a grid with cells of that size (round(coord / xy_tolerance)), so that vertices that fall in the same grid cell produce the same key. This is grid snapping rather than a true distance tolerance: two vertices closer together than the tolerance can still land in neighbouring cells and produce different keys. Otherwise the coordinates are compared exactly, like the FindIdentical tool with no XY tolerance.
+#     Inputs - coords: A sequence of (x, y) tuples. For multipart geometries, the parts are separated by None Ex) [(0.0, 0.0), (1.0, 1.0), None, (5.0, 5.0), (6.0, 5.0)].
+#              xy_tolerance: The grid cell size in the units of the coordinates, or None for an exact comparison Ex) 0.000001.
+#     Outputs - A 16-byte hash of the vertex sequence.
+# '''
+def shape_key(coords, xy_tolerance=None):
+    lst_values = [] # This list holds the flattened coordinates, which are packed into bytes all at once
+
+    if xy_tolerance is None:
+        for coord in coords:
+            if coord is None: # Part separator
+                lst_values.append(_PART_FLOAT)
+            else:
+                lst_values.append(coord[0] + 0.0) # Adding 0.0 turns -0.0 into 0.0
+                lst_values.append(coord[1] + 0.0)
+        packed = struct.pack('<{0}d'.format(len(lst_values)), *lst_values)
+    else:
+        for coord in coords:
+            if coord is None:
+                lst_values.append(_PART_INT)
+            else:
+                lst_values.append(round(coord[0] / xy_tolerance))
+                lst_values.append(round(coord[1] / xy_tolerance))
+        packed = struct.pack('<{0}q'.format(len(lst_values)), *lst_values)
+
+    return hashlib.blake2b(packed, digest_size=16).digest()
+
+# '''
+#     Purpose - Function resolve_duplicate_shapes(rows, xy_tolerance) finds roads that have an identical shape and decides which of them to delete, in a single pass over the rows.
+#               For every shape, it keeps the record with the lowest (ROUTE_TYPE, OBJECTID), so that route type 1 is the priority and so forth until route type 4. All other records with the same shape are added to the delete set.
+#               Records with a NULL route type are left alone and are never deleted.
+#     Inputs - rows: Any iterable of (OBJECTID, ROUTE_TYPE, coords) tuples, where coords is a vertex sequence as described in shape_key(coords, xy_tolerance) Ex) [(1, 2, [(0.0, 0.0), (1.0, 1.0)]), (2, 1, [(0.0, 0.0), (1.0, 1.0)])].
+#              xy_tolerance: The grid cell size used to snap shapes before comparing them (see shape_key(coords, xy_tolerance)), or None for an exact comparison Ex) 0.000001.
+#     Outputs - set_del: A set of the OBJECTIDs to delete Ex) {1}.
+#               count_shapes: The number of shapes that were shared by more than one record.
+# '''
+def resolve_duplicate_shapes(rows, xy_tolerance=None):
+    dict_best = {} # This dictionary holds the (ROUTE_TYPE, OBJECTID) tuple with the highest priority found so far for each shape
+    set_duplicates = set() # This set holds the keys of all shapes that have been seen more than once
+    set_del = set()
+
+    for oid, route_type, coords in rows:
+        if route_type is None: # Skip all ROUTE_TYPE IS NULL, since we want to save all these
+            continue
+
+        key = shape_key(coords, xy_tolerance)
+        candidate = (route_type, oid)
+        best = dict_best.get(key)
+
+        if best is None:
+            dict_best[key] = candidate
+        else:
+            set_duplicates.add(key)
+            if candidate < best: # The new record has a higher priority route type, so the previous best is deleted instead
+                set_del.add(best[1])
+                dict_best[key] = candidate
+            else:
+                set_del.add(oid)
+
+    return set_del, len(set_duplicates)
+
+# '''
+#     Purpose - Function build_lookup(rows) takes the rows of a lookup table and loads them into a dictionary keyed on the first value of each row, so that the table can be joined in memory instead of with AddJoin.
+#               If the same key appears more than once, the first row read is kept.
+#     Inputs - rows: Any iterable of rows whose first value is the join key Ex) [(101, 4, 2, 'N'), (102, 290, 41, 'Y')].
+#     Outputs - dict_lookup: A dictionary holding the remaining values of each row as a tuple, keyed on the join key Ex) {101: (4, 2, 'N'), 102: (290, 41, 'Y')}.
+# '''
+def build_lookup(rows):
+    dict_lookup = {}
+
+    for row in rows:
+        if row[0] is not None and row[0] not in dict_lookup:
+            dict_lookup[row[0]] = tuple(row[1:])
+
+    return dict_lookup
+
+# '''
+#     Purpose - Function enrich_row(link_id, dict_link, dict_link_attribute, dict_status) takes the Link_ID of a road and looks up its ACCESS_ID, STATUS_ID, and POI_ACCESS (from the Link lookup), EXPANDED_INCLUSION (from the LinkAttribute lookup, via the Link_ID), and URBAN (from the Status lookup, via the STATUS_ID).
+#               Values that have no match in a lookup are returned as None, the same as a KEEP_ALL join followed by CalculateField.
+#     Inputs - link_id: The Link_ID of the road Ex) 101.
+#              dict_link: The Link lookup, holding (ACCESS_ID, STATUS_ID, POI_ACCESS) keyed on LINK_ID Ex) {101: (4, 2, 'N')}.
+#              dict_link_attribute: The LinkAttribute lookup, holding (EXPANDED_INCLUSION,) keyed on LINK_ID Ex) {101: (12,)}.
+#              dict_status: The Status lookup, holding (URBAN,) keyed on STATUS_ID Ex) {2: ('Y',)}.
+#     Outputs - A tuple of (ACCESS_ID, STATUS_ID, POI_ACCESS, EXPANDED_INCLUSION, URBAN) Ex) (4, 2, 'N', 12, 'Y').
+# '''
+def enrich_row(link_id, dict_link, dict_link_attribute, dict_status):
+    access_id, status_id, poi_access = dict_link.get(link_id, (None, None, None))
+    expanded_inclusion = dict_link_attribute.get(link_id, (None,))[0]
+    urban = dict_status.get(status_id, (None,))[0]
+
+    return (access_id, status_id, poi_access, expanded_inclusion, urban)
+
+# '''
+#     Purpose - Function classify_heirarchy(route_type, func_class, paved, urban) evaluates the six Heirarchy queries from add_attributes for one road, in priority order, and returns the number of the first query that matches. Hierarchy = 0 indicates roads that are most important, while hierarchy = 5 indicates roads that are least important.
+#               Returning the first match gives the same result as filling the Hierarchy field in reverse query order, since a road that appears in multiple queries ends up with the lowest (most important) value.
+#                   0: ((ROUTE_TYPE IN (1, 2, 3, 4) AND FuncClass IN (1, 2, 3, 4, 5)) OR FuncClass IN (1, 2, 3, 4)) AND Paved = 'Y'
+#                   1: ((ROUTE_TYPE IN (1, 2, 3, 4) AND FuncClass IN (1, 2, 3, 4, 5)) OR FuncClass IN (1, 2, 3, 4)) AND Paved = 'N'
+#                   2: FuncClass IN (5) AND Paved = 'Y' AND URBAN = 'N'
+#                   3: FuncClass IN (5) AND Paved = 'N' AND URBAN = 'N'
+#                   4: FuncClass IN (5) AND Paved = 'Y' AND URBAN = 'Y'
+#                   5: FuncClass IN (5) AND Paved = 'N' AND URBAN = 'Y'
+#     Inputs - route_type: The ROUTE_TYPE value, or None Ex) 2.
+#              func_class: The FuncClass value, or None Ex) 5.
+#              paved: The Paved value, or None Ex) 'Y'.
+#              urban: The URBAN value, or None Ex) 'N'.
+#     Outputs - The Hierarchy value 0-5, or None if the road matches none of the queries Ex) 0.
+# '''
+def classify_heirarchy(route_type, func_class, paved, urban):
+    if (route_type in (1, 2, 3, 4) and func_class in (1, 2, 3, 4, 5)) or func_class in (1, 2, 3, 4):
+        if paved == 'Y':
+            return 0
+        if paved == 'N':
+            return 1
+
+    if func_class == 5:
+        if urban == 'N':
+            if paved == 'Y':
+                return 2
+            if paved == 'N':
+                return 3
+        elif urban == 'Y':
+            if paved == 'Y':
+                return 4
+            if paved == 'N':
+                return 5
+
+    return None
+
+# '''
+#     Purpose - Function heirarchy_by_link(rows) classifies every road with classify_heirarchy(route_type, func_class, paved, urban) and keeps the lowest (most important) Hierarchy value for each Link_ID.
+#               The original add_attributes joined each query selection back to the roads on Link_ID, so every road sharing a Link_ID with a road that matched a query received that query's value. Keeping the minimum per Link_ID reproduces that result. Roads with a NULL Link_ID never matched the join and are left out.
+#     Inputs - rows: Any iterable of (Link_ID, ROUTE_TYPE, FuncClass, Paved, URBAN) tuples Ex) [(101, 1, 5, 'Y', 'N'), (101, None, 5, 'Y', 'N')].
+#     Outputs - dict_heirarchy: A dictionary holding the Hierarchy value for each Link_ID that matched at least one query Ex) {101: 0}.
+# '''
+def heirarchy_by_link(rows):
+    dict_heirarchy = {}
+
+    for link_id, route_type, func_class, paved, urban in rows:
+        if link_id is None:
+            continue
+
+        value = classify_heirarchy(route_type, func_class, paved, urban)
+        if value is not None:
+            current = dict_heirarchy.get(link_id)
+            if current is None or value < current:
+                dict_heirarchy[link_id] = value
+
+    return dict_heirarchy
+
+# '''
+#     Purpose - Function classify_heirarchy_arrays(route_type, func_class, paved, urban, link_id, null_link) is the NumPy version of classify_heirarchy(route_type, func_class, paved, urban) and heirarchy_by_link(rows). It evaluates the six Heirarchy queries over whole columns at once, for example the columns returned by arcpy.da.TableToNumPyArray.
+#               NULL values should be passed as a value that does not match any query, such as -1 for numeric columns or '' for text columns.
+#     Inputs - route_type: A NumPy array of ROUTE_TYPE values.
+#              func_class: A NumPy array of FuncClass values.
+#              paved: A NumPy array of Paved values.
+#              urban: A NumPy array of URBAN values.
+#              link_id: An optional NumPy array of Link_ID values. If given, each road gets the lowest Hierarchy value of all roads with the same Link_ID, as in heirarchy_by_link(rows).
+#              null_link: The value used for NULL in link_id. Roads with a NULL Link_ID get -1 Ex) -1.
+#     Outputs - A NumPy int16 array of Hierarchy values, with -1 where a road matches none of the queries.
+# '''
+def classify_heirarchy_arrays(route_type, func_class, paved, urban, link_id=None, null_link=-1):
+    import numpy as np
+
+    route_type = np.asarray(route_type)
+    func_class = np.asarray(func_class)
+    paved = np.asarray(paved)
+    urban = np.asarray(urban)
+
+    major = (np.isin(route_type, (1, 2, 3, 4)) & np.isin(func_class, (1, 2, 3, 4, 5))) | np.isin(func_class, (1, 2, 3, 4))
+    minor = func_class == 5
+    paved_y = paved == 'Y'
+    paved_n = paved == 'N'
+    urban_y = urban == 'Y'
+    urban_n = urban == 'N'
+
+    lst_conditions = [major & paved_y, major & paved_n, minor & paved_y & urban_n, minor & paved_n & urban_n, minor & paved_y & urban_y, minor & paved_n & urban_y]
+    heirarchy = np.select(lst_conditions, [0, 1, 2, 3, 4, 5], default=-1).astype(np.int16) # np.select picks the first condition that matches, which is the most important query
+
+    if link_id is not None:
+        link_id = np.asarray(link_id)
+        unique_links, inverse = np.unique(link_id, return_inverse=True)
+        NO_MATCH = 99
+        link_min = np.full(len(unique_links), NO_MATCH, dtype=np.int16)
+        np.minimum.at(link_min, inverse, np.where(heirarchy < 0, NO_MATCH, heirarchy).astype(np.int16))
+        heirarchy = link_min[inverse]
+        heirarchy[heirarchy == NO_MATCH] = -1
+        heirarchy[link_id == null_link] = -1
+
+    return heirarchy
+
+# '''
+#     Purpose - Function keep_inside_road(route_type, func_class, paved) returns True for the roads that are kept inside the FS lands by mark_inside_outside: state highways, US-routes, interstates, and corresponding ramps.
+#               This is the query "(ROUTE_TYPE IN (1,2,3) AND FuncClass IN (1,2,3,4,5)) OR (Paved = 'Y' AND FuncClass IN (1,2,3))".
+#     Inputs - route_type: The ROUTE_TYPE value, or None Ex) 2.
+#              func_class: The FuncClass value, or None Ex) 3.
+#              paved: The Paved value, or None Ex) 'Y'.
+#     Outputs - True if the road is kept, otherwise False.
+# '''
+def keep_inside_road(route_type, func_class, paved):
+    return (route_type in (1, 2, 3) and func_class in (1, 2, 3, 4, 5)) or (paved == 'Y' and func_class in (1, 2, 3))
+
+# '''
+#     Purpose - Function _crosses(px, py, qx, qy, edge) returns True if the segment from (px, py) to (qx, qy) crosses the polygon edge (x1, y1, x2, y2).
+#               A half-open rule is used on both segments, so that a path passing exactly through a polygon vertex is counted once when it crosses the boundary and zero or two times when it only touches it.
+# '''
+def _crosses(px, py, qx, qy, edge):
+    x1, y1, x2, y2 = edge
+
+    side1 = (qx - px) * (y1 - py) - (qy - py) * (x1 - px) > 0
+    side2 = (qx - px) * (y2 - py) - (qy - py) * (x2 - px) > 0
+    if side1 == side2:
+        return False
+
+    side3 = (x2 - x1) * (py - y1) - (y2 - y1) * (px - x1) > 0
+    side4 = (x2 - x1) * (qy - y1) - (y2 - y1) * (qx - x1) > 0
+    return side3 != side4
+
+# '''
+#     Purpose - Function _intersection(ax, ay, bx, by, edge) returns the position t (0 < t < 1) along the segment from (ax, ay) to (bx, by) where it intersects the polygon edge (x1, y1, x2, y2), or None if it does not.
+# '''
+def _intersection(ax, ay, bx, by, edge):
+    x1, y1, x2, y2 = edge
+    rx = bx - ax
+    ry = by - ay
+    sx = x2 - x1
+    sy = y2 - y1
+
+    denom = rx * sy - ry * sx
+    if denom == 0: # Parallel segments are never split
+        return None
+
+    qx = x1 - ax
+    qy = y1 - ay
+    t = (qx * sy - qy * sx) / denom
+    u = (qx * ry - qy * rx) / denom
+
+    if 0 < t < 1 and 0 <= u <= 1:
+        return t
+    return None
+
+# '''
+#     Purpose - Class PolygonGridIndex(rings, cell_size) is a uniform grid spatial index over the edges of a set of polygons (such as the FS lands), used by mark_inside_outside to decide which parts of each road are inside or outside the polygons without running Clip and Erase.
+#               Each grid cell holds the polygon edges that pass through it. The inside / outside status of each cell's probe point is worked out once, by sweeping across each row of cells from the left edge of the grid (which is always outside), so that any point can then be tested by only looking at the edges in its own cell.
+#               Holes are handled by the even-odd rule, so the rings of all polygons can simply be added together.
+#     Inputs - rings: A list of rings, each a list of (x, y) tuples. Rings do not need to be closed Ex) [[(0, 0), (10, 0), (10, 10), (0, 10)]].
+#              cell_size: The width and height of a grid cell in the units of the coordinates, or None to size the cells so that each holds a handful of edges Ex) 5000.
+# '''
+class PolygonGridIndex(object):
+    PROBE = 0.5000314159 # Position of the probe point inside each cell, kept slightly off-center so that it is unlikely to line up exactly with a vertex
+    MAX_FAST_CELLS = 64 # The largest number of cells checked by the bounding box fast path
+
+    def __init__(self, rings, cell_size=None):
+        self.edges = []
+        for ring in rings:
+            if len(ring) < 3:
+                continue
+            points = list(ring)
+            if points[0] != points[-1]:
+                points.append(points[0])
+            for index in range(len(points) - 1):
+                (x1, y1), (x2, y2) = points[index], points[index + 1]
+                if x1 != x2 or y1 != y2:
+                    self.edges.append((x1, y1, x2, y2))
+
+        self.cells = {} # This dictionary holds the list of edge indexes that pass through each (column, row) cell
+        self.row_status = {} # This dictionary holds a bytearray of probe point statuses (1 = inside) for each row of cells that has been swept
+
+        if len(self.edges) == 0:
+            self.extent = None
+            return
+
+        xmin = min(min(edge[0], edge[2]) for edge in self.edges)
+        xmax = max(max(edge[0], edge[2]) for edge in self.edges)
+        ymin = min(min(edge[1], edge[3]) for edge in self.edges)
+        ymax = max(max(edge[1], edge[3]) for edge in self.edges)
+        self.extent = (xmin, ymin, xmax, ymax)
+
+        if cell_size is None:
+            width = max(xmax - xmin, 1e-9)
+            height = max(ymax - ymin, 1e-9)
+            cell_size = math.sqrt(width * height / len(self.edges)) # Roughly as many cells as edges
+        self.cell_size = cell_size
+
+        self.x0 = xmin - cell_size # A margin of one empty cell is left around the polygons, so column 0 is always outside
+        self.y0 = ymin - cell_size
+        self.ncols = int((xmax - self.x0) / cell_size) + 2
+        self.nrows = int((ymax - self.y0) / cell_size) + 2
+
+        for index, (x1, y1, x2, y2) in enumerate(self.edges):
+            for col in range(self._col(min(x1, x2)), self._col(max(x1, x2)) + 1):
+                for row in range(self._row(min(y1, y2)), self._row(max(y1, y2)) + 1):
+                    self.cells.setdefault((col, row), []).append(index)
+
+    def _col(self, x):
+        return int((x - self.x0) // self.cell_size)
+
+    def _row(self, y):
+        return int((y - self.y0) // self.cell_size)
+
+    def _probe(self, col, row):
+        return (self.x0 + (col + self.PROBE) * self.cell_size, self.y0 + (row + self.PROBE) * self.cell_size)
+
+    # Sweeps one row of cells from left to right, flipping the status every time the path between two neighbouring probe points crosses an edge
+    def _sweep_row(self, row):
+        status = bytearray(self.ncols)
+        inside = False
+        px, py = self._probe(0, row)
+
+        for col in range(1, self.ncols):
+            qx, qy = self._probe(col, row)
+            set_edges = set(self.cells.get((col - 1, row), ())) | set(self.cells.get((col, row), ()))
+            for index in set_edges:
+                if _crosses(px, py, qx, qy, self.edges[index]):
+                    inside = not inside
+            status[col] = inside
+            px, py = qx, qy
+
+        self.row_status[row] = status
+        return status
+
+    # '''
+    #     Purpose - Method point_inside(x, y) returns True if the point (x, y) is inside the polygons.
+    # '''
+    def point_inside(self, x, y):
+        if self.extent is None:
+            return False
+
+        col = self._col(x)
+        row = self._row(y)
+        if col < 0 or row < 0 or col >= self.ncols or row >= self.nrows:
+            return False
+
+        status = self.row_status.get(row)
+        if status is None:
+            status = self._sweep_row(row)
+        inside = bool(status[col])
+
+        px, py = self._probe(col, row)
+        for index in self.cells.get((col, row), ()): # The path from the point to the probe point stays inside the cell, so only the cell's own edges can cross it
+            if _crosses(x, y, px, py, self.edges[index]):
+                inside = not inside
+
+        return inside
+
+    # Returns True if none of the cells under the bounding box hold an edge, meaning that everything inside the bounding box is either all inside or all outside
+    def _bbox_is_empty(self, xmin, ymin, xmax, ymax):
+        col1 = self._col(xmin)
+        col2 = self._col(xmax)
+        row1 = self._row(ymin)
+        row2 = self._row(ymax)
+
+        if (col2 - col1 + 1) * (row2 - row1 + 1) > self.MAX_FAST_CELLS:
+            return False
+
+        for col in range(col1, col2 + 1):
+            for row in range(row1, row2 + 1):
+                if (col, row) in self.cells:
+                    return False
+        return True
+
+    # Returns the indexes of all edges in the cells under the bounding box
+    def _candidate_edges(self, xmin, ymin, xmax, ymax):
+        set_edges = set()
+        for col in range(self._col(xmin), self._col(xmax) + 1):
+            for row in range(self._row(ymin), self._row(ymax) + 1):
+                lst_edges = self.cells.get((col, row))
+                if lst_edges is not None:
+                    set_edges.update(lst_edges)
+        return set_edges
+
+    # '''
+    #     Purpose - Method split_line(coords) splits a single-part line wherever it crosses a polygon boundary, and marks each piece as inside or outside.
+    #               Lines whose bounding box lies entirely outside the polygons, or entirely within cells that hold no polygon edges, are returned whole without looking at their segments.
+    #     Inputs - coords: A list of (x, y) tuples Ex) [(0, 5), (20, 5)].
+    #     Outputs - lst_pieces: A list of (inside, coords) tuples, in order along the line Ex) [(True, [(0, 5), (10.0, 5.0)]), (False, [(10.0, 5.0), (20, 5)])].
+    # '''
+    def split_line(self, coords):
+        if len(coords) == 0:
+            return []
+        if len(coords) == 1 or self.extent is None:
+            return [(self.point_inside(coords[0][0], coords[0][1]), list(coords))]
+
+        xmin = min(coord[0] for coord in coords)
+        xmax = max(coord[0] for coord in coords)
+        ymin = min(coord[1] for coord in coords)
+        ymax = max(coord[1] for coord in coords)
+
+        if xmax < self.extent[0] or xmin > self.extent[2] or ymax < self.extent[1] or ymin > self.extent[3]: # Fast path - completely outside the polygons
+            return [(False, list(coords))]
+        if self._bbox_is_empty(xmin, ymin, xmax, ymax): # Fast path - no polygon boundary anywhere near the line
+            return [(self.point_inside(coords[0][0], coords[0][1]), list(coords))]
+
+        lst_pieces = [] # This list holds the pieces of the line between boundary crossings
+        current = [coords[0]]
+
+        for index in range(len(coords) - 1):
+            ax, ay = coords[index]
+            bx, by = coords[index + 1]
+
+            if ax != bx or ay != by:
+                set_t = set()
+                for edge_index in self._candidate_edges(min(ax, bx), min(ay, by), max(ax, bx), max(ay, by)):
+                    t = _intersection(ax, ay, bx, by, self.edges[edge_index])
+                    if t is not None:
+                        set_t.add(t)
+
+                for t in sorted(set_t): # Split the segment at each crossing
+                    point = (ax + t * (bx - ax), ay + t * (by - ay))
+                    current.append(point)
+                    lst_pieces.append(current)
+                    current = [point]
+
+            current.append((bx, by))
+        lst_pieces.append(current)
+
+        lst_result = []
+        for piece in lst_pieces: # Each piece is entirely inside or outside, so it is classified by the midpoint of its first segment
+            (x1, y1), (x2, y2) = piece[0], piece[1]
+            inside = self.point_inside((x1 + x2) / 2, (y1 + y2) / 2)
+            if len(lst_result) != 0 and lst_result[-1][0] == inside: # Join pieces that only touched the boundary back together
+                lst_result[-1][1].extend(piece[1:])
+            else:
+                lst_result.append((inside, piece))
+
+        return lst_result
+
+# '''
+#     Purpose - Function split_inside_outside(coords, index) splits a road into the parts that are inside the polygons of a PolygonGridIndex and the parts that are outside, like running Clip and Erase on the road.
+#     Inputs - coords: A vertex sequence as described in shape_key(coords, xy_tolerance), with multipart roads separated by None Ex) [(0, 5), (20, 5)].
+#              index: A PolygonGridIndex built over the polygons.
+#     Outputs - lst_inside: A list of parts (each a list of (x, y) tuples) inside the polygons. Empty if no part of the road is inside.
+#               lst_outside: A list of parts (each a list of (x, y) tuples) outside the polygons. Empty if no part of the road is outside.
+# '''
+def split_inside_outside(coords, index):
+    lst_inside = []
+    lst_outside = []
+
+    part = []
+    for coord in list(coords) + [None]:
+        if coord is None: # End of a part
+            for inside, piece in index.split_line(part):
+                if len(piece) > 1:
+                    if inside:
+                        lst_inside.append(piece)
+                    else:
+                        lst_outside.append(piece)
+            part = []
+        else:
+            part.append(coord)
+
+    return lst_inside, lst_outside
+
+# '''
+#     Purpose - Function schema_hash(lst_fields) returns a short hash of a feature class / table schema, used to fingerprint the inputs of each stage in the step ledger.
+#     Inputs - lst_fields: A list of (name, type, length) tuples, one per field Ex) [('Link_ID', 'Double', 8), ('ROUTE_TYPE', 'SmallInteger', 2)].
+#     Outputs - A hexadecimal hash string.
+# '''
+def schema_hash(lst_fields):
+    text = json.dumps([list(field) for field in lst_fields])
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+# '''
+#     Purpose - Function rows_digest() returns an empty digest for hash_row(digest, row), for a caller that hashes the rows of a feature class / table while it reads them for something else (see road_hashes in HIFLD.pyt).
+#     Inputs - None
+#     Outputs - A hashlib digest; its hexdigest() is the same as rows_hash(rows) of the rows passed to hash_row.
+# '''
+def rows_digest():
+    return hashlib.blake2b(digest_size=16)
+
+# '''
+#     Purpose - Function hash_row(digest, row) adds one row to a digest returned by rows_digest().
+#     Inputs - digest: The digest (see rows_digest).
+#              row: A row tuple Ex) (101, 'S', 1).
+#     Outputs - None
+# '''
+def hash_row(digest, row):
+    digest.update(repr(tuple(row)).encode('utf-8'))
+    digest.update(b'\n')
+
+# '''
+#     Purpose - Function rows_hash(rows) returns a hash of the content of a feature class / table, used to fingerprint the HIFLD inputs, since an edit that keeps the row count, schema, and extent would otherwise go unnoticed (a GDB has no modified time that would show it).
+#               The rows are hashed in the order they are read, one at a time, so the table is never held in memory.
+#     Inputs - rows: Any iterable of row tuples, such as an arcpy.da.SearchCursor Ex) [(101, 'S', 1), (102, 'N', 2)].
+#     Outputs - A hexadecimal hash string.
+# '''
+def rows_hash(rows):
+    digest = rows_digest()
+
+    for row in rows:
+        hash_row(digest, row)
+
+    return digest.hexdigest()
+
+# '''
+#     Purpose - Function load_ledger(ledger_path) reads the HIFLD step ledger, a JSON file that records which stages of the HIFLD toolbox have completed, the fingerprints of their inputs, and their output layer.
+#               If the file does not exist or cannot be read, an empty ledger is returned so that every stage runs.
+#     Inputs - ledger_path: The file pathway to the ledger Ex) r'C:\Users\caitl\OneDrive\Documents\Tools\HIFLD_ledger_Master_GDB.json'.
+#     Outputs - ledger: A dictionary Ex) {'stages': {'create_initial_roads': {...}}}.
+# '''
+def load_ledger(ledger_path):
+    try:
+        with open(ledger_path, 'r') as infile:
+            ledger = json.load(infile)
+    except (OSError, ValueError):
+        ledger = {}
+
+    ledger.setdefault('stages', {})
+    return ledger
+
+# '''
+#     Purpose - Function save_ledger(ledger, ledger_path) writes the step ledger to disk. The ledger is written to a temporary file first and then moved into place, so that a crash part way through never leaves a half-written ledger behind.
+#     Inputs - ledger: The ledger dictionary.
+#              ledger_path: The file pathway to the ledger.
+#     Outputs - None
+# '''
+def save_ledger(ledger, ledger_path):
+    temp_path = ledger_path + '.tmp'
+
+    with open(temp_path, 'w') as outfile:
+        json.dump(ledger, outfile, indent=2)
+
+    os.replace(temp_path, ledger_path)
+
+# '''
+#     Purpose - Function stage_is_current(ledger, stage, dict_fingerprints) returns True if the ledger shows that a stage has completed with exactly the same input fingerprints, meaning that the stage does not need to run again.
+#     Inputs - ledger: The ledger dictionary.
+#              stage: The name of the stage Ex) 'create_initial_roads'.
+#              dict_fingerprints: A dictionary holding the current fingerprint of each input, keyed on the input name Ex) {'streets': {'rows': 1000, 'schema': '...', 'extent': '...', 'content': '...', 'mtime': None}}.
+#     Outputs - True if the stage is current, otherwise False.
+# '''
+def stage_is_current(ledger, stage, dict_fingerprints):
+    entry = ledger['stages'].get(stage)
+
+    if entry is None or not entry.get('completed'):
+        return False
+
+    return entry.get('inputs') == dict_fingerprints
+
+# '''
+#     Purpose - Function record_stage(ledger, stage, dict_fingerprints, output) records in the ledger that a stage has completed, along with the fingerprints of its inputs and the pathway to its output layer.
+#     Inputs - ledger: The ledger dictionary.
+#              stage: The name of the stage Ex) 'create_initial_roads'.
+#              dict_fingerprints: A dictionary holding the fingerprint of each input, keyed on the input name.
+#              output: The file pathway to the output layer of the stage.
+#     Outputs - None
+# '''
+def record_stage(ledger, stage, dict_fingerprints, output):
+    ledger['stages'][stage] = {'completed': True, 'inputs': dict_fingerprints, 'output': output, 'finished': datetime.datetime.now().isoformat(timespec='seconds')}
+
+_LINK_RECORD = struct.Struct('<d16s16s') # One record of a link hash table: Link_ID, hash of the link's values, shape key of the link's road
+_LINK_HEADER_MAGIC = b'HLHT' # Marks a link hash table that starts with a metadata header
+_LINK_HEADER_LENGTH = struct.Struct('<I') # The length of the JSON metadata header in bytes
+
+# '''
+#     Purpose - Function hash_link_rows(rows, dict_hashes) adds rows to a table of link hashes, used to find the links that changed between two HERE releases.
+#               Each row is hashed on its own, and the hashes of all rows of the same Link_ID are added together, so that a link's hash does not depend on the order its rows are read in (for example, the StreetAddress rows of a link).
+#     Inputs - rows: Any iterable of (Link_ID, values) tuples, where values is a tuple of the field values HIFLD reads for the link Ex) [(101, ('S', 1, 5, 'Y', 'I-90'))].
+#              dict_hashes: An existing dictionary of link hashes to add to, or None to start a new one.
+#     Outputs - dict_hashes: A dictionary holding a 128-bit integer hash for each Link_ID Ex) {101: 2983...}.
+# '''
+def hash_link_rows(rows, dict_hashes=None):
+    if dict_hashes is None:
+        dict_hashes = {}
+    MASK = (1 << 128) - 1
+
+    for link_id, values in rows:
+        if link_id is None:
+            continue
+        digest = int.from_bytes(hashlib.blake2b(repr(values).encode('utf-8'), digest_size=16).digest(), 'little')
+        dict_hashes[link_id] = (dict_hashes.get(link_id, 0) + digest) & MASK
+
+    return dict_hashes
+
+# '''
+#     Purpose - Function save_link_hashes(hash_path, dict_hashes, dict_shapes, metadata) writes a link hash table to disk as fixed-size binary records (Link_ID, hash, shape key). The table is written to a temporary file first and then moved into place.
+#               If metadata is given, it is written as a small JSON header in front of the records, so that the table remembers what it was saved with (such as the fingerprints of the HIFLD output and the FS lands layer, see incremental_update in HIFLD.pyt).
+#     Inputs - hash_path: The file pathway to the link hash table Ex) r'C:\Users\caitl\OneDrive\Documents\Tools\HIFLD_link_hashes.bin'.
+#              dict_hashes: A dictionary holding the hash of each Link_ID (see hash_link_rows(rows, dict_hashes)).
+#              dict_shapes: A dictionary holding the shape key of each Link_ID's road (see shape_key(coords, xy_tolerance)).
+#              metadata: A JSON-serializable dictionary, or None Ex) {'output': {'path': '...', 'fingerprint': {...}}}.
+#     Outputs - None
+# '''
+def save_link_hashes(hash_path, dict_hashes, dict_shapes, metadata=None):
+    temp_path = hash_path + '.tmp'
+    EMPTY = bytes(16)
+
+    with open(temp_path, 'wb') as outfile:
+        if metadata is not None:
+            header = json.dumps(metadata, sort_keys=True).encode('utf-8')
+            outfile.write(_LINK_HEADER_MAGIC + _LINK_HEADER_LENGTH.pack(len(header)) + header)
+        for link_id in sorted(dict_hashes):
+            outfile.write(_LINK_RECORD.pack(link_id, dict_hashes[link_id].to_bytes(16, 'little'), dict_shapes.get(link_id) or EMPTY))
+
+    os.replace(temp_path, hash_path)
+
+# '''
+#     Purpose - Function read_link_hash_header(data) splits the contents of a link hash table into its metadata header and its records. Tables written without metadata have no header.
+#     Inputs - data: The bytes of the link hash table.
+#     Outputs - metadata: The metadata dictionary, or an empty dictionary if there is no header.
+#               offset: The offset of the first record.
+# '''
+def read_link_hash_header(data):
+    if not data.startswith(_LINK_HEADER_MAGIC):
+        return {}, 0
+
+    start = len(_LINK_HEADER_MAGIC) + _LINK_HEADER_LENGTH.size
+    length, = _LINK_HEADER_LENGTH.unpack_from(data, len(_LINK_HEADER_MAGIC))
+    return json.loads(data[start:start + length].decode('utf-8')), start + length
+
+# '''
+#     Purpose - Function load_link_hashes(hash_path) reads a link hash table written by save_link_hashes(hash_path, dict_hashes, dict_shapes, metadata). If the file does not exist, empty dictionaries are returned.
+#     Inputs - hash_path: The file pathway to the link hash table.
+#     Outputs - dict_hashes: A dictionary holding the hash of each Link_ID.
+#               dict_shapes: A dictionary holding the shape key of each Link_ID's road.
+#               metadata: The metadata the table was saved with, or an empty dictionary.
+# '''
+def load_link_hashes(hash_path):
+    dict_hashes = {}
+    dict_shapes = {}
+
+    if not os.path.exists(hash_path):
+        return dict_hashes, dict_shapes, {}
+
+    with open(hash_path, 'rb') as infile:
+        data = infile.read()
+
+    metadata, offset = read_link_hash_header(data)
+    for link_id, digest, key in _LINK_RECORD.iter_unpack(memoryview(data)[offset:]):
+        link_id = int(link_id) if link_id.is_integer() else link_id
+        dict_hashes[link_id] = int.from_bytes(digest, 'little')
+        dict_shapes[link_id] = key
+
+    return dict_hashes, dict_shapes, metadata
+
+# '''
+#     Purpose - Function diff_link_hashes(dict_old, dict_new) compares the link hashes of the previous release to those of the new release.
+#     Inputs - dict_old: The link hashes of the previous release.
+#              dict_new: The link hashes of the new release.
+#     Outputs - set_added: The Link_IDs only found in the new release.
+#               set_removed: The Link_IDs only found in the previous release.
+#               set_changed: The Link_IDs found in both releases whose hash changed.
+# '''
+def diff_link_hashes(dict_old, dict_new):
+    set_added = dict_new.keys() - dict_old.keys()
+    set_removed = dict_old.keys() - dict_new.keys()
+    set_changed = {link_id for link_id, value in dict_new.items() if link_id in dict_old and dict_old[link_id] != value}
+
+    return set_added, set_removed, set_changed
+
+# '''
+#     Purpose - Function affected_links(set_links, dict_old_shapes, dict_new_shapes) adds the neighbouring links of a set of changed links: every link whose road has the same shape (in either release) as the road of a changed link.
+#               These links must be rebuilt together with the changed links, since the overlapping route type step of create_initial_roads decides which of the roads with the same shape are kept.
+#     Inputs - set_links: The Link_IDs that were added, removed, or changed.
+#              dict_old_shapes: The shape key of each Link_ID's road in the previous release.
+#              dict_new_shapes: The shape key of each Link_ID's road in the new release.
+#     Outputs - set_affected: The changed Link_IDs plus their neighbours.
+# '''
+def affected_links(set_links, dict_old_shapes, dict_new_shapes):
+    set_keys = set()
+
+    for link_id in set_links:
+        for dict_shapes in (dict_old_shapes, dict_new_shapes):
+            key = dict_shapes.get(link_id)
+            if key is not None:
+                set_keys.add(key)
+
+    set_affected = set(set_links)
+    for dict_shapes in (dict_old_shapes, dict_new_shapes):
+        for link_id, key in dict_shapes.items():
+            if key in set_keys:
+                set_affected.add(link_id)
+
+    return set_affected
+
+_NOT_DIGIT = re.compile(r'[^\d]+') # Everything except the digits
+_NOT_DIGIT_OR_DASH = re.compile(r'[^\d-]+') # Everything except the digits and '-'
+
+# '''
+#     Purpose - Function label_route(name) returns the BASENAME_ID value for a BASE_NAME value, following the rules of the labels stage of the HIFLD toolbox: every digit is kept, and if the name ends with '-ALT', every '-' in the name is replaced by an 'A' (so 'US-101-ALT' becomes 'A101A').
+#               A digit here is any character that int(char) accepts, which is the same set of characters that \d matches.
+#     Inputs - name: The BASE_NAME value Ex) 'SR-7-ALT'.
+#     Outputs - The BASENAME_ID value Ex) 'A7A'.
+# '''
+def label_route(name):
+    if name.endswith('-ALT'):
+        return _NOT_DIGIT_OR_DASH.sub('', name).replace('-', 'A')
+    return _NOT_DIGIT.sub('', name)
+
+# '''
+#     Purpose - Function label_routes(names, dict_labels) returns the BASENAME_ID values for a batch of BASE_NAME values. Route names repeat heavily, so each distinct name is only worked out once and then saved in dict_labels, which can be passed back in for the next batch.
+#     Inputs - names: Any iterable of BASE_NAME values. NULL (None) names are returned as None Ex) ['I-90', 'I-90', None].
+#              dict_labels: A dictionary of names that have already been worked out, or None to start a new one.
+#     Outputs - lst_labels: A list holding the BASENAME_ID value for each name Ex) ['90', '90', None].
+# '''
+def label_routes(names, dict_labels=None):
+    if dict_labels is None:
+        dict_labels = {}
+
+    lst_labels = []
+    for name in names:
+        label = dict_labels.get(name)
+        if label is None and name is not None:
+            label = dict_labels[name] = label_route(name)
+        lst_labels.append(label)
+
+    return lst_labels
+
+# '''
+#     Purpose - Function tile_grid(extent, tiles) lays a grid of about tiles square-ish cells over an extent, for splitting the roads into tiles that can be processed in parallel (see HIFLD_Parallel).
+#     Inputs - extent: The (xmin, ymin, xmax, ymax) extent of the roads Ex) (-125.0, 25.0, -67.0, 49.0).
+#              tiles: The number of tiles wanted Ex) 128.
+#     Outputs - grid: A (xmin, ymin, cell_width, cell_height, columns, rows) tuple Ex) (-125.0, 25.0, 3.222, 3.0, 18, 8).
+# '''
+def tile_grid(extent, tiles):
+    xmin, ymin, xmax, ymax = extent
+    width = max(xmax - xmin, 1e-9)
+    height = max(ymax - ymin, 1e-9)
+
+    columns = max(1, int(round(math.sqrt(tiles * width / height))))
+    rows = max(1, int(math.ceil(tiles / float(columns))))
+
+    return (xmin, ymin, width / columns, height / rows, columns, rows)
+
+# '''
+#     Purpose - Function tile_of(x, y, grid) returns the tile number of a point on a grid from tile_grid(extent, tiles). Points on or past the edge of the extent are placed in the nearest edge tile.
+#               Each road is placed in the tile of its centroid, so a road is only ever processed in one tile, and roads with an identical shape always land in the same tile.
+#     Inputs - x, y: The point Ex) -104.99, 39.74.
+#              grid: The grid Ex) (-125.0, 25.0, 3.222, 3.0, 18, 8).
+#     Outputs - The tile number, counted across the rows of the grid from the lower left Ex) 78.
+# '''
+def tile_of(x, y, grid):
+    xmin, ymin, cell_width, cell_height, columns, rows = grid
+
+    column = min(columns - 1, max(0, int((x - xmin) // cell_width)))
+    row = min(rows - 1, max(0, int((y - ymin) // cell_height)))
+
+    return row * columns + column
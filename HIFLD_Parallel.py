@@ -0,0 +1,93 @@
+'''
+Title: HIFLD Parallel
+Authors: Caitlin Hartig, Justine Jedlicka
+Date: October 2026
+
+This module holds the tile worker of the parallel mode of the HIFLD toolbox (HIFLD.pyt). In parallel mode, the joined roads are split into spatial tiles (see HIFLD_Engine.tile_grid), and each tile is run through the per-road steps of the four stages in its own process and its own scratch GDB:
+    - remove_duplicate_roads (DeleteIdentical and the duplicate shape resolver)
+    - add_attributes (join fields and Hierarchy from the shared link index of the column cache, without thinning)
+    - mark_inside_outside (with only the FS lands polygons that touch the roads of the tile)
+    - labels
+The toolbox then merges the tile outputs and runs ThinRoadNetwork once over the whole network.
+The worker lives in this module rather than in HIFLD.pyt, since the processes of a multiprocessing pool can only import .py modules. The worker loads HIFLD.pyt itself, so the tiles run exactly the same stage functions as a normal run.
+
+Libraries Utilized: arcpy, importlib, multiprocessing, os, sys, time
+'''
+
+import arcpy, importlib.machinery, importlib.util, multiprocessing, os, sys, time
+
+_toolbox = None # The HIFLD.pyt module, loaded once per worker process
+
+# '''
+#     Purpose - Function load_toolbox(toolbox_path) loads HIFLD.pyt as a Python module, so that a worker process can call its stage functions. The module is only loaded once per process.
+#     Inputs - toolbox_path: The file pathway to HIFLD.pyt Ex) r'C:\Users\caitl\OneDrive\Documents\Tools\HIFLD.pyt'.
+#     Outputs - The loaded module.
+# '''
+def load_toolbox(toolbox_path):
+    global _toolbox
+
+    if _toolbox is None:
+        loader = importlib.machinery.SourceFileLoader('HIFLD_Toolbox', toolbox_path)
+        spec = importlib.util.spec_from_loader('HIFLD_Toolbox', loader)
+        module = importlib.util.module_from_spec(spec)
+        loader.exec_module(module)
+        _toolbox = module
+
+    return _toolbox
+
+# '''
+#     Purpose - Function run_tile(args) runs one tile through the per-road steps of the four HIFLD stages in its own scratch GDB, and returns the tile output.
+#               Roads are placed in the tile of their centroid (see HIFLD_Engine.tile_of), so a road that straddles a tile edge is processed whole, in exactly one tile. The FS lands polygons are selected by the roads of the tile rather than by the tile square, so those roads are split against every polygon they touch.
+#     Inputs - args: A (tile_id, initial_roads, scratch_folder, link, link_attribute, status, fs_lands, cache_folder, toolbox_path) tuple, where initial_roads is the joined roads layer with its TILE_ID field populated.
+#     Outputs - A dictionary Ex) {'tile': 12, 'output': r'...\Tile_12\Tile_12.gdb\hifld_plus_gtac', 'roads': 25000, 'seconds': 41.2}.
+# '''
+def run_tile(args):
+    tile_id, initial_roads, scratch_folder, link, link_attribute, status, fs_lands, cache_folder, toolbox_path = args
+    start = time.perf_counter()
+    toolbox = load_toolbox(toolbox_path)
+    arcpy.env.overwriteOutput = True
+
+    # Each tile gets its own folder, so that the Processing.gdb of each stage does not clash with the other workers
+    tile_folder = os.path.join(scratch_folder, 'Tile_{0}'.format(tile_id))
+    if not os.path.isdir(tile_folder):
+        os.makedirs(tile_folder)
+    tile_gdb = os.path.join(tile_folder, 'Tile_{0}.gdb'.format(tile_id))
+    if not os.path.isdir(tile_gdb):
+        arcpy.management.CreateFileGDB(tile_folder, 'Tile_{0}.gdb'.format(tile_id), 'CURRENT')
+
+    tile_roads = os.path.join(tile_gdb, 'initial_roads')
+    arcpy.analysis.Select(initial_roads, tile_roads, 'TILE_ID = {0}'.format(tile_id))
+    count_roads = int(arcpy.management.GetCount(tile_roads)[0])
+
+    toolbox.remove_duplicate_roads(tile_gdb, tile_roads)
+    hifld_attributed = toolbox.add_attributes(tile_gdb, tile_roads, link, link_attribute, status, cache_folder, None, False)
+
+    fs_layer = arcpy.management.MakeFeatureLayer(fs_lands, 'fs_lands_{0}'.format(tile_id))
+    arcpy.management.SelectLayerByLocation(fs_layer, 'INTERSECT', hifld_attributed)
+    hifld_merged = toolbox.mark_inside_outside(tile_gdb, hifld_attributed, fs_layer)
+    arcpy.management.Delete(fs_layer)
+
+    output = toolbox.labels(tile_gdb, hifld_merged)
+
+    return {'tile': tile_id, 'output': output, 'roads': count_roads, 'seconds': time.perf_counter() - start}
+
+# '''
+#     Purpose - Function run_tiles(lst_args, workers, message) runs run_tile(args) for every tile in a pool of worker processes, and passes a progress line to message as each tile finishes. The largest tiles are started first, so that one big tile does not run on its own at the end.
+#     Inputs - lst_args: A list of run_tile argument tuples, each paired with its number of roads Ex) [(25000, (12, ...)), (1800, (13, ...))].
+#              workers: The number of worker processes Ex) 30.
+#              message: The function used to print progress Ex) arcpy.AddMessage.
+#     Outputs - lst_results: A list of run_tile result dictionaries, in tile order.
+# '''
+def run_tiles(lst_args, workers, message=print):
+    if sys.platform == 'win32': # Inside ArcGIS Pro, sys.executable is ArcGISPro.exe, so the workers must be started with the Python interpreter of the ArcGIS Pro environment
+        multiprocessing.set_executable(os.path.join(sys.exec_prefix, 'pythonw.exe'))
+
+    lst_args = [args for count, args in sorted(lst_args, key=lambda pair: -pair[0])]
+    lst_results = []
+
+    with multiprocessing.Pool(workers) as pool:
+        for result in pool.imap_unordered(run_tile, lst_args):
+            lst_results.append(result)
+            message('Tile {0} finished: {1} roads in {2:.1f} s ({3} of {4} tiles).'.format(result['tile'], result['roads'], result['seconds'], len(lst_results), len(lst_args)))
+
+    return sorted(lst_results, key=lambda result: result['tile'])
@@ -0,0 +1,620 @@
+'''
+Title: HIFLD Synthetic
+Authors: Caitlin Hartig, Justine Jedlicka
+Date: October 2026
+
+This module creates a synthetic stand-in for the HERE Full Transportation Dataset, so that the HIFLD toolbox (HIFLD.pyt) can be measured at production size on any machine, including a Linux machine without an ArcGIS license.
+The generate_dataset(path, size) function writes the Streets, StreetAddress, Link, LinkAttribute, and Status tables, plus an FS_Lands table, into a single SQLite file. The values follow the mix found in the real data: most roads have a NULL route type, most roads are function class 5 and paved, and a share of the roads have the same shape as another road.
+The module also holds pure-Python versions of the four HIFLD stages (create_initial_roads, add_attributes, mark_inside_outside, labels). They read and write the SQLite tables in place of the geodatabase, use the same HIFLD_Engine functions as the toolbox, and time each of their steps with Toolbox_Instrumentation.
+Shapes are saved as binary blobs (see pack_shape(lst_parts)).
+The split_tiles and run_tiles functions are the pure-Python version of the parallel mode of the toolbox: the dataset is split into one file per spatial tile, and the four stages run on the tiles in a pool of worker processes.
+
+The Generalization field is populated by the native road thinning engine (see HIFLD_Thin) in place of the ThinRoadNetwork tool.
+
+Libraries Utilized: datetime, math, multiprocessing, os, random, sqlite3, struct, time, numpy, HIFLD_Engine, HIFLD_Thin, Toolbox_Instrumentation (and HIFLD_Chunked for chunked mode)
+'''
+
+import datetime, math, multiprocessing, os, random, sqlite3, struct, time
+import HIFLD_Engine, Toolbox_Instrumentation
+
+EXTENT = (-125.0, 25.0, -67.0, 49.0) # The area the synthetic roads and FS lands are placed in (roughly the lower 48 states, in decimal degrees)
+
+# The (value, weight) mix used for each attribute. None stands for NULL.
+ROUTE_TYPES = [(None, 85), (1, 1), (2, 2), (3, 4), (4, 5), (5, 2), (6, 1)]
+FUNC_CLASSES = [(1, 1), (2, 3), (3, 8), (4, 18), (5, 69), (None, 1)]
+PAVED = [('Y', 89), ('N', 10), (None, 1)]
+ACCESS_IDS = [(4, 90), (32, 3), (34, 2), (290, 2), (623, 1), (999, 1), (None, 1)]
+STATUS_IDS = [(2, 80), (33, 6), (37, 6), (41, 7), (None, 1)]
+POI_ACCESS = [('N', 96), ('Y', 3), (None, 1)]
+EXPANDED_INCLUSION = [(None, 90), (1, 6), (9, 2), (12, 2)]
+URBAN = {2: 'N', 33: 'Y', 37: 'N', 41: 'Y'} # The Status table: URBAN value for each STATUS_ID
+ROUTE_PREFIXES = {1: 'I-', 2: 'US-', 3: 'SR-', 4: 'CR-'}
+STREET_NAMES = ['MAIN ST', 'OAK AVE', 'FOREST RD', 'RIVER RD', 'PINE ST', 'MILL CREEK RD', 'LAKE DR', 'RIDGE TRL']
+
+# '''
+#     Purpose - Function pack_shape(lst_parts) packs a polyline or polygon into a binary blob: the number of parts, then for each part the number of vertices followed by the x, y values as doubles.
+#     Inputs - lst_parts: A list of parts, each a list of (x, y) tuples Ex) [[(0.0, 5.0), (3.0, 5.0)]].
+#     Outputs - The shape as bytes.
+# '''
+def pack_shape(lst_parts):
+    lst_bytes = [struct.pack('<I', len(lst_parts))]
+
+    for part in lst_parts:
+        lst_bytes.append(struct.pack('<I', len(part)))
+        lst_bytes.append(struct.pack('<{0}d'.format(2 * len(part)), *[value for pnt in part for value in pnt]))
+
+    return b''.join(lst_bytes)
+
+# '''
+#     Purpose - Function unpack_shape(blob) reverses pack_shape(lst_parts).
+#     Inputs - blob: The shape as bytes.
+#     Outputs - lst_parts: A list of parts, each a list of (x, y) tuples.
+# '''
+def unpack_shape(blob):
+    lst_parts = []
+    count_parts = struct.unpack_from('<I', blob, 0)[0]
+    offset = 4
+
+    for index in range(count_parts):
+        count = struct.unpack_from('<I', blob, offset)[0]
+        values = struct.unpack_from('<{0}d'.format(2 * count), blob, offset + 4)
+        lst_parts.append(list(zip(values[0::2], values[1::2])))
+        offset += 4 + 16 * count
+
+    return lst_parts
+
+def _picker(lst_weights):
+    lst_values = [value for value, weight in lst_weights]
+    lst_cum = []
+    total = 0
+    for value, weight in lst_weights:
+        total += weight
+        lst_cum.append(total)
+
+    return lambda rng: rng.choices(lst_values, cum_weights=lst_cum)[0]
+
+# '''
+#     Purpose - Function synthetic_polygons(count, vertices, extent, seed) creates a list of synthetic star-shaped polygon rings, as a stand-in for the FS lands.
+#     Inputs - count: The number of polygons Ex) 200.
+#              vertices: The number of vertices in each polygon Ex) 500.
+#              extent: The (xmin, ymin, xmax, ymax) area the polygons are placed in Ex) (-125.0, 25.0, -67.0, 49.0).
+#              seed: The random seed Ex) 0.
+#     Outputs - lst_rings: A list of rings, each a list of (x, y) tuples.
+# '''
+def synthetic_polygons(count, vertices, extent=EXTENT, seed=0):
+    rng = random.Random(seed)
+    lst_rings = []
+
+    for index in range(count):
+        cx = rng.uniform(extent[0], extent[2])
+        cy = rng.uniform(extent[1], extent[3])
+        radius = rng.uniform(0.2, 1.5)
+        ring = []
+        for step in range(vertices):
+            angle = 2 * math.pi * step / vertices
+            r = radius * rng.uniform(0.6, 1.0)
+            ring.append((cx + r * math.cos(angle), cy + r * math.sin(angle)))
+        lst_rings.append(ring)
+
+    return lst_rings
+
+# '''
+#     Purpose - Function base_name(rng, route_type) creates a synthetic BASE_NAME value. Route types 1-4 get a route number (with an occasional '-ALT' suffix or a NULL name), and the remaining roads get a street name.
+# '''
+def base_name(rng, route_type):
+    if rng.random() < 0.03:
+        return None
+    if route_type in ROUTE_PREFIXES:
+        name = '{0}{1}'.format(ROUTE_PREFIXES[route_type], rng.randint(1, 999))
+        if rng.random() < 0.02:
+            name += '-ALT'
+        return name
+    return rng.choice(STREET_NAMES)
+
+# '''
+#     Purpose - Function open_dataset(path) opens (or creates) a synthetic dataset file. Journaling is turned off, since the file is scratch data that can always be generated again.
+#     Inputs - path: The file pathway to the SQLite file Ex) r'C:\Users\caitl\OneDrive\Documents\Tools\HERE_synthetic_100000.sqlite'.
+#     Outputs - conn: The sqlite3 connection.
+# '''
+def open_dataset(path):
+    conn = sqlite3.connect(path)
+    conn.execute('PRAGMA journal_mode = OFF')
+    conn.execute('PRAGMA synchronous = OFF')
+    conn.execute('PRAGMA cache_size = -262144') # 256 MB page cache
+    return conn
+
+# '''
+#     Purpose - Function generate_dataset(path, size, duplicate_rate, seed, batch_size, fs_polygons, fs_vertices) writes a synthetic HERE dataset with size roads into a new SQLite file. Rows are written in batches, so that tens of millions of roads can be created without holding them all in memory.
+#               Roughly duplicate_rate of the roads copy the shape of a recent road, half of them with the same route type (removed by DeleteIdentical) and half with a different one (resolved by the route type priority).
+#     Inputs - path: The file pathway to the SQLite file. An existing file is replaced Ex) r'C:\Users\caitl\OneDrive\Documents\Tools\HERE_synthetic_100000.sqlite'.
+#              size: The number of roads in the Streets table Ex) 100000.
+#              duplicate_rate: The fraction of roads that copy the shape of a recent road Ex) 0.05.
+#              seed: The random seed, so that the same file is created each time Ex) 0.
+#              batch_size: The number of roads written at a time Ex) 100000.
+#              fs_polygons: The number of FS lands polygons Ex) 200.
+#              fs_vertices: The number of vertices in each FS lands polygon Ex) 500.
+#     Outputs - dict_counts: The number of rows written to each table Ex) {'Streets': 100000, 'StreetAddress': 81000, ...}.
+# '''
+def generate_dataset(path, size, duplicate_rate=0.05, seed=0, batch_size=100000, fs_polygons=200, fs_vertices=500):
+    if os.path.exists(path):
+        os.remove(path)
+
+    rng = random.Random(seed)
+    pick_route_type = _picker(ROUTE_TYPES)
+    pick_func_class = _picker(FUNC_CLASSES)
+    pick_paved = _picker(PAVED)
+    pick_access_id = _picker(ACCESS_IDS)
+    pick_status_id = _picker(STATUS_IDS)
+    pick_poi_access = _picker(POI_ACCESS)
+    pick_expanded_inclusion = _picker(EXPANDED_INCLUSION)
+
+    conn = open_dataset(path)
+    conn.execute('CREATE TABLE Streets (OBJECTID INTEGER PRIMARY KEY, Link_ID INTEGER, ROUTE_TYPE INTEGER, FuncClass INTEGER, Paved TEXT, BASE_NAME TEXT, Shape BLOB)')
+    conn.execute('CREATE TABLE StreetAddress (OBJECTID INTEGER PRIMARY KEY, LINK_ID INTEGER, ADDR_TYPE TEXT, L_REFADDR INTEGER, R_REFADDR INTEGER)')
+    conn.execute('CREATE TABLE Link (OBJECTID INTEGER PRIMARY KEY, LINK_ID INTEGER, ACCESS_ID INTEGER, STATUS_ID INTEGER, POI_ACCESS TEXT)')
+    conn.execute('CREATE TABLE LinkAttribute (OBJECTID INTEGER PRIMARY KEY, LINK_ID INTEGER, EXPANDED_INCLUSION INTEGER)')
+    conn.execute('CREATE TABLE Status (OBJECTID INTEGER PRIMARY KEY, STATUS_ID INTEGER, URBAN TEXT)')
+    conn.execute('CREATE TABLE FS_Lands (OBJECTID INTEGER PRIMARY KEY, Shape BLOB)')
+
+    dict_counts = {'Streets': 0, 'StreetAddress': 0, 'Link': 0, 'LinkAttribute': 0, 'Status': 0, 'FS_Lands': 0}
+    lst_recent = [] # The most recent shapes and route types, which later roads can copy. Kept short so that memory does not grow with the size.
+    RECENT = 10000
+    link_id = 0
+
+    for batch_start in range(0, size, batch_size):
+        lst_streets, lst_address, lst_link, lst_link_attribute = [], [], [], []
+
+        for index in range(batch_start, min(size, batch_start + batch_size)):
+            link_id += 1
+
+            if len(lst_recent) != 0 and rng.random() < duplicate_rate:
+                shape, recent_route_type = lst_recent[rng.randrange(len(lst_recent))]
+                route_type = recent_route_type if rng.random() < 0.5 else pick_route_type(rng)
+            else:
+                x = rng.uniform(EXTENT[0], EXTENT[2])
+                y = rng.uniform(EXTENT[1], EXTENT[3])
+                shape = pack_shape([[(x + 0.002 * step, y + 0.001 * rng.random()) for step in range(rng.randint(2, 6))]])
+                route_type = pick_route_type(rng)
+
+            if len(lst_recent) < RECENT:
+                lst_recent.append((shape, route_type))
+            else:
+                lst_recent[index % RECENT] = (shape, route_type)
+
+            lst_streets.append((link_id, route_type, pick_func_class(rng), pick_paved(rng), base_name(rng, route_type), shape))
+
+            for count in range(rng.choices([0, 1, 2], cum_weights=[30, 90, 100])[0]): # Most links have one address range, some have none or two
+                lst_address.append((link_id, rng.choice(['B', 'I']), rng.randint(1, 9999), rng.randint(1, 9999)))
+
+            lst_link.append((link_id, pick_access_id(rng), pick_status_id(rng), pick_poi_access(rng)))
+
+            if rng.random() < 0.5:
+                lst_link_attribute.append((link_id, pick_expanded_inclusion(rng)))
+
+        conn.executemany('INSERT INTO Streets (Link_ID, ROUTE_TYPE, FuncClass, Paved, BASE_NAME, Shape) VALUES (?, ?, ?, ?, ?, ?)', lst_streets)
+        conn.executemany('INSERT INTO StreetAddress (LINK_ID, ADDR_TYPE, L_REFADDR, R_REFADDR) VALUES (?, ?, ?, ?)', lst_address)
+        conn.executemany('INSERT INTO Link (LINK_ID, ACCESS_ID, STATUS_ID, POI_ACCESS) VALUES (?, ?, ?, ?)', lst_link)
+        conn.executemany('INSERT INTO LinkAttribute (LINK_ID, EXPANDED_INCLUSION) VALUES (?, ?)', lst_link_attribute)
+        conn.commit()
+
+        dict_counts['Streets'] += len(lst_streets)
+        dict_counts['StreetAddress'] += len(lst_address)
+        dict_counts['Link'] += len(lst_link)
+        dict_counts['LinkAttribute'] += len(lst_link_attribute)
+
+    conn.executemany('INSERT INTO Status (STATUS_ID, URBAN) VALUES (?, ?)', sorted(URBAN.items()))
+    dict_counts['Status'] = len(URBAN)
+
+    lst_rings = synthetic_polygons(fs_polygons, fs_vertices, seed=seed)
+    conn.executemany('INSERT INTO FS_Lands (Shape) VALUES (?)', [(pack_shape([ring]),) for ring in lst_rings])
+    dict_counts['FS_Lands'] = len(lst_rings)
+
+    conn.commit()
+    conn.close()
+
+    return dict_counts
+
+# '''
+#     Purpose - Function row_counter(conn) returns a function that counts the rows of a table in the synthetic dataset, for use as the Toolbox_Instrumentation row_counter.
+# '''
+def row_counter(conn):
+    def count(table):
+        try:
+            return conn.execute('SELECT COUNT(*) FROM "{0}"'.format(table)).fetchone()[0]
+        except sqlite3.Error:
+            return None
+    return count
+
+# '''
+#     Purpose - Function table_columns(conn, table) returns a list of (column name, declared type) tuples for a table.
+# '''
+def table_columns(conn, table):
+    return [(row[1], row[2]) for row in conn.execute('PRAGMA table_info("{0}")'.format(table))]
+
+# '''
+#     Purpose - Function read_batches(conn, table, fields, where, batch_size) reads a table in OBJECTID order, one batch at a time, so that the table can be updated between batches without holding every row in memory.
+#     Inputs - conn: The sqlite3 connection.
+#              table: The name of the table Ex) 'initial_roads'.
+#              fields: A list of field names to read. The OBJECTID is always read first Ex) ['Link_ID'].
+#              where: An optional where-clause Ex) 'ROUTE_TYPE IN (1, 2, 3, 4)'.
+#              batch_size: The number of rows in each batch Ex) 100000.
+#     Outputs - Yields lists of (OBJECTID, field values...) tuples.
+# '''
+def read_batches(conn, table, fields, where=None, batch_size=100000):
+    last_oid = -1
+    sql = 'SELECT OBJECTID, {0} FROM "{1}" WHERE OBJECTID > ?{2} ORDER BY OBJECTID LIMIT {3}'.format(', '.join('"{0}"'.format(name) for name in fields), table, '' if where is None else ' AND ({0})'.format(where), batch_size)
+
+    while True:
+        rows = conn.execute(sql, (last_oid,)).fetchall()
+        if len(rows) == 0:
+            return
+        yield rows
+        last_oid = rows[-1][0]
+
+# '''
+#     Purpose - Function copy_table(conn, source, target, where) is the stand-in for CopyFeatures. It creates the target table with the same columns as the source table and copies the rows across, keeping the OBJECTID values.
+#     Inputs - conn: The sqlite3 connection.
+#              source: The name of the table to copy Ex) 'hifld_merged'.
+#              target: The name of the new table. An existing table is replaced Ex) 'hifld_plus_gtac'.
+#              where: An optional where-clause that limits the rows copied Ex) 'ROUTE_TYPE IN (1, 2, 3, 4)'.
+# '''
+def copy_table(conn, source, target, where=None):
+    lst_columns = table_columns(conn, source)
+    conn.execute('DROP TABLE IF EXISTS "{0}"'.format(target))
+    conn.execute('CREATE TABLE "{0}" ({1})'.format(target, ', '.join('OBJECTID INTEGER PRIMARY KEY' if name == 'OBJECTID' else '"{0}" {1}'.format(name, kind) for name, kind in lst_columns)))
+    str_columns = ', '.join('"{0}"'.format(name) for name, kind in lst_columns)
+    conn.execute('INSERT INTO "{0}" ({1}) SELECT {1} FROM "{2}"{3}'.format(target, str_columns, source, '' if where is None else ' WHERE ' + where))
+    conn.commit()
+
+# '''
+#     Purpose - Function create_initial_roads(conn) is the pure-Python version of the create_initial_roads stage of the HIFLD toolbox.
+#               It joins the StreetAddress table into the Streets table (one to many, keeping all streets) to create the initial_roads table, removes records with identical shape and route type, and then removes overlapping route types with HIFLD_Engine.resolve_duplicate_shapes, or in chunked mode with HIFLD_Chunked.ShapeStore.
+#     Inputs - conn: The sqlite3 connection to the synthetic dataset.
+#              budget_mb: The memory budget in MB for chunked mode, or None to resolve all roads at once Ex) 64.
+#     Outputs - initial_roads: The name of the new table Ex) 'initial_roads'.
+# '''
+def create_initial_roads(conn, budget_mb=None):
+    initial_roads = 'initial_roads'
+
+    # Step 1 - Join Streets and StreetAddress together (stand-in for AddJoin + CopyFeatures)
+    with Toolbox_Instrumentation.stage('AddJoin + CopyFeatures', inputs=['Streets', 'StreetAddress'], outputs=[initial_roads]):
+        conn.execute('DROP TABLE IF EXISTS {0}'.format(initial_roads))
+        conn.execute('CREATE TABLE {0} (OBJECTID INTEGER PRIMARY KEY, Link_ID INTEGER, ROUTE_TYPE INTEGER, FuncClass INTEGER, Paved TEXT, BASE_NAME TEXT, ADDR_TYPE TEXT, L_REFADDR INTEGER, R_REFADDR INTEGER, Shape BLOB)'.format(initial_roads))
+        conn.execute('CREATE INDEX IF NOT EXISTS StreetAddress_LINK_ID ON StreetAddress (LINK_ID)')
+        conn.execute('INSERT INTO {0} (Link_ID, ROUTE_TYPE, FuncClass, Paved, BASE_NAME, ADDR_TYPE, L_REFADDR, R_REFADDR, Shape) SELECT s.Link_ID, s.ROUTE_TYPE, s.FuncClass, s.Paved, s.BASE_NAME, a.ADDR_TYPE, a.L_REFADDR, a.R_REFADDR, s.Shape FROM Streets s LEFT JOIN StreetAddress a ON s.Link_ID = a.LINK_ID ORDER BY s.OBJECTID, a.OBJECTID'.format(initial_roads))
+        conn.commit()
+
+    # Step 2 - Delete Identical based on Shape and ROUTE_TYPE. The first record of each group is kept.
+    with Toolbox_Instrumentation.stage('DeleteIdentical', inputs=[initial_roads], outputs=[initial_roads]):
+        conn.execute('DELETE FROM {0} WHERE OBJECTID NOT IN (SELECT MIN(OBJECTID) FROM {0} GROUP BY Shape, ROUTE_TYPE)'.format(initial_roads))
+        conn.commit()
+
+    # Step 3 - Remove overlapping route types with 1 as the priority and so forth until 4
+    if budget_mb is not None:
+        resolve_duplicate_shapes_chunked(conn, initial_roads, budget_mb)
+        return initial_roads
+
+    with Toolbox_Instrumentation.stage('Resolve duplicate shapes', inputs=[initial_roads]):
+        cursor = conn.execute('SELECT OBJECTID, ROUTE_TYPE, Shape FROM {0} WHERE ROUTE_TYPE IS NOT NULL'.format(initial_roads))
+        rows = ((row[0], row[1], unpack_shape(row[2])[0]) for row in cursor)
+        set_del, count_shapes = HIFLD_Engine.resolve_duplicate_shapes(rows)
+
+    with Toolbox_Instrumentation.stage('Delete overlapping route types', outputs=[initial_roads]):
+        for clause in HIFLD_Engine.oid_where_clauses('OBJECTID', set_del):
+            conn.execute('DELETE FROM {0} WHERE {1}'.format(initial_roads, clause))
+        conn.commit()
+
+    return initial_roads
+
+# '''
+#     Purpose - Function resolve_duplicate_shapes_chunked(conn, initial_roads, budget_mb) is the pure-Python version of resolve_duplicate_shapes_chunked in the HIFLD toolbox. The roads are read one OBJECTID range at a time, and their shape keys are added to an HIFLD_Chunked.ShapeStore saved next to the synthetic dataset.
+#     Inputs - conn: The sqlite3 connection to the synthetic dataset.
+#              initial_roads: The name of the initial_roads table Ex) 'initial_roads'.
+#              budget_mb: The memory budget in MB Ex) 64.
+#     Outputs - count_shapes: The number of shapes that were shared by more than one record.
+# '''
+def resolve_duplicate_shapes_chunked(conn, initial_roads, budget_mb):
+    import numpy as np
+    import HIFLD_Chunked
+
+    dataset_path = conn.execute('PRAGMA database_list').fetchone()[2]
+    store = HIFLD_Chunked.ShapeStore(os.path.splitext(dataset_path)[0] + '_shapes.sqlite', budget_mb / 4.0)
+
+    with Toolbox_Instrumentation.stage('Resolve duplicate shapes (chunked)', inputs=[initial_roads]):
+        oids = np.array([row[0] for row in conn.execute('SELECT OBJECTID FROM {0} WHERE ROUTE_TYPE IS NOT NULL'.format(initial_roads))], dtype=np.int64)
+        lst_ranges = HIFLD_Chunked.id_ranges(oids, HIFLD_Chunked.rows_per_chunk(budget_mb, HIFLD_Chunked.DEDUP_BYTES_PER_ROW, minimum=1000))
+        del oids
+
+        for low, high in lst_ranges:
+            rows = conn.execute('SELECT OBJECTID, ROUTE_TYPE, Shape FROM {0} WHERE {1} AND ROUTE_TYPE IS NOT NULL'.format(initial_roads, HIFLD_Chunked.range_clause('OBJECTID', low, high))).fetchall()
+            store.add([row[0] for row in rows], [row[1] for row in rows], [HIFLD_Engine.shape_key(unpack_shape(row[2])[0]) for row in rows])
+            del rows
+
+        count_deleted, count_shapes = store.resolve()
+
+    with Toolbox_Instrumentation.stage('Delete overlapping route types', outputs=[initial_roads]):
+        for oids in store.deleted_batches():
+            for clause in HIFLD_Engine.oid_where_clauses('OBJECTID', oids.tolist()):
+                conn.execute('DELETE FROM {0} WHERE {1}'.format(initial_roads, clause))
+        conn.commit()
+
+    store.close()
+
+    return count_shapes
+
+# '''
+#     Purpose - Function add_attributes(conn, initial_roads, thin) is the pure-Python version of the add_attributes stage of the HIFLD toolbox.
+#               It adds the ACCESS_ID, STATUS_ID, POI_ACCESS, EXPANDED_INCLUSION, URBAN, Heirarchy, and Generalization fields, populates them from in-memory lookups, classifies the Hierarchy field, and copies the roads that are not extraneous into the hifld_attributed table.
+#               Finally, the Generalization field is populated with the native road thinning engine at 3,000 m (see HIFLD_Thin.RoadGraph).
+#     Inputs - conn: The sqlite3 connection to the synthetic dataset.
+#              initial_roads: The name of the initial_roads table Ex) 'initial_roads'.
+#              thin: False to leave the Generalization field NULL, for example when only one tile of the network is attributed.
+#     Outputs - hifld_attributed: The name of the new table Ex) 'hifld_attributed'.
+# '''
+def add_attributes(conn, initial_roads, thin=True):
+    hifld_attributed = 'hifld_attributed'
+
+    # Step 1 - Add Fields
+    lst_fields = [('ACCESS_ID', 'INTEGER'), ('STATUS_ID', 'INTEGER'), ('POI_ACCESS', 'TEXT'), ('EXPANDED_INCLUSION', 'INTEGER'), ('URBAN', 'TEXT'), ('Heirarchy', 'INTEGER'), ('Generalization', 'INTEGER')]
+    lst_existing = [name.upper() for name, kind in table_columns(conn, initial_roads)]
+    for name, kind in lst_fields:
+        if name.upper() not in lst_existing:
+            conn.execute('ALTER TABLE {0} ADD COLUMN {1} {2}'.format(initial_roads, name, kind))
+
+    # Step 2 - Load the Link, LinkAttribute, and Status tables into memory
+    with Toolbox_Instrumentation.stage('Load lookups', inputs=['Link', 'LinkAttribute', 'Status']):
+        dict_link = HIFLD_Engine.build_lookup(conn.execute('SELECT LINK_ID, ACCESS_ID, STATUS_ID, POI_ACCESS FROM Link'))
+        dict_link_attribute = HIFLD_Engine.build_lookup(conn.execute('SELECT LINK_ID, EXPANDED_INCLUSION FROM LinkAttribute'))
+        dict_status = HIFLD_Engine.build_lookup(conn.execute('SELECT STATUS_ID, URBAN FROM Status'))
+
+    # Step 3 - Populate the join fields in a single pass
+    with Toolbox_Instrumentation.stage('Populate join fields', inputs=[initial_roads]):
+        for rows in read_batches(conn, initial_roads, ['Link_ID']):
+            conn.executemany('UPDATE {0} SET ACCESS_ID = ?, STATUS_ID = ?, POI_ACCESS = ?, EXPANDED_INCLUSION = ?, URBAN = ? WHERE OBJECTID = ?'.format(initial_roads), (HIFLD_Engine.enrich_row(link_id, dict_link, dict_link_attribute, dict_status) + (oid,) for oid, link_id in rows))
+        conn.commit()
+        del dict_link, dict_link_attribute, dict_status
+
+    # Step 4 - Populate the Hierarchy field
+    with Toolbox_Instrumentation.stage('Populate Heirarchy', inputs=[initial_roads]):
+        dict_heirarchy = HIFLD_Engine.heirarchy_by_link(conn.execute('SELECT Link_ID, ROUTE_TYPE, FuncClass, Paved, URBAN FROM {0}'.format(initial_roads)))
+        for rows in read_batches(conn, initial_roads, ['Link_ID']):
+            conn.executemany('UPDATE {0} SET Heirarchy = ? WHERE OBJECTID = ?'.format(initial_roads), ((dict_heirarchy.get(link_id), oid) for oid, link_id in rows))
+        conn.commit()
+        del dict_heirarchy
+
+    # Step 5 - Delete extraneous roads / features (stand-in for SelectLayerByAttribute with INVERT + CopyFeatures)
+    with Toolbox_Instrumentation.stage('SelectLayerByAttribute + CopyFeatures', inputs=[initial_roads], outputs=[hifld_attributed]):
+        query = "(ACCESS_ID IN (290) AND STATUS_ID IN (41)) OR (ACCESS_ID IN (34, 623, 999) AND STATUS_ID IN (33, 37)) OR ACCESS_ID = 32 OR EXPANDED_INCLUSION IN (12, 9) OR POI_ACCESS = 'Y'"
+        copy_table(conn, initial_roads, hifld_attributed, 'OBJECTID NOT IN (SELECT OBJECTID FROM {0} WHERE {1})'.format(initial_roads, query))
+
+    # Step 6 - Populate the Generalization field (stand-in for ThinRoadNetwork)
+    if thin:
+        MIN_LENGTH = 3000 # meters
+        with Toolbox_Instrumentation.stage('Native road thinning', inputs=[hifld_attributed]):
+            thin_roads(conn, hifld_attributed, MIN_LENGTH)
+
+    return hifld_attributed
+
+# '''
+#     Purpose - Function thin_roads(conn, table, min_length) is the pure-Python version of thin_roads in the HIFLD toolbox. It loads the first and last point, length, and Hierarchy value of every road into an HIFLD_Thin.RoadGraph and writes the Generalization value of each road: 0 for visible roads and 1 for invisible roads.
+#     Inputs - conn: The sqlite3 connection to the synthetic dataset.
+#              table: The name of the roads table Ex) 'hifld_attributed'.
+#              min_length: The minimum length in meters for a road to stay visible Ex) 3000.
+#     Outputs - count_hidden: The number of roads marked invisible.
+# '''
+def thin_roads(conn, table, min_length):
+    import HIFLD_Thin
+
+    lst_oids, lst_start, lst_end, lst_lengths, lst_heirarchy = [], [], [], [], []
+    for rows in read_batches(conn, table, ['Heirarchy', 'Shape']):
+        for oid, heirarchy, shape in rows:
+            coords = [coord for part in unpack_shape(shape) for coord in part + [None]][:-1]
+            lst_oids.append(oid)
+            lst_start.append(coords[0])
+            lst_end.append(coords[-1])
+            lst_lengths.append(HIFLD_Thin.road_length(coords))
+            lst_heirarchy.append(-1 if heirarchy is None else heirarchy)
+
+    if len(lst_oids) == 0:
+        return 0
+
+    generalization = HIFLD_Thin.RoadGraph(lst_start, lst_end, lst_lengths, lst_heirarchy).thin(min_length).tolist()
+    conn.executemany('UPDATE {0} SET Generalization = ? WHERE OBJECTID = ?'.format(table), zip(generalization, lst_oids))
+    conn.commit()
+
+    return sum(generalization)
+
+# '''
+#     Purpose - Function mark_inside_outside(conn, hifld_attributed) is the pure-Python version of the mark_inside_outside stage of the HIFLD toolbox.
+#               It builds an HIFLD_Engine.PolygonGridIndex over the FS_Lands table, splits each road into its inside and outside parts, and writes the parts into the hifld_merged table with a Minus_ID value of 'In FS' or 'Out FS'.
+#     Inputs - conn: The sqlite3 connection to the synthetic dataset.
+#              hifld_attributed: The name of the hifld_attributed table Ex) 'hifld_attributed'.
+#     Outputs - hifld_merged: The name of the new table Ex) 'hifld_merged'.
+# '''
+def mark_inside_outside(conn, hifld_attributed):
+    hifld_merged = 'hifld_merged'
+
+    # Step 1 - Build a spatial index over the FS lands
+    with Toolbox_Instrumentation.stage('Build FS lands index', inputs=['FS_Lands']):
+        lst_rings = []
+        for row in conn.execute('SELECT Shape FROM FS_Lands'):
+            lst_rings.extend(unpack_shape(row[0]))
+        index = HIFLD_Engine.PolygonGridIndex(lst_rings)
+        del lst_rings
+
+    # Step 2 - Create the hifld_merged table with the same fields as the hifld_attributed table, plus the 'Minus_ID' field
+    lst_fields = [name for name, kind in table_columns(conn, hifld_attributed) if name not in ('OBJECTID', 'Shape')]
+    conn.execute('DROP TABLE IF EXISTS {0}'.format(hifld_merged))
+    conn.execute('CREATE TABLE {0} (OBJECTID INTEGER PRIMARY KEY, {1}, Minus_ID TEXT, Shape BLOB)'.format(hifld_merged, ', '.join('"{0}" {1}'.format(name, kind) for name, kind in table_columns(conn, hifld_attributed) if name in lst_fields)))
+
+    index_route_type = lst_fields.index('ROUTE_TYPE')
+    index_func_class = lst_fields.index('FuncClass')
+    index_paved = lst_fields.index('Paved')
+
+    # Step 3 - Split each road into its inside and outside parts
+    with Toolbox_Instrumentation.stage('Split roads inside / outside', inputs=[hifld_attributed], outputs=[hifld_merged]):
+        insert = 'INSERT INTO {0} ({1}, Minus_ID, Shape) VALUES ({2})'.format(hifld_merged, ', '.join('"{0}"'.format(name) for name in lst_fields), ', '.join(['?'] * (len(lst_fields) + 2)))
+        lst_batch = []
+
+        for row in conn.execute('SELECT {0}, Shape FROM {1}'.format(', '.join('"{0}"'.format(name) for name in lst_fields), hifld_attributed)):
+            attributes = row[:-1]
+            lst_inside, lst_outside = HIFLD_Engine.split_inside_outside(unpack_shape(row[-1])[0], index)
+
+            if len(lst_inside) != 0 and HIFLD_Engine.keep_inside_road(attributes[index_route_type], attributes[index_func_class], attributes[index_paved]):
+                lst_batch.append(attributes + ('In FS', pack_shape(lst_inside)))
+
+            if len(lst_outside) != 0:
+                lst_batch.append(attributes + ('Out FS', pack_shape(lst_outside)))
+
+            if len(lst_batch) >= 100000:
+                conn.executemany(insert, lst_batch)
+                lst_batch = []
+
+        conn.executemany(insert, lst_batch)
+        conn.commit()
+
+    return hifld_merged
+
+# '''
+#     Purpose - Function labels(conn, hifld_merged) is the pure-Python version of the labels stage of the HIFLD toolbox. It copies the hifld_merged table into the hifld_plus_gtac table and populates the BASENAME_ID field for route types 1-4.
+#     Inputs - conn: The sqlite3 connection to the synthetic dataset.
+#              hifld_merged: The name of the hifld_merged table Ex) 'hifld_merged'.
+#     Outputs - hifld_plus_gtac: The name of the new table Ex) 'hifld_plus_gtac'.
+# '''
+def labels(conn, hifld_merged):
+    hifld_plus_gtac = 'hifld_plus_gtac'
+
+    with Toolbox_Instrumentation.stage('CopyFeatures', inputs=[hifld_merged], outputs=[hifld_plus_gtac]):
+        copy_table(conn, hifld_merged, hifld_plus_gtac)
+        conn.execute('ALTER TABLE {0} ADD COLUMN BASENAME_ID TEXT'.format(hifld_plus_gtac))
+
+    with Toolbox_Instrumentation.stage('Populate BASENAME_ID', inputs=[hifld_plus_gtac]):
+        dict_labels = {} # Holds the BASENAME_ID value of each distinct BASE_NAME value, across batches
+        for rows in read_batches(conn, hifld_plus_gtac, ['BASE_NAME'], 'ROUTE_TYPE IN (1, 2, 3, 4) AND BASE_NAME IS NOT NULL'):
+            lst_labels = HIFLD_Engine.label_routes((name for oid, name in rows), dict_labels)
+            conn.executemany('UPDATE {0} SET BASENAME_ID = ? WHERE OBJECTID = ?'.format(hifld_plus_gtac), ((label, row[0]) for label, row in zip(lst_labels, rows)))
+        conn.commit()
+
+    return hifld_plus_gtac
+
+# '''
+#     Purpose - Function run_pipeline(conn, budget_mb, thin) runs the four stages in order, timing each stage with Toolbox_Instrumentation.
+#     Inputs - conn: The sqlite3 connection to the synthetic dataset.
+#              budget_mb: The memory budget in MB for chunked mode, or None to run every stage on all roads at once Ex) 64.
+#              thin: False to leave the Generalization field NULL (see add_attributes(conn, initial_roads, thin)).
+#     Outputs - hifld_plus_gtac: The name of the final table Ex) 'hifld_plus_gtac'.
+# '''
+def run_pipeline(conn, budget_mb=None, thin=True):
+    with Toolbox_Instrumentation.stage('create_initial_roads', inputs=['Streets', 'StreetAddress']) as record:
+        initial_roads = create_initial_roads(conn, budget_mb)
+        record['outputs'].append(initial_roads)
+
+    with Toolbox_Instrumentation.stage('add_attributes', inputs=[initial_roads, 'Link', 'LinkAttribute', 'Status']) as record:
+        hifld_attributed = add_attributes(conn, initial_roads, thin)
+        record['outputs'].append(hifld_attributed)
+
+    with Toolbox_Instrumentation.stage('mark_inside_outside', inputs=[hifld_attributed, 'FS_Lands']) as record:
+        hifld_merged = mark_inside_outside(conn, hifld_attributed)
+        record['outputs'].append(hifld_merged)
+
+    with Toolbox_Instrumentation.stage('labels', inputs=[hifld_merged]) as record:
+        hifld_plus_gtac = labels(conn, hifld_merged)
+        record['outputs'].append(hifld_plus_gtac)
+
+    return hifld_plus_gtac
+
+# '''
+#     Purpose - Function split_tiles(path, folder, tiles) is the pure-Python version of the tile split of the parallel mode of the HIFLD toolbox. Each road of the Streets table is placed in the tile of its first vertex (see HIFLD_Engine.tile_grid and HIFLD_Engine.tile_of), and each non-empty tile gets its own SQLite file holding its Streets rows, the StreetAddress, Link, and LinkAttribute rows of their links, the Status table, and the FS_Lands polygons whose extent overlaps the extent of its roads.
+#               The OBJECTID values are kept, so that every stage sees the roads in the same order as in the full dataset. Roads with an identical shape share a first vertex, so they always meet in the same tile.
+#     Inputs - path: The file pathway to the synthetic dataset Ex) r'C:\Users\caitl\OneDrive\Documents\Tools\HERE_synthetic_100000.sqlite'.
+#              folder: The folder to save the tile files in Ex) r'C:\Users\caitl\OneDrive\Documents\Tools\Tiles'.
+#              tiles: The rough number of tiles Ex) 32.
+#     Outputs - lst_tiles: A list of (number of roads, tile file pathway) tuples, largest tile first.
+# '''
+def split_tiles(path, folder, tiles):
+    if not os.path.exists(folder):
+        os.makedirs(folder)
+
+    grid = HIFLD_Engine.tile_grid(EXTENT, tiles)
+    conn = open_dataset(path)
+    dict_tiles = {} # The OBJECTIDs of the Streets rows in each tile
+    dict_extents = {} # The [xmin, ymin, xmax, ymax] extent of the roads in each tile
+    for rows in read_batches(conn, 'Streets', ['Shape']):
+        for oid, shape in rows:
+            lst_points = [point for part in unpack_shape(shape) for point in part]
+            tile_id = HIFLD_Engine.tile_of(lst_points[0][0], lst_points[0][1], grid)
+            dict_tiles.setdefault(tile_id, []).append(oid)
+
+            lst_x = [point[0] for point in lst_points]
+            lst_y = [point[1] for point in lst_points]
+            extent = dict_extents.setdefault(tile_id, [min(lst_x), min(lst_y), max(lst_x), max(lst_y)])
+            extent[0], extent[1], extent[2], extent[3] = min(extent[0], min(lst_x)), min(extent[1], min(lst_y)), max(extent[2], max(lst_x)), max(extent[3], max(lst_y))
+
+    lst_fs_extents = [] # (OBJECTID, xmin, ymin, xmax, ymax) of each FS lands polygon
+    for oid, shape in conn.execute('SELECT OBJECTID, Shape FROM FS_Lands'):
+        lst_points = [point for part in unpack_shape(shape) for point in part]
+        lst_fs_extents.append((oid, min(point[0] for point in lst_points), min(point[1] for point in lst_points), max(point[0] for point in lst_points), max(point[1] for point in lst_points)))
+    conn.close()
+
+    lst_tiles = []
+    for tile_id, lst_oids in sorted(dict_tiles.items()):
+        tile_path = os.path.join(folder, 'Tile_{0}.sqlite'.format(tile_id))
+        if os.path.exists(tile_path):
+            os.remove(tile_path)
+
+        conn = open_dataset(tile_path)
+        conn.execute('ATTACH DATABASE ? AS source', (path,))
+        conn.execute('CREATE TEMP TABLE tile_oids (OBJECTID INTEGER PRIMARY KEY)')
+        conn.executemany('INSERT INTO tile_oids VALUES (?)', ((oid,) for oid in lst_oids))
+
+        for table in ['Streets', 'StreetAddress', 'Link', 'LinkAttribute', 'Status', 'FS_Lands']:
+            lst_columns = [(row[1], row[2]) for row in conn.execute('PRAGMA source.table_info("{0}")'.format(table))]
+            conn.execute('CREATE TABLE {0} ({1})'.format(table, ', '.join('OBJECTID INTEGER PRIMARY KEY' if name == 'OBJECTID' else '"{0}" {1}'.format(name, kind) for name, kind in lst_columns)))
+        conn.execute('INSERT INTO Streets SELECT * FROM source.Streets WHERE OBJECTID IN (SELECT OBJECTID FROM tile_oids)')
+        conn.execute('CREATE INDEX Streets_Link_ID ON Streets (Link_ID)')
+        for table in ['StreetAddress', 'Link', 'LinkAttribute']:
+            conn.execute('INSERT INTO {0} SELECT * FROM source.{0} WHERE LINK_ID IN (SELECT Link_ID FROM Streets)'.format(table))
+        conn.execute('INSERT INTO Status SELECT * FROM source.Status')
+        xmin, ymin, xmax, ymax = dict_extents[tile_id]
+        lst_fs = [oid for oid, fs_xmin, fs_ymin, fs_xmax, fs_ymax in lst_fs_extents if fs_xmin <= xmax and fs_xmax >= xmin and fs_ymin <= ymax and fs_ymax >= ymin]
+        conn.executemany('INSERT INTO FS_Lands SELECT * FROM source.FS_Lands WHERE OBJECTID = ?', ((oid,) for oid in lst_fs))
+        conn.commit()
+        conn.execute('DETACH DATABASE source')
+        conn.close()
+
+        lst_tiles.append((len(lst_oids), tile_path))
+
+    return sorted(lst_tiles, reverse=True)
+
+# '''
+#     Purpose - Function run_tile(tile_path) runs the four stages on one tile file (see split_tiles(path, folder, tiles)), without thinning, since thinning needs the whole network. It is the worker function of run_tiles(lst_tiles, workers).
+#     Inputs - tile_path: The file pathway to the tile file.
+#     Outputs - A (tile file pathway, seconds) tuple.
+# '''
+def run_tile(tile_path):
+    start = time.perf_counter()
+    conn = open_dataset(tile_path)
+    run_pipeline(conn, thin=False)
+    conn.close()
+    return tile_path, time.perf_counter() - start
+
+# '''
+#     Purpose - Function run_tiles(lst_tiles, workers) runs run_tile(tile_path) for every tile in a pool of worker processes, largest tile first.
+#     Inputs - lst_tiles: The list returned by split_tiles(path, folder, tiles).
+#              workers: The number of worker processes Ex) 8.
+#     Outputs - dict_seconds: The run time of each tile file, in seconds.
+# '''
+def run_tiles(lst_tiles, workers):
+    with multiprocessing.Pool(workers) as pool:
+        return dict(pool.imap_unordered(run_tile, [tile_path for count, tile_path in lst_tiles]))
+
+if __name__ == '__main__':
+    print("Job starting!", datetime.datetime.now(), "\n")
+
+    path = r'C:\Users\caitl\OneDrive\Documents\Tools\HERE_synthetic_100000.sqlite' # Update me!
+    size = 100000 # Update me! Number of roads in the Streets table
+
+    dict_counts = generate_dataset(path, size)
+    print('Synthetic dataset created: {0}\n{1}\n'.format(path, dict_counts))
+
+    print("Job ending!", datetime.datetime.now(), "\n")
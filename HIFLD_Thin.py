@@ -0,0 +1,276 @@
+'''
+Title: HIFLD Thin
+Authors: Caitlin Hartig, Justine Jedlicka
+Date: October 2026
+
+This module holds a native version of the ThinRoadNetwork step of the HIFLD toolbox (HIFLD.pyt), which fills the "Generalization" field (0 = visible, 1 = invisible at small scales) from the road shapes and the Hierarchy field.
+The roads are loaded into a RoadGraph once: the end points of each road are snapped into nodes, and the node / road incidences are kept as compressed sparse row (CSR) lists in NumPy arrays. The roads are then joined into strokes: at each node, roads with the same Hierarchy value continue into each other, the straightest pairs first, so that a highway drawn as hundreds of short HERE links, and crossed by many other roads, is judged by its full length.
+RoadGraph.thin(min_length) then hides the strokes that are shorter than min_length, without breaking the connections between the roads that stay visible:
+    - Dead ends are hidden first: short strokes that share at most one node with the rest of the network, least important (highest Hierarchy value, then NULL) and shortest first. Hiding a dead end can leave the stroke it hung from as a new dead end, which is then considered in turn.
+    - The remaining strokes are visited most important and longest first, as in Kruskal's algorithm. A short stroke is only hidden if the nodes it shares with other roads are already connected by the strokes visited before it, so every hidden stroke has a more important way around it.
+    - Dead ends left by the second step are pruned once more.
+Every ordering ends on the stroke number, which follows the road order, so the same roads always give the same result. Since the graph is only built once, several minimum lengths can be compared in one run (see RoadGraph.sweep(lst_min_lengths)).
+This module does not require arcpy.
+
+Libraries Utilized: heapq, math, numpy
+'''
+
+import heapq, math
+import numpy as np
+
+EARTH_RADIUS = 6371008.8 # Mean radius of the earth in meters
+
+# '''
+#     Purpose - Function road_length(coords, geographic) returns the length of a road in meters. Geographic coordinates are measured on a sphere with an equirectangular approximation for each segment, which is well within a meter for road segments.
+#     Inputs - coords: A sequence of (x, y) tuples. For multipart geometries, the parts are separated by None Ex) [(-105.0, 40.0), (-105.01, 40.0)].
+#              geographic: True if the coordinates are longitude / latitude in decimal degrees, False if they are already in meters.
+#     Outputs - The length in meters Ex) 851.8.
+# '''
+def road_length(coords, geographic=True):
+    length = 0.0
+    previous = None
+
+    for coord in coords:
+        if coord is not None and previous is not None:
+            dx = coord[0] - previous[0]
+            dy = coord[1] - previous[1]
+            if geographic:
+                dx = math.radians(dx) * math.cos(math.radians((coord[1] + previous[1]) / 2.0)) * EARTH_RADIUS
+                dy = math.radians(dy) * EARTH_RADIUS
+            length += math.hypot(dx, dy)
+        previous = coord
+
+    return length
+
+# '''
+#     Purpose - Function connected_components(count, a, b) labels the connected components of a graph with count items and an edge between each a[i] and b[i]. Roots are hooked onto the smallest root next to them and the labels are compressed until every item points at its root, all with NumPy.
+#     Inputs - count: The number of items Ex) 5.
+#              a, b: Integer arrays of the same length, the two ends of each edge Ex) np.array([0, 3]), np.array([1, 4]).
+#     Outputs - labels: An array with the smallest item of its component for each item Ex) array([0, 0, 2, 3, 3]).
+# '''
+def connected_components(count, a, b):
+    labels = np.arange(count, dtype=np.int64)
+    a = np.asarray(a, dtype=np.int64)
+    b = np.asarray(b, dtype=np.int64)
+
+    while len(a) != 0:
+        root_a = labels[a]
+        root_b = labels[b]
+        low = np.minimum(root_a, root_b)
+        high = np.maximum(root_a, root_b)
+        mask = low != high
+        if not mask.any():
+            break
+
+        np.minimum.at(labels, high[mask], low[mask]) # high is always a root here, and is hooked onto a smaller root, so no loops are made
+        while True:
+            grand = labels[labels]
+            if np.array_equal(grand, labels):
+                break
+            labels = grand
+
+        a = a[mask]
+        b = b[mask]
+
+    return labels
+
+
+# '''
+#     Purpose - Function _node_ids(xy, xy_tolerance) numbers the distinct points of an (n, 2) coordinate array, snapping them to a grid of xy_tolerance first if it is given.
+#     Outputs - A (number of nodes, node number of each point) tuple.
+# '''
+def _node_ids(xy, xy_tolerance):
+    if xy_tolerance is None:
+        keys = np.ascontiguousarray(xy + 0.0, dtype=np.float64) # Adding 0.0 turns -0.0 into 0.0
+    else:
+        keys = np.ascontiguousarray(np.round(xy / xy_tolerance), dtype=np.int64)
+
+    order = np.lexsort((keys[:, 1], keys[:, 0]))
+    is_new = np.ones(len(order), dtype=bool)
+    is_new[1:] = (keys[order[1:]] != keys[order[:-1]]).any(axis=1)
+
+    node_ids = np.empty(len(order), dtype=np.int64)
+    node_ids[order] = np.cumsum(is_new) - 1
+    return int(is_new.sum()), node_ids
+
+# '''
+#     Purpose - Function _pair_roads(incidence_node, incidence_road, incidence_rank, direction) decides which roads continue into each other at each node, to build the strokes of a RoadGraph.
+#               At each node, the roads of the same rank are paired: two roads of a rank simply continue into each other, and when more than two meet, the straightest pairs are taken first (the pair whose directions away from the node are closest to opposite).
+#     Inputs - incidence_node, incidence_road, incidence_rank: Arrays with the node, road, and rank of each road end.
+#              direction: An (n, 2) array with the direction of each road end, pointing away from the node.
+#     Outputs - A (first roads, second roads) tuple of arrays with one entry per pair.
+# '''
+def _pair_roads(incidence_node, incidence_road, incidence_rank, direction):
+    order = np.lexsort((incidence_road, incidence_rank, incidence_node))
+    node = incidence_node[order]
+    rank = incidence_rank[order]
+
+    is_start = np.ones(len(order), dtype=bool)
+    is_start[1:] = (node[1:] != node[:-1]) | (rank[1:] != rank[:-1])
+    group_start = np.flatnonzero(is_start)
+    group_size = np.diff(np.append(group_start, len(order)))
+
+    # Groups of two pair up as they are
+    two = group_start[group_size == 2]
+    lst_first = [incidence_road[order[two]]]
+    lst_second = [incidence_road[order[two + 1]]]
+
+    # Groups of three or more are paired straightest first. Groups of the same size are paired together, one pair rank at a time.
+    for size in np.unique(group_size[group_size > 2]).tolist():
+        members = order[group_start[group_size == size][:, None] + np.arange(size)] # (groups, size)
+        unit = direction[members]
+        unit = unit / np.maximum(np.hypot(unit[..., 0], unit[..., 1]), 1e-12)[..., None]
+        index_a, index_b = np.triu_indices(size, 1)
+        cosine = (unit[:, index_a] * unit[:, index_b]).sum(axis=2) # (groups, pairs)
+        pair_order = np.argsort(cosine, axis=1, kind='stable') # Ties keep the road order
+
+        groups = np.arange(len(members))
+        used = np.zeros(members.shape, dtype=bool)
+        for column in range(len(index_a)):
+            a = index_a[pair_order[:, column]]
+            b = index_b[pair_order[:, column]]
+            is_free = ~used[groups, a] & ~used[groups, b]
+            used[groups[is_free], a[is_free]] = True
+            used[groups[is_free], b[is_free]] = True
+            lst_first.append(incidence_road[members[groups[is_free], a[is_free]]])
+            lst_second.append(incidence_road[members[groups[is_free], b[is_free]]])
+
+    first = np.concatenate(lst_first)
+    second = np.concatenate(lst_second)
+    is_other = first != second # A road that loops back onto itself closes its own stroke
+    return first[is_other], second[is_other]
+
+class RoadGraph(object):
+    # '''
+    #     Purpose - RoadGraph(start_xy, end_xy, lengths, heirarchy, xy_tolerance, null) builds the node / road graph of a road network and the strokes that run through it (see the module description).
+    #     Inputs - start_xy, end_xy: (number of roads, 2) arrays with the first and last vertex of each road Ex) np.array([[0.0, 0.0], [1000.0, 0.0]]).
+    #              lengths: The length of each road in meters Ex) np.array([1000.0, 500.0]).
+    #              heirarchy: The Hierarchy value of each road, with null for NULL Ex) np.array([0, 5]).
+    #              xy_tolerance: The snapping distance for the end points, in the units of the coordinates, or None for an exact match Ex) 0.000001.
+    #              null: The value used for a NULL Hierarchy Ex) -1.
+    # '''
+    def __init__(self, start_xy, end_xy, lengths, heirarchy, xy_tolerance=None, null=-1):
+        start_xy = np.asarray(start_xy, dtype=np.float64).reshape(-1, 2)
+        end_xy = np.asarray(end_xy, dtype=np.float64).reshape(-1, 2)
+        lengths = np.asarray(lengths, dtype=np.float64)
+        heirarchy = np.asarray(heirarchy, dtype=np.int64)
+        self.roads = len(lengths)
+
+        # Step 1 - Snap the end points into nodes, and build the CSR lists of the roads at each node
+        self.nodes, incidence_node = _node_ids(np.concatenate([start_xy, end_xy]), xy_tolerance)
+        incidence_road = np.concatenate([np.arange(self.roads), np.arange(self.roads)])
+        self.road_start = incidence_node[:self.roads]
+        self.road_end = incidence_node[self.roads:]
+
+        order = np.argsort(incidence_node, kind='stable')
+        self.indptr = np.zeros(self.nodes + 1, dtype=np.int64)
+        np.cumsum(np.bincount(incidence_node, minlength=self.nodes), out=self.indptr[1:])
+        self.adjacency = incidence_road[order]
+
+        # Step 2 - Rank the roads: 0 is the most important, and NULL ranks below every Hierarchy value
+        rank = heirarchy.copy()
+        is_null = rank == null
+        rank[is_null] = rank[~is_null].max() + 1 if (~is_null).any() else 0
+
+        # Step 3 - Join the roads that continue into each other into strokes
+        direction = np.concatenate([end_xy - start_xy, start_xy - end_xy])
+        first, second = _pair_roads(incidence_node, incidence_road, rank[incidence_road], direction)
+        labels = connected_components(self.roads, first, second)
+        unique, self.stroke = np.unique(labels, return_inverse=True) # Strokes are numbered in order of their first road
+        self.strokes = len(unique)
+        self.stroke_length = np.bincount(self.stroke, weights=lengths, minlength=self.strokes)
+        self.stroke_rank = rank[unique]
+
+        # Step 4 - Build the CSR lists of the nodes of each stroke, and of the strokes at each node
+        keys = np.unique(self.stroke[incidence_road] * self.nodes + incidence_node)
+        stroke_of = keys // self.nodes
+        node_of = keys % self.nodes
+
+        self.stroke_indptr = np.zeros(self.strokes + 1, dtype=np.int64)
+        np.cumsum(np.bincount(stroke_of, minlength=self.strokes), out=self.stroke_indptr[1:])
+        self.stroke_nodes = node_of
+
+        order = np.argsort(node_of, kind='stable')
+        self.node_indptr = np.zeros(self.nodes + 1, dtype=np.int64)
+        np.cumsum(np.bincount(node_of, minlength=self.nodes), out=self.node_indptr[1:])
+        self.node_strokes = stroke_of[order]
+        self.node_degree = np.diff(self.node_indptr) # The number of strokes at each node
+
+    # '''
+    #     Purpose - Method thin(min_length) works out the Generalization value of every road for one minimum length (see the module description).
+    #     Inputs - min_length: The minimum length in meters for a stroke to stay visible Ex) 3000.
+    #     Outputs - An int16 array with the Generalization value of each road, in road order: 0 = visible, 1 = invisible.
+    # '''
+    def thin(self, min_length):
+        short = (self.stroke_length < min_length).tolist()
+        lst_rank = self.stroke_rank.tolist()
+        lst_length = self.stroke_length.tolist()
+        stroke_indptr = self.stroke_indptr.tolist()
+        stroke_nodes = self.stroke_nodes.tolist()
+        node_indptr = self.node_indptr.tolist()
+        node_strokes = self.node_strokes.tolist()
+
+        hidden = [False] * self.strokes
+        degree = self.node_degree.tolist() # The number of visible strokes at each node
+        junction = np.bincount(self.node_strokes, weights=self.node_degree[np.repeat(np.arange(self.nodes), self.node_degree)] >= 2, minlength=self.strokes).astype(np.int64).tolist() # The number of nodes each stroke shares with another visible stroke
+
+        def hide(stroke, lst_exposed):
+            hidden[stroke] = True
+            for node in stroke_nodes[stroke_indptr[stroke]:stroke_indptr[stroke + 1]]:
+                degree[node] -= 1
+                if degree[node] == 1: # The one stroke left at this node no longer shares it
+                    for other in node_strokes[node_indptr[node]:node_indptr[node + 1]]:
+                        if not hidden[other]:
+                            junction[other] -= 1
+                            lst_exposed.append(other)
+
+        def prune(lst_candidates):
+            heap = [(-lst_rank[stroke], lst_length[stroke], stroke) for stroke in lst_candidates if short[stroke] and not hidden[stroke] and junction[stroke] <= 1]
+            heapq.heapify(heap)
+            while len(heap) != 0:
+                stroke = heapq.heappop(heap)[2]
+                if hidden[stroke]:
+                    continue
+                lst_exposed = []
+                hide(stroke, lst_exposed)
+                for other in lst_exposed:
+                    if short[other] and junction[other] <= 1:
+                        heapq.heappush(heap, (-lst_rank[other], lst_length[other], other))
+
+        # Step 1 - Hide the short dead ends: strokes that share at most one node with the rest of the network
+        prune(range(self.strokes))
+
+        # Step 2 - Visit the strokes most important and longest first, and hide the short strokes whose shared nodes are already connected
+        parent = list(range(self.nodes))
+
+        def find(node):
+            while parent[node] != node:
+                parent[node] = parent[parent[node]]
+                node = parent[node]
+            return node
+
+        for stroke in np.lexsort((np.arange(self.strokes), -self.stroke_length, self.stroke_rank)).tolist():
+            if hidden[stroke]:
+                continue
+
+            lst_nodes = stroke_nodes[stroke_indptr[stroke]:stroke_indptr[stroke + 1]]
+            set_roots = {find(node) for node in lst_nodes if degree[node] >= 2}
+            if short[stroke] and len(set_roots) <= 1:
+                hide(stroke, [])
+            else:
+                root = min(find(node) for node in lst_nodes)
+                for node in lst_nodes:
+                    parent[find(node)] = root
+
+        # Step 3 - Hide the short dead ends left by Step 2
+        prune(range(self.strokes))
+
+        return np.array(hidden, dtype=np.int16)[self.stroke]
+
+    # '''
+    #     Purpose - Method sweep(lst_min_lengths) runs thin(min_length) for several minimum lengths on the same graph, for comparing how much of the network each one hides.
+    #     Inputs - lst_min_lengths: A list of minimum lengths in meters Ex) [1000, 2000, 3000, 5000].
+    #     Outputs - dict_generalization: The Generalization array of each minimum length Ex) {3000: array([0, 1, ...], dtype=int16), ...}.
+    # '''
+    def sweep(self, lst_min_lengths):
+        return {min_length: self.thin(min_length) for min_length in lst_min_lengths}
@@ -4,14 +4,18 @@ Author: Caitlin Hartig
 Date: November 2024
 
 This script is a web crawler that downloads data specifically from the NFHL website that are packaged in separate zip folders for each state / territory. The program then saves each zip folder into a designated folder pathway and then zips the final folder.
+In harvesting mode, the program first collects the download link of every state / territory in one session: the search page is read once, and the search form is submitted for each state / territory in the same session, with the pages parsed by a lightweight HTML parser rather than a browser. The links are saved to a link manifest, which the download step then works through. A browser is only started (once) if the search page cannot be read without one.
 
-Libraries Utilized: selenium, urllib, shutil, datetime, os
+Libraries Utilized: selenium, urllib, shutil, datetime, os, html, http, json
 '''
 
 from selenium import webdriver
 from selenium.webdriver.support.ui import Select
-from urllib.request import urlretrieve
-import shutil, datetime, os
+from urllib.request import urlretrieve, build_opener, HTTPCookieProcessor
+from urllib.parse import urlencode, urljoin
+from html.parser import HTMLParser
+from http.cookiejar import CookieJar
+import shutil, datetime, os, json
 
 ##'''
 ##    Purpose - download_pdfs(url, lst_failed, folder_name, count) is a web crawler that downloads data in zip folders specifically from the NFHL website for each state / territory and saves them into a designated folder pathway (folder_name).
@@ -124,6 +128,275 @@ def download_pdfs(url, lst_failed, folder_name, count):
                   driver.quit()
                   print('All NFHL data downloaded.\n')
                     
+##'''
+##    Purpose - SearchPageParser is an HTML parser for the NFHL search page. It finds the form holding the drop-down menu of states / territories (named 'state'), and keeps the form action and method, its hidden fields, its submit button, and the value and name of each state / territory option.
+##'''
+class SearchPageParser(HTMLParser):
+    def __init__(self):
+        HTMLParser.__init__(self)
+        self.form = None # The attributes of the form being read
+        self.forms = [] # A list of [form attributes, fields, options, submit buttons] for each form
+        self.in_select = False
+        self.in_option = False
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if tag == 'form':
+            self.form = [attrs, {}, [], {}]
+            self.forms.append(self.form)
+        elif self.form is None:
+            return
+        elif tag == 'select':
+            self.in_select = attrs.get('name') == 'state'
+        elif tag == 'option' and self.in_select:
+            self.form[2].append([attrs.get('value'), ''])
+            self.in_option = True
+        elif tag == 'input' and attrs.get('name'):
+            if attrs.get('type', 'text').lower() == 'submit':
+                self.form[3][attrs['name']] = attrs.get('value', '')
+            elif attrs.get('type', 'text').lower() in ('hidden', 'text'):
+                self.form[1][attrs['name']] = attrs.get('value', '')
+        elif tag == 'button' and attrs.get('name'):
+            self.form[3][attrs['name']] = attrs.get('value', '')
+
+    def handle_endtag(self, tag):
+        if tag == 'select':
+            self.in_select = False
+        elif tag == 'option':
+            self.in_option = False
+        elif tag == 'form':
+            self.form = None
+
+    def handle_data(self, data):
+        if self.in_option:
+            self.form[2][-1][1] += data
+
+    def state_form(self):
+        for form in self.forms:
+            if len(form[2]) != 0:
+                return form
+        return None
+
+##'''
+##    Purpose - ResultPageParser is an HTML parser for the NFHL search result page of one state / territory. It keeps the href of each link inside a <center> tag in the last cell of a table row, which is where the download link of the state / territory zip folder is.
+##'''
+class ResultPageParser(HTMLParser):
+    def __init__(self):
+        HTMLParser.__init__(self)
+        self.hrefs = [] # The download links found
+        self.row = None # The links of each cell of the table row being read
+        self.center = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag == 'tr':
+            self.row = []
+        elif tag == 'td' and self.row is not None:
+            self.row.append([])
+        elif tag == 'center':
+            self.center += 1
+        elif tag == 'a' and self.center > 0 and self.row:
+            href = dict(attrs).get('href')
+            if href:
+                self.row[-1].append(href)
+
+    def handle_endtag(self, tag):
+        if tag == 'center':
+            self.center = max(0, self.center - 1)
+        elif tag == 'tr' and self.row is not None:
+            if len(self.row) != 0:
+                self.hrefs.extend(self.row[-1])
+            self.row = None
+
+##'''
+##    Purpose - submit_button(dict_submit) picks the submit button of the search form that asks for the data of one state / territory, so that only that button is sent with the form, as a browser sends only the button that was clicked.
+##    Inputs -dict_submit: the name and value of each submit button of the form (see SearchPageParser) Ex) {'submitState': 'Get FIRM Panels', 'submitCounty': 'Search by County'}
+##    Outputs - a dictionary holding the name and value of the button: 'submitState' if the form has it, otherwise the first button Ex) {'submitState': 'Get FIRM Panels'}
+##'''
+def submit_button(dict_submit):
+    if 'submitState' in dict_submit:
+        return {'submitState': dict_submit['submitState']}
+    for name in dict_submit:
+        return {name: dict_submit[name]}
+    return {}
+
+##'''
+##    Purpose - harvest_links(url, folder_name, manifest_path) collects the download link of every state / territory from the NFHL search page in one session, and saves them to a link manifest.
+##                The search page is read once, and the search form is then submitted for each state / territory in the same session (keeping its cookies), and each result page is parsed for the download link (see ResultPageParser). The first link of the result page is the current zip folder of the state / territory.
+##                The parser can be checked against the local stand-in of the search page in NFHL_Download_States_StandIn (see check_stand_in.py there), which should be updated whenever the NFHL website changes.
+##                If the search page has no drop-down menu of states / territories that can be read without a browser, one browser session is started instead and used for every state / territory (see harvest_links_browser(url)).
+##                A state / territory whose link cannot be found is tried a second time, in case the failure was due to temporary network issues, and is then listed in the manifest as failed.
+##    Inputs -url: a website url specifically for the NFHL website, or a local copy of the search page for testing. Ex) r'https://hazards.fema.gov/femaportal/NFHL/searchResult' or r'http://localhost:8000/searchResult.html'
+##           -folder_name: a folder pathway. Ex) r'C:\Users\CaitlinHartig\Documents\NFHL\Data'
+##           -manifest_path: a file pathway for the JSON link manifest, or None to save it as NFHL_links.json next to folder_name
+##    Outputs - dict_manifest: the link manifest Ex) {'url': ..., 'harvested': '2026-10-18 09:12:44', 'links': [{'index': 1, 'value': '01', 'state': 'ALABAMA', 'href': ..., 'file': 'NFHL_01_20241004.zip'}], 'failed': []}
+##'''
+def harvest_links(url, folder_name, manifest_path=None):
+    if manifest_path is None:
+        manifest_path = os.path.join(os.path.dirname(folder_name), 'NFHL_links.json')
+
+    opener = build_opener(HTTPCookieProcessor(CookieJar())) # One session for every request
+    opener.addheaders = [('User-Agent', 'Mozilla/5.0')]
+
+    try: # Attempts to read the search page
+        with opener.open(url, timeout=60) as response:
+            search_url = response.geturl()
+            parser = SearchPageParser()
+            parser.feed(response.read().decode('utf-8', 'ignore'))
+    except:
+        print('Error! Unable to get URL. Check URL.')
+        print('\turl: ', url, '\n')
+        quit()
+
+    form = parser.state_form()
+    if form is None: # The drop-down menu is drawn by the browser, so the links are collected in one browser session instead
+        print('Search page cannot be read without a browser; collecting the links in one browser session.\n')
+        lst_links, lst_failed = harvest_links_browser(url)
+    else:
+        form_attrs, dict_fields, lst_options, dict_submit = form
+        action = urljoin(search_url, form_attrs.get('action') or search_url)
+        method = form_attrs.get('method', 'get').lower()
+        dict_links = {} # This dictionary holds the link found for each index
+        lst_indexes = list(range(1, len(lst_options))) # The first option of the drop-down menu is not a state / territory
+
+        for attempt in range(2): # A second attempt is made in case a failure was due to temporary network issues
+            lst_retry = []
+            for index in lst_indexes:
+                value, name = lst_options[index]
+                dict_query = dict(dict_fields, state=value if value is not None else name.strip())
+                dict_query.update(submit_button(dict_submit)) # Only the button that was clicked is sent, as a browser would
+
+                try: # Attempts to submit the search form for the state / territory and find the download link
+                    if method == 'post':
+                        response = opener.open(action, urlencode(dict_query).encode('utf-8'), timeout=60)
+                    else:
+                        response = opener.open(action + ('&' if '?' in action else '?') + urlencode(dict_query), timeout=60)
+                    with response:
+                        result_parser = ResultPageParser()
+                        result_parser.feed(response.read().decode('utf-8', 'ignore'))
+                        result_url = response.geturl()
+                    href_value = urljoin(result_url, result_parser.hrefs[0]) # The current zip folder is listed first
+                except:
+                    lst_retry.append(index)
+                else:
+                    dict_links[index] = {'index': index, 'value': value, 'state': name.strip(), 'href': href_value, 'file': href_value[href_value.rfind('=') + 1:]}
+                    print('Link found for {0}: {1}'.format(name.strip(), dict_links[index]['file']))
+            lst_indexes = lst_retry
+            if len(lst_indexes) == 0:
+                break
+
+        lst_links = [dict_links[index] for index in sorted(dict_links)]
+        lst_failed = [{'index': index, 'value': lst_options[index][0], 'state': lst_options[index][1].strip()} for index in lst_indexes]
+
+    dict_manifest = {'url': url, 'harvested': datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S'), 'links': lst_links, 'failed': lst_failed}
+    with open(manifest_path, 'w') as outfile:
+        json.dump(dict_manifest, outfile, indent=1)
+
+    print('\n{0} download links found, {1} failed. Saved to {2}\n'.format(len(lst_links), len(lst_failed), manifest_path))
+    for failed in lst_failed:
+        print('\tFailed index: ', failed['index'], failed['state'], '\n') # Prints the list of failed states / territories
+
+    return dict_manifest
+
+##'''
+##    Purpose - harvest_links_browser(url) collects the download link of every state / territory from the NFHL search page in one Chrome browser session, for search pages that cannot be read without a browser (see harvest_links(url, folder_name, manifest_path)).
+##                The search page is reloaded in the same browser for each state / territory, rather than starting a new browser.
+##    Inputs -url: a website url specifically for the NFHL website. Ex) r'https://hazards.fema.gov/femaportal/NFHL/searchResult'
+##    Outputs - lst_links: a list of the link of each state / territory (see harvest_links(url, folder_name, manifest_path))
+##            - lst_failed: a list of the states / territories whose link could not be found
+##'''
+def harvest_links_browser(url):
+    try: # Attempts to connect to the Chrome browser
+        driver = webdriver.Chrome()
+    except:
+        print('Error! Unable to connect to browser.\n')
+        quit()
+
+    lst_links = []
+    lst_failed = []
+    try:
+        try: # Attempts to obtain a list of states / territories in the drop-down menu
+            driver.get(url)
+            last_index = len(Select(driver.find_element(webdriver.common.by.By.NAME, 'state')).options)
+        except:
+            print('Error! Unable to obtain full list of states / territories. Check URL, site may be under maintenance.')
+            print('\turl: ', url, '\n')
+            quit()
+
+        lst_indexes = list(range(1, last_index))
+        for attempt in range(2): # A second attempt is made in case a failure was due to temporary network issues
+            lst_retry = []
+            for index in lst_indexes:
+                try: # Attempts to select the state by index, click the button, and find the href value of the download link
+                    driver.get(url)
+                    lst_states = Select(driver.find_element(webdriver.common.by.By.NAME, 'state'))
+                    option = lst_states.options[index]
+                    value, name = option.get_attribute('value'), option.text
+                    lst_states.select_by_index(index)
+                    driver.find_element(webdriver.common.by.By.NAME, 'submitState').click()
+                    href_value = driver.find_element(webdriver.common.by.By.XPATH, r'//td[last()]/center/a').get_attribute('href')
+                except:
+                    lst_retry.append(index)
+                else:
+                    lst_links.append({'index': index, 'value': value, 'state': name.strip(), 'href': href_value, 'file': href_value[href_value.rfind('=') + 1:]})
+                    print('Link found for {0}: {1}'.format(name.strip(), lst_links[-1]['file']))
+            lst_indexes = lst_retry
+            if len(lst_indexes) == 0:
+                break
+
+        lst_failed = [{'index': index, 'value': None, 'state': None} for index in lst_indexes]
+    finally:
+        driver.quit()
+
+    return sorted(lst_links, key=lambda link: link['index']), lst_failed
+
+##'''
+##    Purpose - download_links(manifest_path, folder_name) downloads the zip folder of every state / territory in a link manifest (see harvest_links(url, folder_name, manifest_path)) into a designated folder pathway (folder_name).
+##                Zip folders that are already in the folder with the same size are skipped, so an interrupted download can be run again. A zip folder that cannot be downloaded is tried a second time, in case the failure was due to temporary network issues.
+##    Inputs -manifest_path: a file pathway to the JSON link manifest. Ex) r'C:\Users\CaitlinHartig\Documents\NFHL\NFHL_links.json'
+##           -folder_name: a folder pathway. Ex) r'C:\Users\CaitlinHartig\Documents\NFHL\Data'
+##    Outputs - lst_failed: a list of the links that could not be downloaded
+##'''
+def download_links(manifest_path, folder_name):
+    with open(manifest_path, 'r') as infile:
+        dict_manifest = json.load(infile)
+
+    if not os.path.exists(folder_name): # Makes a new directory for the specified folder if one does not already exist
+        os.makedirs(folder_name)
+
+    opener = build_opener(HTTPCookieProcessor(CookieJar())) # One session for every download
+    opener.addheaders = [('User-Agent', 'Mozilla/5.0')]
+    lst_links = dict_manifest['links']
+
+    for attempt in range(2): # A second attempt is made in case a failure was due to temporary network issues
+        lst_retry = []
+        for link in lst_links:
+            filename = os.path.join(folder_name, link['file']) # Saves the file in the specified folder
+            try:
+                with opener.open(link['href'], timeout=300) as response:
+                    size = response.headers.get('Content-Length')
+                    if size is not None and os.path.exists(filename) and os.path.getsize(filename) == int(size):
+                        print(filename, '(already downloaded)\n')
+                        continue
+                    with open(filename, 'wb') as outfile:
+                        shutil.copyfileobj(response, outfile, 16 * 1048576)
+                print(filename, '\n')
+            except:
+                print('Error! Unable to download zip folder.')
+                lst_retry.append(link)
+        lst_links = lst_retry
+        if len(lst_links) == 0:
+            break
+
+    if len(lst_links) + len(dict_manifest['failed']) != 0:
+        print('All NFHL data downloaded, except:\n')
+        for link in dict_manifest['failed'] + lst_links:
+            print('\tFailed index: ', link['index'], link['state'], '\n') # Prints the list of failed states / territories
+        print('Please manually download the above failed indexes from \n\t{0}\n.'.format(dict_manifest['url']))
+    else:
+        print('All NFHL data downloaded.\n')
+
+    return lst_links
+
 ##'''
 ##    Purpose - zip_folder(folder_name) takes a pathway to a folder that needs to be zipped.
 ##    Inputs - A folder pathway folder_name. Ex) r'C:\Users\CaitlinHartig\Documents\NFHL\Data'
@@ -148,10 +421,16 @@ if __name__ == '__main__':
     url = r'https://hazards.fema.gov/femaportal/NFHL/searchResulthttps:/hazards.fema.gov/femaportal/NFHL/searchResult' # Do not update unless the url has changed. This url should be specifically the NFHL website
     folder = r'C:\Users\CaitlinHartig\Documents\NFHL\Data' # Update me!
 
-    lst_failed = [] # This list will hold the indexes of failed states / territories to attempt to run a second time, in case the failure was due to temporary network issues
-    count = 0 # This counter must start at 0 and drives the program to re-run lst_failed
-    
-    download_pdfs(url, lst_failed, folder, count)
+    harvest = True # Update me! True to collect every download link in one session first (saved as NFHL_links.json next to the folder), False to use one browser per state/territory
+
+    if harvest:
+        harvest_links(url, folder)
+        download_links(os.path.join(os.path.dirname(folder), 'NFHL_links.json'), folder)
+    else:
+        lst_failed = [] # This list will hold the indexes of failed states / territories to attempt to run a second time, in case the failure was due to temporary network issues
+        count = 0 # This counter must start at 0 and drives the program to re-run lst_failed
+
+        download_pdfs(url, lst_failed, folder, count)
 
     zip_folder(folder)
 
@@ -0,0 +1,115 @@
+'''
+Title: National Flood Hazard Layer (NFHL) Download States - Stand-in Check
+Author: Caitlin Hartig
+Date: October 2026
+
+This script checks the harvesting mode of NFHL_Download_States.py against a local stand-in of the NFHL search page, without connecting to the NFHL website.
+The stand-in pages in this folder are served on localhost with http.server: searchResult.html holds the search form, state_XX.html the search result page of each state / territory, and county.html the page returned when the County button is sent with the form. The zip folders are served as small placeholder files.
+The download links are then harvested and downloaded into a temporary folder (see harvest_links(url, folder_name, manifest_path) and download_links(manifest_path, folder_name)), and the links and files are compared against the current zip folder listed first on each state / territory page.
+If the NFHL website changes, update the stand-in pages to match it and run this script again.
+
+Libraries Utilized: http, threading, tempfile, urllib, shutil, sys, os, NFHL_Download_States
+'''
+
+from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+import threading, tempfile, shutil, sys, os, functools
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__)))) # NFHL_Download_States.py is one folder up
+import NFHL_Download_States
+
+STAND_IN_FOLDER = os.path.dirname(os.path.abspath(__file__))
+DICT_EXPECTED = {'01': 'NFHL_01_20241004.zip', '02': 'NFHL_02_20240812.zip', '72': 'NFHL_72_20240610.zip'} # Update me! The current zip folder of each state / territory page
+ZIP_SIZE = 64 # The size of each placeholder zip folder in bytes
+
+##'''
+##    Purpose - StandInHandler serves the stand-in pages. The search form is answered with the page of the state / territory, or with county.html if the County button was sent, and each zip folder is answered with a placeholder file of ZIP_SIZE bytes. Every other path is served from the stand-in folder.
+##'''
+class StandInHandler(SimpleHTTPRequestHandler):
+    def do_GET(self):
+        url = urlparse(self.path)
+        dict_query = parse_qs(url.query)
+
+        if url.path == '/searchResult/state':
+            if 'submitCounty' in dict_query:
+                page = 'county.html'
+            else:
+                page = 'state_{0}.html'.format(dict_query.get('state', [''])[0])
+            self.send_file(os.path.join(STAND_IN_FOLDER, page))
+        elif url.path == '/Download/ProductsDownLoadServlet':
+            name = dict_query.get('file', [''])[0]
+            data = name.encode('utf-8').ljust(ZIP_SIZE, b'\0')[:ZIP_SIZE]
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/zip')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+        else:
+            SimpleHTTPRequestHandler.do_GET(self)
+
+    def send_file(self, page):
+        if not os.path.isfile(page):
+            self.send_error(404)
+            return
+
+        with open(page, 'rb') as infile:
+            data = infile.read()
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args): # The requests are not printed
+        return
+
+##'''
+##    Purpose - check_stand_in() serves the stand-in pages on a free localhost port, runs harvest_links and download_links against them, and compares the results against DICT_EXPECTED. Download_links is run a second time to check that zip folders already downloaded are skipped.
+##    Inputs - None
+##    Outputs - lst_errors: a list of the differences found (empty if the check passed)
+##'''
+def check_stand_in():
+    lst_errors = []
+    server = ThreadingHTTPServer(('localhost', 0), functools.partial(StandInHandler, directory=STAND_IN_FOLDER))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    temp_folder = tempfile.mkdtemp()
+
+    try:
+        url = 'http://localhost:{0}/searchResult.html'.format(server.server_address[1])
+        folder = os.path.join(temp_folder, 'Data')
+        manifest_path = os.path.join(temp_folder, 'NFHL_links.json')
+
+        dict_manifest = NFHL_Download_States.harvest_links(url, folder, manifest_path)
+        dict_files = {link['value']: link['file'] for link in dict_manifest['links']}
+        if dict_files != DICT_EXPECTED:
+            lst_errors.append('Harvested links {0} do not match the expected links {1}'.format(dict_files, DICT_EXPECTED))
+        if len(dict_manifest['failed']) != 0:
+            lst_errors.append('States/territories failed: {0}'.format(dict_manifest['failed']))
+
+        for attempt in range(2): # The second run should skip every zip folder
+            lst_failed = NFHL_Download_States.download_links(manifest_path, folder)
+            if len(lst_failed) != 0:
+                lst_errors.append('Downloads failed: {0}'.format(lst_failed))
+
+        for file in DICT_EXPECTED.values():
+            filename = os.path.join(folder, file)
+            if not os.path.isfile(filename) or os.path.getsize(filename) != ZIP_SIZE:
+                lst_errors.append('{0} was not downloaded'.format(file))
+    finally:
+        server.shutdown()
+        server.server_close()
+        shutil.rmtree(temp_folder, ignore_errors=True)
+
+    return lst_errors
+
+if __name__ == '__main__':
+    lst_errors = check_stand_in()
+
+    if len(lst_errors) != 0:
+        print('Error! The stand-in check failed:\n')
+        for error in lst_errors:
+            print('\t', error, '\n')
+        sys.exit(1)
+
+    print('Stand-in check passed: {0} links harvested and downloaded.\n'.format(len(DICT_EXPECTED)))
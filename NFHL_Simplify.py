@@ -0,0 +1,169 @@
+'''
+Title: National Flood Hazard Layer (NFHL) Simplify
+Author: Caitlin Hartig
+Date: October 2026
+
+This module holds the polygon simplification engine behind the multi-resolution NFHL layers (see simplify_national_layer in NFHL_unzip.py), which are simplified copies of a national layer such as S_FLD_HAZ_AR for small-scale maps.
+The polygons are handed over as flat NumPy buffers: one array of the x / y coordinates of every ring, one after another, and an array of the offset where each ring starts. The rings are then simplified with the Douglas-Peucker algorithm, all at once: every pass looks at the segments of all the rings together, finds the vertex farthest from each segment, and splits the segments where that vertex is farther than the tolerance.
+Rather than simplifying once for each tolerance, the engine records the significance of each vertex: the distance at which the Douglas-Peucker algorithm would stop keeping it. The vertices kept at any tolerance are then simply the vertices with a higher significance, so all the levels come out of one run.
+Each ring keeps at least its first vertex, the vertex farthest from it, and the vertex farthest from each of the two halves in between, so a small polygon becomes a small quadrilateral rather than disappearing.
+The chunks of polygons are simplified in a pool of worker processes (see simplify_chunks(lst_chunks, min_tolerance, pool, geographic)).
+This module does not require arcpy.
+
+Libraries Utilized: multiprocessing, numpy
+'''
+
+import multiprocessing
+import numpy as np
+
+METERS_PER_DEGREE = 111319.49 # The length of one degree of latitude (and of longitude at the equator) in meters
+
+# '''
+# Purpose - local_meters(coords, ring_offsets) converts the longitude / latitude coordinates of each ring into meters, with an equirectangular projection centered on the mean latitude of the ring. This is well within a meter at the scale of one flood hazard polygon, so the tolerances can be given in meters.
+# Inputs - coords: an (n, 2) array of the longitude / latitude coordinates of every ring Ex) np.array([[-95.36, 29.76], [-95.35, 29.76], ...])
+#          ring_offsets: an array of the offset of the first vertex of each ring, followed by the number of vertices Ex) np.array([0, 5, 12])
+# Outputs - an (n, 2) array of the coordinates in meters
+# '''
+def local_meters(coords, ring_offsets):
+    counts = np.diff(ring_offsets)
+    mean_lat = np.add.reduceat(coords[:, 1], ring_offsets[:-1]) / counts if len(counts) != 0 else np.zeros(0)
+    scale_x = np.repeat(np.cos(np.radians(mean_lat)) * METERS_PER_DEGREE, counts)
+
+    xy = np.empty_like(coords, dtype=np.float64)
+    xy[:, 0] = coords[:, 0] * scale_x
+    xy[:, 1] = coords[:, 1] * METERS_PER_DEGREE
+    return xy
+
+# '''
+# Purpose - segment_distances(xy, index, a, b) returns the distance from each vertex index[i] to the segment between the vertices a[i] and b[i]. A segment whose two ends are the same point, as at the closing vertex of a ring, is measured as a point.
+# Inputs - xy: an (n, 2) array of coordinates in meters
+#          index, a, b: integer arrays of the same length
+# Outputs - an array of distances in meters
+# '''
+def segment_distances(xy, index, a, b):
+    x = xy[:, 0]
+    y = xy[:, 1]
+    start_x = x[a]
+    start_y = y[a]
+    dx = x[b] - start_x
+    dy = y[b] - start_y
+    px = x[index] - start_x
+    py = y[index] - start_y
+
+    length2 = dx * dx + dy * dy
+    t = np.clip((px * dx + py * dy) / np.where(length2 == 0, 1.0, length2), 0.0, 1.0)
+    return np.hypot(px - dx * t, py - dy * t)
+
+# '''
+# Purpose - farthest_vertices(xy, a, b) finds, for each segment between the vertices a[i] and b[i] of a ring, the vertex between them that is farthest from the segment, for all the segments at once.
+# Inputs - xy: an (n, 2) array of coordinates in meters
+#          a, b: integer arrays of the first and last vertex of each segment, with at least one vertex between them (they may be empty)
+# Outputs - far: an array of the farthest vertex of each segment
+#           far_distance: an array of its distance from the segment in meters
+# '''
+def farthest_vertices(xy, a, b):
+    if len(a) == 0: # np.maximum.reduceat cannot reduce an empty array
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float64)
+
+    counts = b - a - 1
+    group_starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    segment = np.repeat(np.arange(len(a)), counts)
+    index = np.arange(counts.sum()) - np.repeat(group_starts, counts) + np.repeat(a + 1, counts)
+
+    distances = segment_distances(xy, index, a[segment], b[segment])
+    far_distance = np.maximum.reduceat(distances, group_starts)
+
+    # The first vertex of each segment at its largest distance
+    far = np.minimum.reduceat(np.where(distances == far_distance[segment], index, len(xy)), group_starts)
+    return far, far_distance
+
+# '''
+# Purpose - dp_significance(xy, ring_offsets, min_tolerance) runs the Douglas-Peucker algorithm over every ring at once and returns the significance of each vertex: the largest tolerance at which it is still kept. The first and last vertex of each ring, and the three vertices that shape its smallest form, are always kept and get an infinite significance.
+#     The significance of a vertex is never higher than that of the vertex that split its segment, so the vertices kept at a larger tolerance are always among those kept at a smaller one.
+#     Segments are only split down to min_tolerance; the vertices below it get a significance of 0.
+# Inputs - xy: an (n, 2) array of the coordinates of every ring in meters (see local_meters(coords, ring_offsets))
+#          ring_offsets: an array of the offset of the first vertex of each ring, followed by the number of vertices Ex) np.array([0, 5, 12])
+#          min_tolerance: the smallest tolerance in meters that will be used Ex) 10.0
+# Outputs - significance: an array of the significance of each vertex in meters
+# '''
+def dp_significance(xy, ring_offsets, min_tolerance):
+    significance = np.zeros(len(xy), dtype=np.float64)
+    first = ring_offsets[:-1]
+    last = ring_offsets[1:] - 1
+    significance[first] = np.inf
+    significance[last] = np.inf
+
+    # Split each ring at the vertex farthest from its first vertex
+    rings = np.flatnonzero(last - first >= 2)
+    if len(rings) == 0: # No ring has a vertex between its first and last vertex, as in an empty chunk
+        return significance
+
+    a = first[rings]
+    b = last[rings]
+    far, far_distance = farthest_vertices(xy, a, b)
+    significance[far] = np.inf
+    a, b = np.concatenate((a, far)), np.concatenate((far, b))
+    cap = np.full(len(a), np.inf) # The significance of the vertex that split each segment
+    force = np.ones(len(a), dtype=bool) # The two halves of each ring are split once whatever the tolerance
+
+    while len(a) != 0:
+        open_segments = b - a >= 2
+        a, b, cap, force = a[open_segments], b[open_segments], cap[open_segments], force[open_segments]
+        if len(a) == 0:
+            break
+
+        far, far_distance = farthest_vertices(xy, a, b)
+        split = force | (far_distance > min_tolerance)
+        far, far_distance = far[split], far_distance[split]
+        a, b, cap, force = a[split], b[split], cap[split], force[split]
+
+        significance[far] = np.where(force, np.inf, np.minimum(far_distance, cap))
+        cap = significance[far]
+        a, b = np.concatenate((a, far)), np.concatenate((far, b))
+        cap = np.concatenate((cap, cap))
+        force = np.zeros(len(a), dtype=bool)
+
+    return significance
+
+# '''
+# Purpose - level_rings(significance, ring_offsets, tolerance) returns the vertices kept at one tolerance and the ring offsets of the simplified rings.
+# Inputs - significance: an array of the significance of each vertex (see dp_significance(xy, ring_offsets, min_tolerance))
+#          ring_offsets: an array of the offset of the first vertex of each ring, followed by the number of vertices
+#          tolerance: the tolerance in meters Ex) 100.0
+# Outputs - keep: a boolean array of the vertices kept
+#           level_offsets: an array of the offset of the first kept vertex of each ring, followed by the number of kept vertices
+# '''
+def level_rings(significance, ring_offsets, tolerance):
+    keep = significance > tolerance
+    counts = np.add.reduceat(keep.astype(np.int64), ring_offsets[:-1]) if len(ring_offsets) > 1 else np.zeros(0, dtype=np.int64)
+    level_offsets = np.concatenate(([0], np.cumsum(counts)))
+    return keep, level_offsets
+
+# '''
+# Purpose - simplify_chunk(args) returns the significance of every vertex of one chunk of polygons. It is the worker function of simplify_chunks(lst_chunks, min_tolerance, pool, geographic).
+# Inputs - args: a (chunk number, coords, ring_offsets, min_tolerance, geographic) tuple, where geographic is True if the coordinates are longitude / latitude and False if they are already in meters
+# Outputs - a (chunk number, significance) tuple
+# '''
+def simplify_chunk(args):
+    chunk_id, coords, ring_offsets, min_tolerance, geographic = args
+    xy = local_meters(coords, ring_offsets) if geographic else np.asarray(coords, dtype=np.float64)
+    return chunk_id, dp_significance(xy, ring_offsets, min_tolerance)
+
+# '''
+# Purpose - simplify_chunks(lst_chunks, min_tolerance, pool, geographic) runs simplify_chunk(args) for each chunk of polygons, in a pool of worker processes if one is given, and returns the significance arrays in chunk order.
+#     The pool is created once by the caller and reused for every batch of chunks, since starting the worker processes can take longer than simplifying a batch.
+# Inputs - lst_chunks: a list of (coords, ring_offsets) pairs
+#          min_tolerance: the smallest tolerance in meters that will be used Ex) 10.0
+#          pool: a multiprocessing pool, or None to simplify the chunks in this process
+#          geographic: True if the coordinates are longitude / latitude, False if they are already in meters
+# Outputs - lst_significance: a list of the significance array of each chunk
+# '''
+def simplify_chunks(lst_chunks, min_tolerance, pool=None, geographic=True):
+    lst_args = [(chunk_id, coords, ring_offsets, min_tolerance, geographic) for chunk_id, (coords, ring_offsets) in enumerate(lst_chunks)]
+
+    if pool is not None and len(lst_args) > 1:
+        lst_results = list(pool.imap_unordered(simplify_chunk, lst_args))
+    else:
+        lst_results = [simplify_chunk(args) for args in lst_args]
+
+    return [significance for chunk_id, significance in sorted(lst_results, key=lambda result: result[0])]
@@ -4,22 +4,162 @@ Author: Caitlin Hartig
 Date: November 2024
 
 This script takes a zip folder that has first been created using the NFHL Download States script and then unzips this folder into the same parent directory. Next, it goes through the unzipped folder that it just created, unzips the first layer of subfolders inside the same folder, and then deletes the zipped files that it has just unzipped.
-Subsequently, the program goes through all the unzipped subfolders to find all the metadata.xml files contained within those subfolders. Once the program finds a working xml file, it returns the file pathway to the working metadata.xml file.
-Next, the program goes through all the unzipped subfolders to find specific layers as outlined in the input dictionary. The program pulls feature classes / tables from each subfolder that have the same name as each key listed in the input dictionary (coming from each distinct state / territory) and projects them into NAD83 if necessary. Then the program merges together all the feature classes / tables with the same key into one national output layer for each key, the name of which is defined as the corresponding value in the input dictionary. Finally, the program imports the metadata file onto each national output layer.
+The state / territory zips are independent of each other, so they can be unzipped in parallel across several CPU cores. A state / territory zip that cannot be unzipped is reported and skipped, and a summary of the size and time of each state / territory is printed at the end.
+In selective mode, the state / territory zips are read straight out of the main zip folder (through an in-memory buffer when they are small enough), and only the members of the geodatabase and the metadata.xml file are unzipped. Rasters, PDFs, and other files are skipped, and the state / territory zips themselves are never written to disk.
+Next, the program walks the unzipped subfolders once to build a layer index, which lists every feature class / table in each state / territory geodatabase whose name matches a key in the input dictionary, along with its data type and spatial reference, and the metadata.xml file of each state / territory. The index is saved as a JSON file next to the data.
+From the field lists in the index, the program then works out the union schema of each national output layer and how the fields of each state / territory layer map onto it, and reports the states / territories whose fields are missing, of another type or length, or in another order (schema drift) before any data is copied. The union schema and field mappings are also saved as a JSON file next to the data, and are used to create the national output layers and to merge or append into them.
+Subsequently, the program checks the metadata.xml files listed in the index one at a time, reading each only as far as its root element. Once the program finds a working xml file, it returns the file pathway to the working metadata.xml file, and caches it for later runs. The program then pulls feature classes / tables from each subfolder that have the same name as each key listed in the input dictionary (coming from each distinct state / territory) and projects them into NAD83 if necessary. Then the program merges together all the feature classes / tables with the same key into one national output layer for each key, the name of which is defined as the corresponding value in the input dictionary. Finally, the program imports the metadata file onto each national output layer.
+In streaming mode, the national output layer is created once and each state / territory layer is appended straight into it (projected into NAD83 on the way in when needed), so the state / territory layers are never copied into the Master GDB first.
+The projection into NAD83 can also be run in parallel: each worker process projects the layers of its state / territory into its own scratch geodatabase, and the main process then merges or appends them into the national output layers in state / territory order. A state / territory that cannot be projected is reported and left out of the national output layers.
+Every row of the national output layers is tagged with the number of its state / territory, and a manifest records the archive name, date, size, and checksum of each state / territory zip along with the rows it added to each national output layer. A refresh reads the manifest and only unzips and reloads the states / territories whose zip has changed since the last run: their old rows are deleted and their new rows are appended, and the rest of the national output layers are left as they are.
+An optional finishing stage rewrites each national output feature class in Hilbert-curve order of its feature centroids, so that features that are close together on the map are stored close together on disk, and builds attribute indexes on the commonly filtered fields. The time taken by a standard set of extent and attribute queries is recorded before and after.
+Another optional stage writes a small pyramid of simplified copies of a national output polygon layer (for example S_FLD_HAZ_AR at 10 m, 100 m, and 1 km tolerances) for small-scale maps, with the Douglas-Peucker engine of NFHL_Simplify.py, and reports how many vertices each level keeps.
 
-Libraries Utilized: datetime, os, zipfile, arcpy, xml
+Libraries Utilized: contextlib, datetime, hashlib, io, json, multiprocessing, os, shutil, tempfile, time, zipfile, arcpy, numpy, xml, NFHL_Simplify
 '''
 
-import datetime, os, zipfile, arcpy
+import contextlib, datetime, hashlib, io, json, multiprocessing, os, shutil, tempfile, time, zipfile, arcpy
+import numpy as np
+import NFHL_Simplify
 import xml.etree.ElementTree as ET
 
+STATE_FIELD = 'NFHL_STATE' # The field of the national layers that holds the state / territory number of each row
+
+# '''
+# Purpose - unzip_state(file_pathway) unzips one state / territory zip file into a folder of the same name and then deletes the zip file. It is the worker function of unzip_folder(zip_folder, workers), so it never stops the job: any error is caught and returned, the partly unzipped folder is removed, and the zip file is left in place.
+# Inputs - file_pathway: a file pathway to a state / territory zip file Ex) r'C:\Users\CaitlinHartig\Documents\NFHL\Data\NFHL_01_20241004.zip'
+# Outputs - a dictionary with the name of the zip, the unzipped folder, the zipped and unzipped size in bytes, the time in seconds, and the error message (None if the zip was unzipped)
+#     Ex) {'name': 'NFHL_01_20241004.zip', 'folder': r'...\NFHL_01_20241004', 'bytes_zipped': 81920000, 'bytes_unzipped': 412000000, 'seconds': 6.2, 'error': None}
 # '''
-# Purpose - unzip_folder(zip_folder) takes a zip folder that has first been created using the NFHL_Download_States.py script and unzips this folder into the same parent directory. 
+def unzip_state(file_pathway):
+    start = time.perf_counter()
+    unzip_subfolder_name = file_pathway[:-4]
+    dict_result = {'name': os.path.basename(file_pathway), 'folder': unzip_subfolder_name, 'bytes_zipped': 0, 'bytes_unzipped': 0, 'bytes_skipped': 0, 'seconds': 0.0, 'error': None}
+
+    try:
+        dict_result['bytes_zipped'] = os.path.getsize(file_pathway)
+
+        if os.path.isdir(unzip_subfolder_name): # If the unzipped folder already exists, attempts to remove it and create a new one
+            try:
+                os.remove(unzip_subfolder_name)
+            except PermissionError: # If unable to remove the existing folder due to permissions, tacks on a number to create a distinct unzipped folder
+                flag_exists_subfolder = 'y'
+                count_subfolder = 0
+                
+                while flag_exists_subfolder == 'y':
+                    count_subfolder += 1
+                    unzip_subfolder_name += '_{0}'.format(count_subfolder)
+
+                    if os.path.isdir(unzip_subfolder_name):
+                        unzip_subfolder_name = unzip_subfolder_name[:-2]
+                    else:
+                        flag_exists_subfolder = 'n'
+            dict_result['folder'] = unzip_subfolder_name
+
+        with zipfile.ZipFile(file_pathway, 'r') as myzip: # Extracts the subfolder
+            dict_result['bytes_unzipped'] = sum(info.file_size for info in myzip.infolist())
+            myzip.extractall(unzip_subfolder_name)
+
+        os.remove(file_pathway) # Removes the zipped file that was just extracted
+    except Exception as error: # A corrupt or unreadable zip only skips this state / territory
+        dict_result['error'] = '{0}: {1}'.format(type(error).__name__, error)
+        shutil.rmtree(unzip_subfolder_name, ignore_errors=True)
+
+    dict_result['seconds'] = time.perf_counter() - start
+    return dict_result
+
+# '''
+# Purpose - is_required_member(member_name) checks whether a file inside a state / territory zip is needed to build the national layers: any file inside a .gdb folder, and the metadata.xml file.
+#     A file geodatabase stores its feature classes / tables as numbered files listed in its own system tables, so the whole .gdb folder is kept rather than only the files of the dict_fcs layers.
+# Inputs - member_name: the name of the file inside the zip Ex) 'NFHL_01_20241004.gdb/a00000001.gdbtable'
+# Outputs - True if the file is needed, otherwise False
+# '''
+def is_required_member(member_name):
+    lst_parts = member_name.replace('\\', '/').rstrip('/').split('/')
+    return any(part[-4:].lower() == '.gdb' for part in lst_parts[:-1]) or lst_parts[-1][-4:].lower() == '.gdb' or 'metadata.xml' in lst_parts[-1]
+
+# '''
+# Purpose - unzip_state_members(args) is the selective version of unzip_state(file_pathway). It reads one state / territory zip straight out of the main zip folder and unzips only the files needed to build the national layers (see is_required_member(member_name)) into a folder of the same name.
+#     The state / territory zip is read into an in-memory buffer if it is no larger than max_buffer_mb, otherwise it is copied to a temporary file, since a zip can only be read from a seekable file. As with unzip_state(file_pathway), any error is caught and returned, and the partly unzipped folder is removed.
+# Inputs - args: a (zip_folder, member_name, unzip_subfolder_name, max_buffer_mb) tuple
+#               Ex) (r'C:\Users\CaitlinHartig\Documents\NFHL\Data.zip', 'Data/NFHL_01_20241004.zip', r'C:\Users\CaitlinHartig\Documents\NFHL\Data\Data\NFHL_01_20241004', 512)
+# Outputs - a dictionary as returned by unzip_state(file_pathway), where bytes_skipped is the unzipped size of the files that were not needed
+# '''
+def unzip_state_members(args):
+    zip_folder, member_name, unzip_subfolder_name, max_buffer_mb = args
+    start = time.perf_counter()
+    dict_result = {'name': os.path.basename(member_name), 'folder': unzip_subfolder_name, 'bytes_zipped': 0, 'bytes_unzipped': 0, 'bytes_skipped': 0, 'seconds': 0.0, 'error': None}
+    temp_path = None
+
+    try:
+        with zipfile.ZipFile(zip_folder, 'r') as outer_zip:
+            info = outer_zip.getinfo(member_name)
+            dict_result['bytes_zipped'] = info.file_size
+
+            with outer_zip.open(info) as member:
+                if info.file_size <= max_buffer_mb * 1048576:
+                    buffer = io.BytesIO(member.read())
+                else:
+                    with tempfile.NamedTemporaryFile(suffix='.zip', delete=False) as temp_file:
+                        shutil.copyfileobj(member, temp_file, 16 * 1048576)
+                        temp_path = temp_file.name
+                    buffer = temp_path
+
+        with zipfile.ZipFile(buffer, 'r') as myzip: # Extracts the needed files of the subfolder
+            for inner_info in myzip.infolist():
+                if inner_info.is_dir():
+                    continue
+                if is_required_member(inner_info.filename):
+                    myzip.extract(inner_info, unzip_subfolder_name)
+                    dict_result['bytes_unzipped'] += inner_info.file_size
+                else:
+                    dict_result['bytes_skipped'] += inner_info.file_size
+    except Exception as error: # A corrupt or unreadable zip only skips this state / territory
+        dict_result['error'] = '{0}: {1}'.format(type(error).__name__, error)
+        shutil.rmtree(unzip_subfolder_name, ignore_errors=True)
+    finally:
+        if temp_path is not None:
+            os.remove(temp_path)
+
+    dict_result['seconds'] = time.perf_counter() - start
+    return dict_result
+
+# '''
+# Purpose - print_unzip_summary(lst_results, seconds) prints the size, time, and speed of each state / territory zip unzipped by unzip_folder(zip_folder, workers), followed by the totals and a list of the zips that could not be unzipped.
+# Inputs - lst_results: a list of unzip_state(file_pathway) results
+#          seconds: the wall time in seconds for all the state / territory zips Ex) 95.2
+# Outputs - None
+# '''
+def print_unzip_summary(lst_results, seconds):
+    print('{0:<32} {1:>12} {2:>12} {3:>12} {4:>10} {5:>8}'.format('State/territory zip', 'Zipped MB', 'Unzipped MB', 'Skipped MB', 'Seconds', 'MB/s'))
+
+    for result in sorted(lst_results, key=lambda result: result['name']):
+        if result['error'] is None:
+            print('{0:<32} {1:>12.1f} {2:>12.1f} {3:>12.1f} {4:>10.1f} {5:>8.1f}'.format(result['name'], result['bytes_zipped'] / 1048576, result['bytes_unzipped'] / 1048576, result['bytes_skipped'] / 1048576, result['seconds'], result['bytes_unzipped'] / 1048576 / max(result['seconds'], 1e-6)))
+        else:
+            print('{0:<32} {1:>12.1f} {2:>12} {3:>12} {4:>10.1f} {5:>8}'.format(result['name'], result['bytes_zipped'] / 1048576, 'FAILED', '-', result['seconds'], '-'))
+
+    lst_failed = [result for result in lst_results if result['error'] is not None]
+    bytes_unzipped = sum(result['bytes_unzipped'] for result in lst_results if result['error'] is None)
+    bytes_skipped = sum(result['bytes_skipped'] for result in lst_results if result['error'] is None)
+    print('\n{0} of {1} state/territory zips unzipped: {2:.1f} MB written, {3:.1f} MB skipped, in {4:.1f} s ({5:.1f} s of unzip time).\n'.format(len(lst_results) - len(lst_failed), len(lst_results), bytes_unzipped / 1048576, bytes_skipped / 1048576, seconds, sum(result['seconds'] for result in lst_results)))
+
+    for result in lst_failed:
+        print('Error! Unable to unzip {0}; this state/territory has been skipped. {1}\n'.format(result['name'], result['error']))
+
+# '''
+# Purpose - unzip_folder(zip_folder, workers) takes a zip folder that has first been created using the NFHL_Download_States.py script and unzips this folder into the same parent directory. 
 #     It then goes through the unzipped folder that it just created, unzips the first layer of subfolders inside the same folder, and then finally deletes the zipped files that it has just unzipped.
+#     The subfolders are unzipped in a pool of worker processes when workers is more than 1 (see unzip_state(file_pathway)). A subfolder that cannot be unzipped is reported and skipped rather than stopping the job.
+#     In selective mode, the main folder is not unzipped as a whole: each subfolder zip is read straight out of it, and only the geodatabase and metadata.xml files are unzipped (see unzip_state_members(args)).
 # Inputs - file pathway for zip_folder Ex) r'C:\Users\CaitlinHartig\Documents\NFHL\Data.zip'
+#          workers: the number of worker processes used to unzip the subfolders Ex) 8
+#          selective: True to unzip only the geodatabase and metadata.xml files of each subfolder, False to unzip everything
+#          max_buffer_mb: in selective mode, the largest subfolder zip in MB that is read into memory rather than copied to a temporary file Ex) 512
 # Outputs - unzip name - a file pathway to the unzipped folder created by the program
+#           set_failed: a set of the state / territory numbers whose zip could not be unzipped (see archive_state(archive)) Ex) {'06'}
 # '''
-def unzip_folder(zip_folder):
+def unzip_folder(zip_folder, workers=1, selective=False, max_buffer_mb=512):
     if os.path.exists(zip_folder): # Checks to see if the zip folder is a valid pathway
         if zip_folder[-4:] == '.zip': # Checks to see if the zip folder is a .zip
             unzip_name = zip_folder[:-4]
@@ -43,229 +183,1247 @@ def unzip_folder(zip_folder):
                     else:
                         flag_exists = 'n'            
 
-        with zipfile.ZipFile(zip_folder, 'r') as myzip: # Extracts the main folder
-            myzip.extractall(unzip_name)
-        
-        print('Main folder unzipped.\n')
+        if selective:
+            with zipfile.ZipFile(zip_folder, 'r') as myzip: # Lists the subfolder zips and unzips the needed files that are not inside a subfolder zip
+                lst_infos = sorted((info for info in myzip.infolist() if info.filename[-4:].lower() == '.zip'), key=lambda info: info.file_size, reverse=True)
+                for info in myzip.infolist():
+                    if not info.is_dir() and info.filename[-4:].lower() != '.zip' and is_required_member(info.filename):
+                        myzip.extract(info, unzip_name)
 
-        for root, dirs, files in os.walk(unzip_name): # Unzips a secondary layer of zipped files within the unzipped folder (subfolders)
-            for file in files:
-                file_pathway = os.path.join(root, file)
+            print('Main folder listed; {0} subfolder zips found.\n'.format(len(lst_infos)))
 
-                if file_pathway[-4:] == '.zip': # Checks to see if the zip folder is a .zip
-                    unzip_subfolder_name = file_pathway[:-4]
+            function = unzip_state_members
+            lst_args = [(zip_folder, info.filename, os.path.join(unzip_name, *info.filename[:-4].split('/')), max_buffer_mb) for info in lst_infos]
+        else:
+            with zipfile.ZipFile(zip_folder, 'r') as myzip: # Extracts the main folder
+                myzip.extractall(unzip_name)
+            
+            print('Main folder unzipped.\n')
 
-                    if os.path.isdir(unzip_subfolder_name): # If the unzipped folder already exists, attempts to remove it and create a new one
-                        try:
-                            os.remove(unzip_subfolder_name)
-                        except PermissionError: # If unable to remove the existing folder due to permissions, tacks on a number to create a distinct unzipped folder
-                            flag_exists_subfolder = 'y'
-                            count_subfolder = 0
-                            
-                            while flag_exists_subfolder == 'y':
-                                count_subfolder += 1
-                                unzip_subfolder_name += '_{0}'.format(count_subfolder)
+            lst_zips = [] # This list holds the secondary layer of zipped files within the unzipped folder (subfolders)
+            for root, dirs, files in os.walk(unzip_name):
+                for file in files:
+                    if file[-4:] == '.zip': # Checks to see if the file is a .zip
+                        lst_zips.append(os.path.join(root, file))
 
-                                if os.path.isdir(unzip_subfolder_name):
-                                    unzip_subfolder_name = unzip_subfolder_name[:-2]
-                                else:
-                                    flag_exists_subfolder = 'n'         
+            function = unzip_state
+            lst_args = sorted(lst_zips, key=os.path.getsize, reverse=True) # The largest zips are started first, so that one large zip does not run on its own at the end
 
-                    with zipfile.ZipFile(file_pathway, 'r') as myzip: # Extracts the subfolder
-                        myzip.extractall(unzip_subfolder_name)
+        start = time.perf_counter()
 
-                    os.remove(file_pathway) # Removes the zipped file that was just extracted
+        if workers > 1 and len(lst_args) > 1:
+            with multiprocessing.Pool(min(workers, len(lst_args))) as pool:
+                lst_results = list(pool.imap_unordered(function, lst_args))
+        else:
+            lst_results = [function(args) for args in lst_args]
 
         print('Subfolders unzipped.\n')
+        print_unzip_summary(lst_results, time.perf_counter() - start)
+        set_failed = {archive_state(result['name']) for result in lst_results if result['error'] is not None}
 
     else:
         print('Error! Folder directory does not exist.\n')
         quit()
 
-    return unzip_name
+    return unzip_name, set_failed
 
 # '''
-# Purpose - obtain_metadata(folder) takes a folder that has first been unzipped using the unzip_folder(zip_folder) function and goes through all the subfolders to find all the metadata.xml files contained within those subfolders.
-#     The program then checks each metadata.xml file to make sure that it can be opened/read, and that it is a valid xml file. 
-#     Once the program finds a working xml file, it stops analyzing the rest of the metadata.xml files and returns the file pathway to the working metadata.xml file.
+# Purpose - is_valid_metadata(metadata_filepath) checks that a metadata.xml file can be opened and is an xml file, without reading the whole file: the file is parsed incrementally with iterparse only until its root element opens, and the end of the file is checked for the closing tag of that root element, which catches a file that was cut short.
+# Inputs - metadata_filepath: a file pathway to a metadata.xml file Ex) r'C:\Users\CaitlinHartig\Documents\NFHL\Data\NFHL_01_20241004\NFHL_01_20241004_metadata.xml'
+# Outputs - True if the file is a working metadata file, otherwise False
+# '''
+def is_valid_metadata(metadata_filepath):
+    try:
+        with open(metadata_filepath, 'rb') as infile:
+            for event, element in ET.iterparse(infile, events=('start',)):
+                root_tag = element.tag
+                break
+            else:
+                return False
+
+            infile.seek(max(0, os.path.getsize(metadata_filepath) - 1024))
+            tail = infile.read().decode('utf-8', 'ignore')
+    except (OSError, ET.ParseError):
+        return False
+
+    root_name = root_tag.rsplit('}', 1)[-1] # The name of the root element without its namespace Ex) 'metadata'
+    return '</{0}>'.format(root_name) in tail or ':{0}>'.format(root_name) in tail.rsplit('</', 1)[-1]
+
+# '''
+# Purpose - file_checksum(file_pathway) returns the SHA-256 checksum of a file, read in blocks.
+# Inputs - file_pathway: a file pathway Ex) r'C:\Users\CaitlinHartig\Documents\NFHL\Data\NFHL_01_20241004\NFHL_01_20241004_metadata.xml'
+# Outputs - the checksum as a hexadecimal string
+# '''
+def file_checksum(file_pathway):
+    checksum = hashlib.sha256()
+    with open(file_pathway, 'rb') as infile:
+        for block in iter(lambda: infile.read(1048576), b''):
+            checksum.update(block)
+    return checksum.hexdigest()
+
+# '''
+# Purpose - obtain_metadata(folder, dict_index, cache_path) finds a working metadata.xml file in a folder that has first been unzipped using the unzip_folder(zip_folder) function.
+#     The metadata.xml files are taken from the layer index (see build_layer_index(folder, dict_fcs, index_path)), which lists them while it walks the folder, so the folder is only walked again if no index is given.
+#     The metadata.xml files are checked one at a time (see is_valid_metadata(metadata_filepath)), and the first working file is returned. Its file pathway and checksum are saved to a JSON cache, so later runs on the same data return it straight away.
 # Inputs - folder: a folder pathway for an unzipped NFHL data folder Ex) r'C:\Users\CaitlinHartig\Documents\NFHL\Data'
+#          dict_index: the layer index of the folder, or None to walk the folder for the metadata.xml files
+#          cache_path: a file pathway for the JSON cache, or None to save it as NFHL_metadata.json in the folder
 # Outputs - metadata_filepath: the file pathway to the first working metadata file in the input folder
 # '''
-def obtain_metadata(folder):
-    flag_meta = 0 # This counter remains 0 until the program finds a metadata file that functions
-    dict_metadata = {} # This dictionary holds the file pathways to the metadata.xml for each state / territory
+def obtain_metadata(folder, dict_index=None, cache_path=None):
+    if cache_path is None:
+        cache_path = os.path.join(folder, 'NFHL_metadata.json')
+
+    if os.path.exists(cache_path): # Use the metadata file chosen by the last run, if it has not changed since
+        try:
+            with open(cache_path, 'r') as infile:
+                dict_cache = json.load(infile)
+            if os.path.exists(dict_cache['path']) and file_checksum(dict_cache['path']) == dict_cache['checksum']:
+                return dict_cache['path']
+        except (OSError, ValueError, KeyError):
+            pass
+
+    if dict_index is not None and 'metadata' in dict_index:
+        lst_metadata = [dict_index['metadata'][state] for state in sorted(dict_index['metadata'])]
+    else:
+        lst_metadata = [] # This list holds the file pathways to the metadata.xml files next to each state / territory geodatabase
+        for root, dirs, files in os.walk(folder):
+            if any(dir_name[-4:] == '.gdb' for dir_name in dirs):
+                lst_metadata.extend(os.path.join(root, file) for file in sorted(files) if 'metadata.xml' in file)
+            dirs[:] = [dir_name for dir_name in dirs if dir_name[-4:] != '.gdb']
+
+    if len(lst_metadata) == 0:
+        print('Error! No metadata.xml files found for any state/territory. Please manually check the unzipped folder.')
+        quit()
+
+    for metadata_filepath in lst_metadata: # Find the first working metadata file to use for the metadata import for each national layer
+        if is_valid_metadata(metadata_filepath):
+            with open(cache_path, 'w') as outfile:
+                json.dump({'path': metadata_filepath, 'checksum': file_checksum(metadata_filepath)}, outfile, indent=1)
+            return metadata_filepath
+
+    print('Error! Unable to open/read a valid xml file for any state/territory. Please manually check all metadata files.')
+    quit()
+
+# '''
+# Purpose - build_layer_index(folder, dict_fcs, index_path) takes a folder that has first been unzipped using the unzip_folder(zip_folder) function and walks through it once to find the layers outlined in the input dictionary dict_fcs.
+#     Each state / territory geodatabase is listed once with arcpy.da.Walk (which also looks inside feature datasets), and each feature class / table whose name contains one of the keys is described once, which also gives its field list. The .gdb folders themselves are not walked by os.walk.
+#     The index is saved as a JSON file, so that it can be reloaded with load_layer_index(index_path) without walking the folder again. It records the geodatabases it was built from (see list_gdbs(folder)), so that obtain_layer_index(folder, dict_fcs, index_path) can tell whether it is still current.
+# Inputs - folder: a folder pathway for an unzipped NFHL data folder Ex) r'C:\Users\CaitlinHartig\Documents\NFHL\Data'
+#          dict_fcs: the dictionary of NFHL feature class / table names (see create_national_layer(folder, dict_fcs, master_gdb, metadata_filepath, dict_index))
+#          index_path: a file pathway for the JSON index, or None to save it as NFHL_layer_index.json in the folder Ex) r'C:\Users\CaitlinHartig\Documents\NFHL\Data\NFHL_layer_index.json'
+# Outputs - dict_index: a dictionary holding the list of state / territory numbers found, for each key, a list of [state / territory number, dataset pathway, data type, spatial reference name] entries, the metadata.xml file of each state / territory, and the fields of each dataset pathway
+#     Ex) {'states': ['01', '02'], 'layers': {'S_BFE': [['01', r'...\NFHL_01_20241004.gdb\FIRM_Spatial_Layers\S_BFE', 'FeatureClass', 'GCS_North_American_1983']], ...}, 'metadata': {'01': r'...\NFHL_01_20241004\NFHL_01_20241004_metadata.xml', ...}}
+# '''
+def build_layer_index(folder, dict_fcs, index_path=None):
+    if index_path is None:
+        index_path = os.path.join(folder, 'NFHL_layer_index.json')
+
+    lst_states = [] # This list holds the state / territory number of each geodatabase found
+    dict_layers = {item: [] for item in dict_fcs} # This dictionary holds the matching feature classes / tables for each key
+    dict_metadata = {} # This dictionary holds the file pathway to the metadata.xml file next to each state / territory geodatabase
+    dict_fields = {} # This dictionary holds the [name, type, length, alias] of each field of each feature class / table found, in field order
+    dict_gdbs = list_gdbs(folder)
+
+    for root, dirs, files in os.walk(folder):
+        lst_gdbs = [dir_name for dir_name in dirs if dir_name[-4:] == '.gdb']
+        dirs[:] = [dir_name for dir_name in dirs if dir_name[-4:] != '.gdb'] # The geodatabases are listed with arcpy.da.Walk instead
+
+        for dir_name in sorted(lst_gdbs):
+            gdb = os.path.join(root, dir_name)
+
+            start_index = dir_name.find('_')
+            end_index = dir_name.rfind('_')
+            state = dir_name[start_index + 1:end_index] # Find the state / territory number for the geodatabase being worked on
+            lst_states.append(state)
+
+            lst_metadata = sorted(file for file in files if 'metadata.xml' in file)
+            if len(lst_metadata) != 0:
+                dict_metadata[state] = os.path.join(root, lst_metadata[0])
+
+            for dirpath, dirnames, filenames in arcpy.da.Walk(gdb, datatype=['FeatureClass', 'Table']):
+                for fc in filenames:
+                    lst_items = [item for item in dict_fcs if item in fc.upper()]
+                    if len(lst_items) == 0:
+                        continue
+
+                    fc_path = os.path.join(dirpath, fc)
+                    desc = arcpy.Describe(fc_path)
+                    sr_name = desc.spatialReference.name if desc.dataType == 'FeatureClass' else None
+                    dict_fields[fc_path] = [[field.name, field.type, field.length, field.aliasName] for field in desc.fields if not field.required] # ObjectID, shape, and shape length / area fields are managed by the geodatabase
+
+                    for item in lst_items:
+                        dict_layers[item].append([state, fc_path, desc.dataType, sr_name])
+
+    dict_index = {'folder': folder, 'states': lst_states, 'layers': dict_layers, 'metadata': dict_metadata, 'fields': dict_fields, 'gdbs': dict_gdbs}
+
+    with open(index_path, 'w') as outfile:
+        json.dump(dict_index, outfile, indent=1)
+
+    count_layers = sum(len(lst_entries) for lst_entries in dict_layers.values())
+    print('Layer index built: {0} feature classes / tables found in {1} state/territory geodatabases. Saved to {2}\n'.format(count_layers, len(lst_states), index_path))
+
+    return dict_index
+
+# '''
+# Purpose - load_layer_index(index_path) reads a layer index saved by build_layer_index(folder, dict_fcs, index_path).
+# Inputs - index_path: a file pathway to the JSON index Ex) r'C:\Users\CaitlinHartig\Documents\NFHL\Data\NFHL_layer_index.json'
+# Outputs - dict_index: the layer index (see build_layer_index(folder, dict_fcs, index_path))
+# '''
+def load_layer_index(index_path):
+    with open(index_path, 'r') as infile:
+        return json.load(infile)
+
+# '''
+# Purpose - list_gdbs(folder) lists the state / territory geodatabases in a folder with the modified time of each one's system catalog (a00000001.gdbtable), which changes whenever the geodatabase is unzipped again or a feature class / table is added to it. Reading a geodatabase with arcpy adds lock files to it, so the modified time of the .gdb folder itself is not used.
+#     Only the folders outside the geodatabases are walked, so this is quick even for the national download.
+# Inputs - folder: a folder pathway for an unzipped NFHL data folder Ex) r'C:\Users\CaitlinHartig\Documents\NFHL\Data'
+# Outputs - dict_gdbs: a dictionary holding the modified time of each geodatabase, keyed on its pathway
+# '''
+def list_gdbs(folder):
+    dict_gdbs = {}
 
     for root, dirs, files in os.walk(folder):
         for dir_name in dirs:
             if dir_name[-4:] == '.gdb':
-                arcpy.env.workspace = os.path.join(root, dir_name)
+                gdb = os.path.join(root, dir_name)
+                catalog = os.path.join(gdb, 'a00000001.gdbtable')
+                dict_gdbs[gdb] = os.path.getmtime(catalog if os.path.exists(catalog) else gdb)
+        dirs[:] = [dir_name for dir_name in dirs if dir_name[-4:] != '.gdb']
 
-                start_index = dir_name.find('_')
-                end_index = dir_name.rfind('_')
-                dir_name_number = dir_name[start_index:end_index] # Find the state / territory number for the feature class being worked on
+    return dict_gdbs
 
-                if flag_meta == 0:
-                    for file in files:
-                        if 'metadata.xml' in file: # Pull the metadata.xml files
-                            dict_metadata[dir_name_number] = os.path.join(root, file)
+# '''
+# Purpose - obtain_layer_index(folder, dict_fcs, index_path) returns the layer index of a folder, reloading the one saved by the last run if it is still current and building it otherwise (see build_layer_index(folder, dict_fcs, index_path)).
+#     A saved index is current if it was built for the same folder, covers every key of dict_fcs, and lists the same geodatabases, none of which has changed since (see list_gdbs(folder)). An index from an older run that does not list its geodatabases is rebuilt.
+# Inputs - folder: a folder pathway for an unzipped NFHL data folder Ex) r'C:\Users\CaitlinHartig\Documents\NFHL\Data'
+#          dict_fcs: the dictionary of NFHL feature class / table names (see create_national_layer(folder, dict_fcs, master_gdb, metadata_filepath, dict_index))
+#          index_path: a file pathway for the JSON index, or None to use NFHL_layer_index.json in the folder
+# Outputs - dict_index: the layer index (see build_layer_index(folder, dict_fcs, index_path))
+# '''
+def obtain_layer_index(folder, dict_fcs, index_path=None):
+    if index_path is None:
+        index_path = os.path.join(folder, 'NFHL_layer_index.json')
 
-    metadata_items = list(dict_metadata.items())
+    if os.path.exists(index_path):
+        try:
+            dict_index = load_layer_index(index_path)
+            if dict_index.get('folder') == folder and all(item in dict_index['layers'] for item in dict_fcs) and dict_index.get('gdbs') == list_gdbs(folder):
+                print('Layer index reused: {0} state/territory geodatabases unchanged since {1} was built.\n'.format(len(dict_index['states']), index_path))
+                return dict_index
+        except (OSError, ValueError, KeyError):
+            pass
 
-    for metadata in metadata_items: # Find the first working metadata file to use for the metadata import for each national layer
-        while flag_meta == 0:
-            metadata_filepath = metadata[1]
-            try:
-                infile = open(metadata_filepath, 'r')
-                file_contents = infile.read()
-            except:
-                if metadata == metadata_items[-1]:
-                    print('Error! Unable to open/read any xml files for any state/territory. Please manually check all metadata files.')
-                    quit()
+    return build_layer_index(folder, dict_fcs, index_path)
+
+# '''
+# Purpose - build_union_schema(dict_index, dict_fcs, schema_path) works out, for each key, the union schema of the national layer and how the fields of each state / territory layer map onto it, from the field lists in the layer index, and prints a schema drift report.
+#     Fields are matched by name regardless of case. The union schema holds every field found in any state / territory layer, in the order they are first found, with the type of the first layer that has it and the longest text length found, as the Merge tool would.
+#     A state / territory layer drifts if it is missing fields of the union schema, has a field of another type or a shorter / longer text length, or has its fields in another order (see layer_drift(lst_layer_fields, lst_fields)). The report is printed before any data is copied, so a state / territory that will lose values can be caught early.
+#     The layer index from an older run may not hold field lists, in which case the fields of each layer are listed once here instead.
+# Inputs - dict_index: the layer index of the folder (see build_layer_index(folder, dict_fcs, index_path))
+#          dict_fcs: the dictionary of NFHL feature class / table names (see create_national_layer(folder, dict_fcs, master_gdb, metadata_filepath, dict_index))
+#          schema_path: a file pathway for the JSON schema, or None to save it as NFHL_schema.json in the folder of the layer index
+# Outputs - dict_schema: a dictionary holding, for each key, the union [name, type, length, alias] fields, the field map of each dataset pathway ({union field name: state / territory field name}), and the drift of each state / territory
+#     Ex) {'S_BFE': {'fields': [['BFE_LN_ID', 'String', 25, 'BFE_LN_ID'], ...], 'maps': {r'...\S_BFE': {'BFE_LN_ID': 'BFE_LN_ID', ...}}, 'drift': {'06': {'missing': ['V_DATUM'], 'type': [], 'length': ['SOURCE_CIT'], 'order': False, 'extra': []}}}}
+# '''
+def build_union_schema(dict_index, dict_fcs, schema_path=None):
+    if schema_path is None:
+        schema_path = os.path.join(dict_index['folder'], 'NFHL_schema.json')
+
+    dict_fields = dict_index.get('fields', {})
+    dict_schema = {}
+    count_drift = 0
+
+    for item in dict_fcs:
+        lst_entries = dict_index['layers'].get(item, [])
+        dict_union = {} # This dictionary holds the union fields by their uppercase name, in the order they are first found
+
+        for state, in_fc, data_type_fc, sr_name in lst_entries:
+            if in_fc not in dict_fields:
+                dict_fields[in_fc] = [[field.name, field.type, field.length, field.aliasName] for field in arcpy.ListFields(in_fc) if not field.required]
+
+            for name, field_type, length, alias in dict_fields[in_fc]:
+                union_field = dict_union.setdefault(name.upper(), [name, field_type, length, alias])
+                if field_type == 'String' and union_field[1] == 'String' and length > union_field[2]:
+                    union_field[2] = length
+
+        lst_fields = list(dict_union.values())
+        dict_maps = {} # This dictionary holds the field map of each state / territory layer
+        dict_drift = {} # This dictionary holds the drift of each state / territory layer that differs from the union schema
+
+        for state, in_fc, data_type_fc, sr_name in lst_entries:
+            dict_maps[in_fc], dict_layer_drift = layer_drift(dict_fields[in_fc], lst_fields)
+            if dict_layer_drift is not None:
+                dict_drift[state] = dict_layer_drift
+
+        dict_schema[item] = {'fields': lst_fields, 'maps': dict_maps, 'drift': dict_drift}
+        print_schema_drift(item, dict_drift)
+        count_drift += len(dict_drift)
+
+    with open(schema_path, 'w') as outfile:
+        json.dump(dict_schema, outfile, indent=1)
+
+    print('\nUnion schema built for {0} layers: {1} state/territory layers drift from it. Saved to {2}\n'.format(len(dict_schema), count_drift, schema_path))
+    return dict_schema
+
+# '''
+# Purpose - layer_drift(lst_layer_fields, lst_fields) works out how the fields of one state / territory layer map onto the union schema of its national layer, and how the layer drifts from it (see build_union_schema(dict_index, dict_fcs, schema_path)).
+#     Fields are matched by name regardless of case. A layer drifts if it is missing fields of the union schema, has a field of another type or a shorter / longer text length, has its fields in another order, or has fields the union schema does not hold (which can only happen when a state / territory is reloaded into an existing national layer, see refresh_national_layers; their values are dropped).
+# Inputs - lst_layer_fields: the [name, type, length, alias] fields of the state / territory layer
+#          lst_fields: the union [name, type, length, alias] fields Ex) [['BFE_LN_ID', 'String', 25, 'BFE_LN_ID'], ...]
+# Outputs - dict_map: the field map of the layer ({union field name: state / territory field name})
+#           dict_drift: the drift of the layer, or None if it matches the union schema Ex) {'missing': ['V_DATUM'], 'type': [], 'length': ['SOURCE_CIT'], 'order': False, 'extra': []}
+# '''
+def layer_drift(lst_layer_fields, lst_fields):
+    dict_layer = {name.upper(): [name, field_type, length, alias] for name, field_type, length, alias in lst_layer_fields}
+    dict_union = {field[0].upper(): field for field in lst_fields}
+    lst_order = list(dict_union) # The order of the union fields
+
+    dict_map = {dict_union[key][0]: dict_layer[key][0] for key in lst_order if key in dict_layer}
+
+    lst_missing = [dict_union[key][0] for key in lst_order if key not in dict_layer]
+    lst_type = [dict_union[key][0] for key in lst_order if key in dict_layer and dict_layer[key][1] != dict_union[key][1]]
+    lst_length = [dict_union[key][0] for key in lst_order if key in dict_layer and dict_layer[key][1] == 'String' == dict_union[key][1] and dict_layer[key][2] != dict_union[key][2]]
+    lst_extra = [name for name, field_type, length, alias in lst_layer_fields if name.upper() not in dict_union]
+    flag_order = [name.upper() for name, field_type, length, alias in lst_layer_fields if name.upper() in dict_union] != [key for key in lst_order if key in dict_layer]
+
+    if len(lst_missing) + len(lst_type) + len(lst_length) + len(lst_extra) == 0 and not flag_order:
+        return dict_map, None
+    return dict_map, {'missing': lst_missing, 'type': lst_type, 'length': lst_length, 'order': flag_order, 'extra': lst_extra}
+
+# '''
+# Purpose - print_schema_drift(item, dict_drift) prints the schema drift report of one key (see layer_drift(lst_layer_fields, lst_fields)).
+# Inputs - item: the key Ex) 'S_BFE'
+#          dict_drift: the drift of each state / territory layer that differs from the union schema Ex) {'06': {'missing': ['V_DATUM'], 'type': [], 'length': [], 'order': False, 'extra': []}}
+# Outputs - None
+# '''
+def print_schema_drift(item, dict_drift):
+    for state, dict_state_drift in sorted(dict_drift.items()):
+        lst_notes = []
+        if len(dict_state_drift['missing']) != 0:
+            lst_notes.append('missing fields {0}'.format(', '.join(dict_state_drift['missing'])))
+        if len(dict_state_drift['type']) != 0:
+            lst_notes.append('fields of another type {0}'.format(', '.join(dict_state_drift['type'])))
+        if len(dict_state_drift['length']) != 0:
+            lst_notes.append('text fields of another length {0}'.format(', '.join(dict_state_drift['length'])))
+        if len(dict_state_drift.get('extra', [])) != 0:
+            lst_notes.append('fields not in the national layer {0}, whose values are dropped'.format(', '.join(dict_state_drift['extra'])))
+        if dict_state_drift['order']:
+            lst_notes.append('fields in another order')
+        print('Schema drift: {0} layer for state/territory # {1} has {2}.'.format(item, state, '; '.join(lst_notes)))
+
+# '''
+# Purpose - schema_field_mappings(lst_inputs, lst_fields) builds the field mappings used to merge state / territory layers into a national layer with the union schema (see build_union_schema(dict_index, dict_fcs, schema_path)).
+# Inputs - lst_inputs: a list of (dataset pathway, field map) pairs, where the field map is {union field name: state / territory field name} Ex) [(r'...\S_BFE', {'BFE_LN_ID': 'BFE_LN_ID', ...})]
+#          lst_fields: the union [name, type, length, alias] fields Ex) [['BFE_LN_ID', 'String', 25, 'BFE_LN_ID'], ...]
+# Outputs - field_mappings: an arcpy FieldMappings object
+# '''
+def schema_field_mappings(lst_inputs, lst_fields):
+    field_mappings = arcpy.FieldMappings()
+
+    for name, field_type, length, alias in lst_fields:
+        field_map = arcpy.FieldMap()
+        for fc, dict_map in lst_inputs:
+            if name in dict_map:
+                field_map.addInputField(fc, dict_map[name])
+        if field_map.inputFieldCount == 0:
+            continue
+
+        out_field = field_map.outputField
+        out_field.name = name
+        out_field.aliasName = alias
+        out_field.type = field_type
+        if field_type == 'String':
+            out_field.length = length
+        field_map.outputField = out_field
+        field_mappings.addFieldMap(field_map)
+
+    return field_mappings
+
+# '''
+# Purpose - project_state(args) copies or projects the NFHL layers of one state / territory into NAD83, in a scratch geodatabase of its own. It is the worker function of project_states(dict_index, scratch_folder, workers), so it never stops the job: any error is caught and returned, and the state / territory is left out of the national layers.
+#     Each worker only writes to its own scratch geodatabase, so the workers never wait on each other for a geodatabase lock.
+# Inputs - args: a (state, lst_layers, scratch_folder) tuple, where lst_layers is a list of [dataset pathway, data type, spatial reference name] entries of the layer index (see build_layer_index(folder, dict_fcs, index_path))
+#     Ex) ('01', [[r'...\NFHL_01_20241004.gdb\FIRM_Spatial_Layers\S_BFE', 'FeatureClass', 'GCS_WGS_1984']], r'C:\Users\CaitlinHartig\Documents\NFHL\Data\NFHL_Projected')
+# Outputs - a dictionary with the state / territory number, the scratch geodatabase, the projected copy of each dataset pathway, the time in seconds, and the error message (None if every layer was projected)
+#     Ex) {'state': '01', 'gdb': r'...\NFHL_Projected\State_01.gdb', 'layers': {r'...\S_BFE': r'...\State_01.gdb\S_BFE'}, 'seconds': 14.8, 'error': None}
+# '''
+def project_state(args):
+    state, lst_layers, scratch_folder = args
+    start = time.perf_counter()
+    gdb = os.path.join(scratch_folder, 'State_{0}.gdb'.format(state))
+    dict_result = {'state': state, 'gdb': gdb, 'layers': {}, 'seconds': 0.0, 'error': None}
+
+    try:
+        arcpy.env.overwriteOutput = 1
+        if not arcpy.Exists(gdb):
+            arcpy.management.CreateFileGDB(scratch_folder, 'State_{0}.gdb'.format(state), 'CURRENT')
+
+        # Define projection: NAD83
+        wkt = 'GEOGCS["NAD83",DATUM["North_American_Datum_1983",SPHEROID["GRS 1980",6378137,298.257222101,AUTHORITY["EPSG","7019"]],AUTHORITY["EPSG","6269"]],PRIMEM["Greenwich",0,AUTHORITY["EPSG","8901"]],UNIT["degree",0.01745329251994328,AUTHORITY["EPSG","9122"]],AUTHORITY["EPSG","4269"]]'
+        sr = arcpy.SpatialReference()
+        sr.loadFromString(wkt)
+        set_names = set() # This set holds the output names used so far, since two feature datasets can hold layers of the same name
+
+        for in_fc, data_type_fc, sr_name in lst_layers:
+            out_name = os.path.basename(in_fc).upper()
+            count_name = 0
+            while out_name in set_names:
+                count_name += 1
+                out_name = '{0}_{1}'.format(os.path.basename(in_fc).upper(), count_name)
+            set_names.add(out_name)
+            out_fc = os.path.join(gdb, out_name)
+
+            copy_state(in_fc, out_fc, state, sr, data_type_fc) # Feature classes that are not in NAD83 are projected as they are copied
+            dict_result['layers'][in_fc] = out_fc
+    except Exception as error: # A layer that cannot be projected only skips this state / territory
+        dict_result['error'] = '{0}: {1}'.format(type(error).__name__, error)
+        dict_result['layers'] = {}
+
+    dict_result['seconds'] = time.perf_counter() - start
+    return dict_result
+
+# '''
+# Purpose - project_states(dict_index, scratch_folder, workers) runs project_state(args) for every state / territory in the layer index, in a pool of worker processes, and prints a progress line for each state / territory as it finishes.
+#     The states / territories with the largest geodatabases are started first, so that one large state / territory does not run on its own at the end.
+# Inputs - dict_index: the layer index of the folder (see build_layer_index(folder, dict_fcs, index_path))
+#          scratch_folder: a folder pathway for the scratch geodatabases Ex) r'C:\Users\CaitlinHartig\Documents\NFHL\Data\NFHL_Projected'
+#          workers: the number of worker processes Ex) 8
+# Outputs - dict_projected: a dictionary holding the projected copy of each dataset pathway of the states / territories that were projected
+#           set_failed: a set of the state / territory numbers that could not be projected
+# '''
+def project_states(dict_index, scratch_folder, workers):
+    if not os.path.isdir(scratch_folder):
+        os.makedirs(scratch_folder)
+
+    dict_layers = {} # This dictionary holds the distinct layers of each state / territory
+    for lst_entries in dict_index['layers'].values():
+        for state, in_fc, data_type_fc, sr_name in lst_entries:
+            dict_layers.setdefault(state, {})[in_fc] = [in_fc, data_type_fc, sr_name]
+
+    def gdb_size(state): # The size on disk of the geodatabase of the state / territory
+        in_fc = next(iter(dict_layers[state]))
+        gdb = in_fc[:in_fc.lower().find('.gdb') + 4]
+        return sum(entry.stat().st_size for entry in os.scandir(gdb) if entry.is_file())
+
+    lst_args = [(state, list(dict_layers[state].values()), scratch_folder) for state in sorted(dict_layers, key=gdb_size, reverse=True)]
+
+    start = time.perf_counter()
+    dict_projected = {}
+    set_failed = set()
+
+    with multiprocessing.Pool(max(1, min(workers, len(lst_args)))) as pool:
+        for count, result in enumerate(pool.imap_unordered(project_state, lst_args), 1):
+            if result['error'] is None:
+                dict_projected.update(result['layers'])
+                print('State/territory # {0} projected: {1} layers in {2:.1f} s ({3} of {4}).'.format(result['state'], len(result['layers']), result['seconds'], count, len(lst_args)))
             else:
-                try:
-                    ET.fromstring(file_contents)
-                except ET.ParseError:
-                    if metadata == metadata_items[-1]:
-                        print('Error! Invalid xml files for all states/territories. Please manually check all metadata files.')
-                        quit()
-                else:
-                    flag_meta = 1
-    return metadata_filepath
+                set_failed.add(result['state'])
+                print('Error! Unable to project state/territory # {0} ({1}). It will be left out of the national layers. ({2} of {3})'.format(result['state'], result['error'], count, len(lst_args)))
+
+    print('\nStates/territories projected in {0:.1f} s: {1} projected, {2} failed.\n'.format(time.perf_counter() - start, len(lst_args) - len(set_failed), len(set_failed)))
+    return dict_projected, set_failed
+
+# '''
+# Purpose - create_national_target(lst_entries, merge_output, sr, lst_fields) creates an empty national layer for streaming mode (see create_national_layer(folder, dict_fcs, master_gdb, metadata_filepath, dict_index, streaming)).
+#     The first state / territory layer is used as the template. The fields of the union schema that it does not have are added, and its text fields are widened to the union schema, so that every state / territory can be appended without losing values.
+# Inputs - lst_entries: the layer index entries of one key (see build_layer_index(folder, dict_fcs, index_path))
+#          merge_output: the file pathway to the national layer Ex) r'C:\Users\CaitlinHartig\Documents\Tools\Master_GDB.gdb\Hydro_NatFloodHaz_S_BFE_FEMA'
+#          sr: the NAD83 spatial reference of the national layer
+#          lst_fields: the union [name, type, length, alias] fields of the key (see build_union_schema(dict_index, dict_fcs, schema_path))
+# Outputs - data_type: the data type of the national layer ('FeatureClass' or 'Table')
+# '''
+def create_national_target(lst_entries, merge_output, sr, lst_fields):
+    dict_types = {'String': 'TEXT', 'Integer': 'LONG', 'SmallInteger': 'SHORT', 'BigInteger': 'BIGINTEGER', 'Double': 'DOUBLE', 'Single': 'FLOAT', 'Date': 'DATE', 'DateOnly': 'DATEONLY', 'TimeOnly': 'TIMEONLY', 'TimestampOffset': 'TIMESTAMPOFFSET', 'GUID': 'GUID', 'Blob': 'BLOB'}
+    state, template, data_type, sr_name = lst_entries[0]
+    master_gdb, name_new = os.path.split(merge_output)
+
+    if data_type == 'FeatureClass':
+        arcpy.management.CreateFeatureclass(master_gdb, name_new, arcpy.Describe(template).shapeType.upper(), template, spatial_reference=sr)
+    else:
+        arcpy.management.CreateTable(master_gdb, name_new, template)
+
+    dict_target = {field.name.upper(): field for field in arcpy.ListFields(merge_output)}
+
+    for name, field_type, length, alias in lst_fields:
+        if field_type not in dict_types: # GlobalID and raster fields are managed by the geodatabase
+            continue
+        if name.upper() not in dict_target:
+            arcpy.management.AddField(merge_output, name, dict_types[field_type], field_length=length if field_type == 'String' else None, field_alias=alias)
+        elif field_type == 'String' and dict_target[name.upper()].type == 'String' and length > dict_target[name.upper()].length:
+            arcpy.management.AlterField(merge_output, dict_target[name.upper()].name, field_length=length) # The national layer is still empty, so its text fields can be widened
+
+    if STATE_FIELD.upper() not in dict_target:
+        arcpy.management.AddField(merge_output, STATE_FIELD, 'TEXT', field_length=10)
+
+    return data_type
+
+# '''
+# Purpose - append_state(in_fc, merge_output, state, sr, dict_map) appends one state / territory layer into a national layer or a copy of it, projecting it into NAD83 on the way in when needed, with every new row already tagged with the state / territory number.
+#     The rows are read with a search cursor in the NAD83 spatial reference and written with an insert cursor, so each row is written once, and the insert cursor hands back the ObjectID of each new row. Text values longer than their field, or read from a field of another type, are cut to the length of the field, as the Append tool would.
+#     If a row cannot be written, the rows already written are deleted again before the error is raised, so the state / territory adds either all of its rows or none.
+# Inputs - in_fc: a file pathway to the state / territory feature class / table Ex) r'...\NFHL_01_20241004.gdb\FIRM_Spatial_Layers\S_BFE'
+#          merge_output: the file pathway to the national layer Ex) r'C:\Users\CaitlinHartig\Documents\Tools\Master_GDB.gdb\Hydro_NatFloodHaz_S_BFE_FEMA'
+#          state: the state / territory number Ex) '01'
+#          sr: the NAD83 spatial reference of the national layer
+#          dict_map: the field map of the state / territory layer onto the national layer ({national field name: state / territory field name}, see build_union_schema(dict_index, dict_fcs, schema_path)), or None to match the fields by name
+# Outputs - a dictionary with the number of rows appended and their lowest and highest ObjectIDs Ex) {'rows': 5120, 'oid_min': 80001, 'oid_max': 85120}
+# '''
+def append_state(in_fc, merge_output, state, sr, dict_map=None):
+    SKIP_TYPES = ('OID', 'Geometry', 'GlobalID', 'Raster') # Fields that are written by the geodatabase or the SHAPE@ token
+    dict_source = {field.name.upper(): field for field in arcpy.ListFields(in_fc) if field.type not in SKIP_TYPES}
+    if dict_map is None:
+        dict_map = {field.name: field.name for field in dict_source.values()}
+    dict_map = {name.upper(): source for name, source in dict_map.items() if source.upper() in dict_source}
+
+    lst_targets = [] # This list holds the national fields that are filled from the state / territory layer
+    lst_sources = [] # This list holds the state / territory field that fills each national field
+    lst_text = [] # This list holds the position and length of the text fields whose values may need to be cut
+    for field in arcpy.ListFields(merge_output):
+        if field.type in SKIP_TYPES or field.name.upper() == STATE_FIELD.upper() or field.name.upper() not in dict_map:
+            continue
+        source = dict_source[dict_map[field.name.upper()].upper()]
+        if field.type == 'String' and (source.type != 'String' or source.length > field.length):
+            lst_text.append((len(lst_sources), field.length))
+        lst_targets.append(field.name)
+        lst_sources.append(source.name)
+
+    lst_shape = ['SHAPE@'] if arcpy.Describe(merge_output).dataType == 'FeatureClass' else []
+    dict_rows = {'rows': 0, 'oid_min': None, 'oid_max': None}
+
+    try:
+        with arcpy.da.SearchCursor(in_fc, lst_sources + lst_shape, spatial_reference=sr if lst_shape else None) as search_cursor, arcpy.da.InsertCursor(merge_output, lst_targets + [STATE_FIELD] + lst_shape) as insert_cursor:
+            for row in search_cursor:
+                row = list(row)
+                for index, length in lst_text:
+                    if row[index] is not None:
+                        row[index] = str(row[index])[:length]
 
+                oid = insert_cursor.insertRow(row[:len(lst_sources)] + [state] + row[len(lst_sources):])
+                dict_rows['rows'] += 1
+                dict_rows['oid_min'] = oid if dict_rows['oid_min'] is None else min(dict_rows['oid_min'], oid)
+                dict_rows['oid_max'] = oid if dict_rows['oid_max'] is None else max(dict_rows['oid_max'], oid)
+    except Exception:
+        delete_state_rows(merge_output, state, dict_rows) # The rows written before the error are deleted again
+        raise
+
+    return dict_rows
+
+# '''
+# Purpose - copy_state(in_fc, out_fc, state, sr, data_type) copies a state / territory layer into a new feature class / table with the state / territory field (STATE_FIELD), projecting it into NAD83 on the way in when needed, so that the rows can be found again once they are merged into a national layer.
+#     The copy is created empty from the layer as a template and filled by append_state(in_fc, merge_output, state, sr, dict_map), so each row is written once, already tagged.
+# Inputs - in_fc: a file pathway to the state / territory feature class / table Ex) r'...\NFHL_01_20241004.gdb\FIRM_Spatial_Layers\S_BFE'
+#          out_fc: a file pathway to the copy Ex) r'C:\Users\CaitlinHartig\Documents\Tools\Master_GDB.gdb\S_BFE_01'
+#          state: the state / territory number Ex) '01'
+#          sr: the NAD83 spatial reference
+#          data_type: the data type of the layer ('FeatureClass' or 'Table')
+# Outputs - a dictionary with the number of rows copied and their lowest and highest ObjectIDs (see append_state(in_fc, merge_output, state, sr, dict_map))
+# '''
+def copy_state(in_fc, out_fc, state, sr, data_type):
+    gdb, name = os.path.split(out_fc)
+
+    if data_type == 'FeatureClass':
+        arcpy.management.CreateFeatureclass(gdb, name, arcpy.Describe(in_fc).shapeType.upper(), in_fc, 'SAME_AS_TEMPLATE', 'SAME_AS_TEMPLATE', sr)
+    else:
+        arcpy.management.CreateTable(gdb, name, in_fc)
+
+    if len(arcpy.ListFields(out_fc, STATE_FIELD)) == 0:
+        arcpy.management.AddField(out_fc, STATE_FIELD, 'TEXT', field_length=10)
+
+    return append_state(in_fc, out_fc, state, sr)
+
+# '''
+# Purpose - remove_failed_state(master_gdb, dict_fcs, state, dict_added) deletes the rows a state / territory that failed part way through a full build had already added to the national layers (see create_national_layer(folder, dict_fcs, master_gdb, metadata_filepath, dict_index)).
+#     Appended rows are deleted by the ObjectID range recorded by append_state(in_fc, merge_output, state, sr, dict_map) (see delete_state_rows(merge_output, state, dict_rows)). Merged rows have no range of their own, so they are found by the state / territory number alone.
+# Inputs - master_gdb: a folder pathway to the Master GDB Ex) r'C:\Users\CaitlinHartig\Documents\Tools\Master_GDB.gdb'
+#          dict_fcs: the dictionary of NFHL feature class / table names
+#          state: the state / territory number Ex) '06'
+#          dict_added: a dictionary holding the rows each state / territory has added to each national layer, or None for merged rows Ex) {'06': {'S_BFE': {'rows': 5120, 'oid_min': 80001, 'oid_max': 85120}}}. The entry of the state / territory is removed.
+# Outputs - count_deleted: the number of rows deleted
 # '''
-# Purpose - create_national_layer(folder, dict_fcs, master_gdb, metadata_filepath) takes a folder that has first been unzipped using the unzip_folder(zip_folder) function and goes through all the subfolders to find specific layers as outlined in the input dictionary dict_fcs.
+def remove_failed_state(master_gdb, dict_fcs, state, dict_added):
+    count_deleted = 0
+
+    for item, dict_rows in dict_added.pop(state, {}).items():
+        merge_output = os.path.join(master_gdb, dict_fcs[item])
+        if dict_rows is not None:
+            count_deleted += delete_state_rows(merge_output, state, dict_rows)
+            continue
+
+        with arcpy.da.UpdateCursor(merge_output, ['OID@'], "{0} = '{1}'".format(STATE_FIELD, state)) as cursor:
+            for row in cursor:
+                cursor.deleteRow()
+                count_deleted += 1
+
+    if count_deleted != 0:
+        print('{0} rows of state/territory # {1} deleted from the national layers.\n'.format(count_deleted, state))
+    return count_deleted
+
+# '''
+# Purpose - create_national_layer(folder, dict_fcs, master_gdb, metadata_filepath, dict_index, streaming, workers, dict_schema) takes a folder that has first been unzipped using the unzip_folder(zip_folder) function and pulls the layers outlined in the input dictionary dict_fcs from each state / territory geodatabase, as listed in the layer index (see build_layer_index(folder, dict_fcs, index_path)).
 #     The program pulls feature classes / tables from each subfolder that have the same name as each key listed in dict_fcs, projects them into NAD83 if necessary, and then copies the feature classes / tables into the Master GDB. 
 #     Once inside the Master GDB, the program then merges together all the feature classes with the same key (coming from each distinct state / territory) and merges them all together into one national output layer for each key, the name of which is defined as the corresponding value in dict_fcs.
 #     Finally, the program then imports the metadata file (metadata_filepath) onto each national layer.
+#     The data types and spatial references come from the index, so no folders or workspaces are listed and no layers are described again while the national layers are built.
+#     In streaming mode, the national layer is instead created once (see create_national_target(lst_entries, merge_output, sr)) and each state / territory layer is appended straight into it, with the output coordinate system set to NAD83 so that layers in other coordinate systems are projected on the way in. Each feature is then written once rather than three times, and the Master GDB never holds the state / territory copies.
+#     With more than one worker, every state / territory is first projected into NAD83 in parallel (see project_states(dict_index, scratch_folder, workers)), and the national layers are then merged or appended from the scratch geodatabases in state / territory order, so the output does not depend on which worker finished first. The scratch geodatabases are deleted at the end.
+#     A state / territory that cannot be projected, appended, or copied is reported and left out of every national layer: the rows it had already added to the national layers are deleted again (see remove_failed_state(master_gdb, dict_fcs, state, dict_added)), and the build carries on with the other states / territories.
 # Inputs - folder: a folder pathway for an unzipped NFHL data folder Ex) r'C:\Users\CaitlinHartig\Documents\NFHL\Data'
 #          dict_fcs: a dictionary with keys containing the NFHL feature class / table names in all uppercase, and corresponding values containing the EDW feature class names for the same layers
 #               Ex) dict_fcs = {'S_FIRM_PAN':'Hydro_NatFloodHaz_Panel_FEMA', 'S_FLD_HAZ_AR':'Hydro_NatFloodHaz_HazArea_FEMA', 'S_BFE':'Hydro_NatFloodHaz_S_BFE_FEMA', 'S_XS':'Hydro_NatFloodHaz_XS_FEMA', 'S_GEN_STRUCT':'Hydro_NatFloodHaz_Struct_FEMA', 'S_LOMR':'Hydro_NatFloodHaz_LOMR_FEMA', 'S_PROFIL_BASLN':'Hydro_NatFloodHaz_PBas_FEMA', 'S_WTR_AR':'Hydro_NatFloodHaz_Wtr_FEMA', 'L_COMM_INFO':'Hydro_NatFloodHaz_Comm_FEMA', 'STUDY_INFO': 'Hydro_NatFloodHaz_Study_FEMA'}
 #          master_gdb: a folder pathway to the Master GDB Ex) r'C:\Users\CaitlinHartig\Documents\Tools\Master_GDB.gdb'
 #          metadata_filepath: a file pathway to the metadata.xml file that will be utilized to import metadata onto each national layer Ex) r'C:\Users\CaitlinHartig\Documents\NFHL\Data\NFHL_01_20241004\NFHL_01_20241004_metadata.xml'
-# Outputs - None
+#          dict_index: the layer index of the folder, or None to obtain it first (see obtain_layer_index(folder, dict_fcs, index_path))
+#          streaming: True to append each state / territory layer straight into the national layer, False to copy them into the Master GDB and merge them
+#          workers: the number of worker processes used to project the states / territories, or 1 to project them one at a time Ex) 8
+#          dict_schema: the union schema and field mappings of each key, or None to build them first (see build_union_schema(dict_index, dict_fcs, schema_path))
+# Outputs - set_failed: a set of the state / territory numbers that were left out of the national layers Ex) {'06'}
 # '''
-def create_national_layer(folder, dict_fcs, master_gdb, metadata_filepath):
+def create_national_layer(folder, dict_fcs, master_gdb, metadata_filepath, dict_index=None, streaming=False, workers=1, dict_schema=None):
     arcpy.env.overwriteOutput = 1
 
+    if dict_index is None:
+        dict_index = obtain_layer_index(folder, dict_fcs)
+    if dict_schema is None:
+        dict_schema = build_union_schema(dict_index, dict_fcs)
+
     # Define projection: NAD83
     wkt = 'GEOGCS["NAD83",DATUM["North_American_Datum_1983",SPHEROID["GRS 1980",6378137,298.257222101,AUTHORITY["EPSG","7019"]],AUTHORITY["EPSG","6269"]],PRIMEM["Greenwich",0,AUTHORITY["EPSG","8901"]],UNIT["degree",0.01745329251994328,AUTHORITY["EPSG","9122"]],AUTHORITY["EPSG","4269"]]'
     sr = arcpy.SpatialReference()
     sr.loadFromString(wkt)
     NAD83 = 'GCS_North_American_1983'
+
+    dict_projected = None # This dictionary holds the projected copy of each dataset pathway when the states / territories are projected in parallel
+    set_failed = set() # This set holds the states / territories that could not be projected, appended, or copied
+    dict_added = {} # This dictionary holds the rows each state / territory has added to each national layer so far, so that they can be deleted again if it fails on a later layer
+    scratch_folder = os.path.join(folder, 'NFHL_Projected')
+    if workers > 1:
+        dict_projected, set_failed = project_states(dict_index, scratch_folder, workers)
     
     for item in dict_fcs:
         
-        lst_names = [] # This list holds the feature classes / tables of the same key that will be combined into 1 national layer    
-        lst_fcs = [] # This list holds the feature classes / tables of the same key that will be combined into 1 national layer. Necessary despite lst_names because there is an environment change and name change for all feature classes into the Master GDB before the merge occurs
+        lst_fcs = [] # This list holds the feature classes / tables of the same key that will be combined into 1 national layer
+        lst_states = [] # This list holds the state / territory number of each feature class / table in lst_fcs
         data_type = '' # This string holds the data type for the layer (should be either 'FeatureClass' or 'Table')
-        data_type_fc = '' # This string holds the data type for the layer as pulled from the Master GDB (should be either 'FeatureClass' or 'Table')
-        
-        for root, dirs, files in os.walk(folder):
-            for dir_name in dirs:
-                if dir_name[-4:] == '.gdb':
-                    arcpy.env.workspace = os.path.join(root, dir_name)
-
-                    start_index = dir_name.find('_')
-                    end_index = dir_name.rfind('_')
-                    dir_name_number = dir_name[start_index:end_index] # Find the state / territory number for the feature class being worked on
-                    
-                    dss = arcpy.ListDatasets()
-                    fcs = []
-
-                    if len(dss) != 0: # Find the right feature class/table if the feature class/table is inside of a dataset
-                        for ds in dss:
-                            arcpy.env.workspace = ds
-                            for dirpath_dss, dirnames_dss, fc_dss in arcpy.da.Walk(arcpy.env.workspace, datatype=['FeatureClass', 'Table']):
-                                for fc_ds in fc_dss:   
-                                    if item in fc_ds.upper():
-                                        fcs = fc_dss
-                        if len(fcs) == 0: # Find the right feature class/table if there is a dataset but the feature class/table is inside of the main geodatabase
-                            arcpy.env.workspace = os.path.join(root, dir_name)
-                            for dirpath_fcs, dirnames_fcs, fc_fcs in arcpy.da.Walk(arcpy.env.workspace, datatype=['FeatureClass', 'Table']):
-                                fcs = fc_fcs
-                    else: # Find the right feature class/table if there are no datasets and the feature class/table is inside of the main geodatabase
-                        for dirpath_fcs, dirnames_fcs, fc_fcs in arcpy.da.Walk(arcpy.env.workspace, datatype=['FeatureClass', 'Table']):
-                            fcs = fc_fcs
-
-                    flag_item = 0 # Tracks whether or not the right feature class/table is found for a specific state / territory
-                    
-                    if len(fcs) != 0:
-                        for fc in fcs:
-                            if item in fc.upper():
-                                flag_item = 1
-                                
-                                in_fc = os.path.join(arcpy.env.workspace, fc)
-                                out_name = fc.upper() + dir_name_number
-                                lst_names.append(out_name)
-                                out_fc = os.path.join(master_gdb, out_name)
-
-                                try:
-                                    if arcpy.Describe(fc).dataType == 'FeatureClass':
-                                        # Set the coordinate system to NAD 83 for the feature class if not already. Copy or project the feature class into the Master_GDB
-                                        coord = arcpy.Describe(fc).spatialReference
-                                        
-                                        if coord.name == NAD83: # If the feature class is already in NAD83, it is copied into the Master GDB
-                                            arcpy.management.CopyFeatures(in_fc, out_fc)
-                                        else: # Otherwise the feature class is projected into NAD83 and saved into the Master GDB
-                                            arcpy.management.Project(in_fc, out_fc, wkt)
-
-                                    elif arcpy.Describe(fc).dataType == 'Table': # Tables are copied into the Master GDB
-                                        arcpy.management.Copy(in_fc, out_fc)
-                                except:
-                                    print('Error! Unable to move features into the Master GDB for {0} layer for state/territory # {1}. This is due to possible network issues. Please try again later.\n'.format(item, dir_name_number[1:]))
-                                    quit()
-                            
-                    if flag_item == 0: # Prints a message if the right feature class/table is not found for a specific state / territory
-                        print('{0} layer not present for state/territory # {1}.\n'.format(item, dir_name_number[1:]))
-        
-        arcpy.env.workspace = master_gdb    
-        for dirpath_master, dirnames_master, fcs_master in arcpy.da.Walk(arcpy.env.workspace, datatype=['FeatureClass', 'Table']):
-            for fc_master in fcs_master:
-                if fc_master in lst_names:
-                    lst_fcs.append(fc_master) # Upload all relevant feature classes/tables into lst_fcs to be combined into 1 national layer
-                    data_type = arcpy.Describe(fc_master).dataType
+        lst_maps = [] # This list holds the field map of each feature class / table in lst_fcs
+        lst_entries = dict_index['layers'].get(item, [])
+        lst_fields = dict_schema[item]['fields']
+        dict_maps = dict_schema[item]['maps']
+        if dict_projected is not None: # Use the projected copies in the scratch geodatabases, in state / territory order
+            lst_entries = [[state, dict_projected[in_fc], data_type_fc, NAD83] for state, in_fc, data_type_fc, sr_name in lst_entries if in_fc in dict_projected]
+            dict_maps = {dict_projected[in_fc]: dict_map for in_fc, dict_map in dict_maps.items() if in_fc in dict_projected}
+        set_found = set() # This set holds the states / territories the layer was found for
+        name_new = dict_fcs[item]
+        merge_output = os.path.join(master_gdb, name_new)
+
+        if streaming and len(lst_entries) != 0:
+            # Create the national layer once, then append each state / territory layer into it
+            data_type = create_national_target(lst_entries, merge_output, sr, lst_fields)
+
+            for state, in_fc, data_type_fc, sr_name in lst_entries:
+                if state in set_failed: # A state / territory that failed on an earlier layer is left out of the rest
+                    continue
+                set_found.add(state)
+                try:
+                    dict_rows = append_state(in_fc, merge_output, state, sr, dict_maps[in_fc])
+                except Exception as error:
+                    print('Error! Unable to append features into the {0} national layer for state/territory # {1} ({2}). It will be left out of the national layers.\n'.format(name_new, state, error))
+                    set_failed.add(state)
+                    remove_failed_state(master_gdb, dict_fcs, state, dict_added)
+                    continue
+
+                dict_state = dict_added.setdefault(state, {})
+                dict_state[item] = combine_rows(dict_state.get(item), dict_rows)
+                lst_fcs.append(in_fc)
+                lst_states.append(state)
+
+        for state, in_fc, data_type_fc, sr_name in ([] if streaming else lst_entries):
+            if state in set_failed: # A state / territory that failed on an earlier layer is left out of the rest
+                continue
+            set_found.add(state)
+            data_type = data_type_fc
+            if dict_projected is not None: # The layer has already been projected into a scratch geodatabase, so it is merged from there
+                lst_fcs.append(in_fc)
+                lst_states.append(state)
+                lst_maps.append(dict(dict_maps[in_fc], **{STATE_FIELD: STATE_FIELD})) # The copies are tagged with the state / territory number
+                continue
+
+            out_name = os.path.basename(in_fc).upper() + '_' + state
+            out_fc = os.path.join(master_gdb, out_name)
+
+            try: # Copy the feature class / table into the Master GDB, projecting it into NAD 83 if it is not already
+                copy_state(in_fc, out_fc, state, sr, data_type_fc)
+            except Exception as error:
+                print('Error! Unable to move features into the Master GDB for {0} layer for state/territory # {1} ({2}). It will be left out of the national layers.\n'.format(item, state, error))
+                if arcpy.Exists(out_fc):
+                    arcpy.management.Delete(out_fc)
+                set_failed.add(state)
+                remove_failed_state(master_gdb, dict_fcs, state, dict_added)
+                continue
+
+            lst_fcs.append(out_fc) # Upload all relevant feature classes/tables into lst_fcs to be combined into 1 national layer
+            lst_states.append(state)
+            lst_maps.append(dict(dict_maps[in_fc], **{STATE_FIELD: STATE_FIELD})) # The copies are tagged with the state / territory number
+
+        for state in dict_index['states']:
+            if state in set_failed: # Prints a message if the state / territory could not be projected, appended, or copied
+                print('{0} layer left out for state/territory # {1}, since the state/territory failed (see the error above).\n'.format(item, state))
+            elif state not in set_found: # Prints a message if the right feature class/table is not found for a specific state / territory
+                print('{0} layer not present for state/territory # {1}.\n'.format(item, state))
 
         if len(lst_fcs) == 0: # Prints an error message to alert the user if the program cannot find a certain key for any state/territory
             print('Error! {0} layer not present for any state/territory. Please check that {0} is a valid NFHL feature class/table.\n'.format(item))
             print('*****\n')
         else:
-            # Merge the feature classes / tables of the same key together into one national output layer
-            name_new = dict_fcs[item]
-            merge_output = os.path.join(master_gdb, name_new)
-            arcpy.management.Merge(lst_fcs, merge_output)
-            names = '\t\n'.join(lst_fcs)
-            print(names, '\n')
-            print('{0}: {1} features merged together; {2} national {3} layer created.\n'.format(item, len(lst_fcs), name_new, data_type))
-
-            for dirpath_master_final, dirnames_master_final, fcs_master_final in arcpy.da.Walk(arcpy.env.workspace, datatype=['FeatureClass', 'Table']):
-                for fc in fcs_master_final:
-                    if fc in lst_fcs:
+            if streaming:
+                names = '\t\n'.join(os.path.basename(fc) + '_' + state for fc, state in zip(lst_fcs, lst_states))
+                print(names, '\n')
+                print('{0}: {1} features appended together; {2} national {3} layer created.\n'.format(item, len(lst_fcs), name_new, data_type))
+            else:
+                # Merge the feature classes / tables of the same key together into one national output layer
+                arcpy.management.Merge(lst_fcs, merge_output, schema_field_mappings(list(zip(lst_fcs, lst_maps)), lst_fields + [[STATE_FIELD, 'String', 10, STATE_FIELD]]))
+                names = '\t\n'.join(os.path.basename(fc) for fc in lst_fcs)
+                print(names, '\n')
+                print('{0}: {1} features merged together; {2} national {3} layer created.\n'.format(item, len(lst_fcs), name_new, data_type))
+                for state in lst_states: # Merged rows have no ObjectID range of their own (see remove_failed_state(master_gdb, dict_fcs, state, dict_added))
+                    dict_added.setdefault(state, {})[item] = None
+
+                if dict_projected is None:
+                    for fc in lst_fcs:
                         arcpy.management.Delete(fc) # Delete the individual feature classes / tables from the Master GDB to leave behind only the national layers
-                    else:
-                        if fc == name_new:
-                            try: # Import the metadata.xml file onto the national feature class/table layer
-                                data_type_fc = arcpy.Describe(fc).dataType
-                                meta = arcpy.metadata.Metadata(fc)
-                                print('Metadata Filepath:', metadata_filepath)
-                                meta.importMetadata(metadata_filepath)
-                                meta.save()
-                                print('Successfully imported metadata for {0} national {1} layer.\n'.format(fc, data_type_fc))                      
-                            except:
-                                print('Error! Unable to import metadata for {0} national {1} layer. Please manually check metadata file:'.format(fc, data_type_fc))
+
+            try: # Import the metadata.xml file onto the national feature class/table layer
+                meta = arcpy.metadata.Metadata(merge_output)
+                print('Metadata Filepath:', metadata_filepath)
+                meta.importMetadata(metadata_filepath)
+                meta.save()
+                print('Successfully imported metadata for {0} national {1} layer.\n'.format(name_new, data_type))
+            except:
+                print('Error! Unable to import metadata for {0} national {1} layer. Please manually check metadata file:'.format(name_new, data_type))
 
             print('*****\n')
+
+    if dict_projected is not None:
+        shutil.rmtree(scratch_folder, ignore_errors=True) # Delete the scratch geodatabases of the projected states / territories
+
+    return set_failed
+
+# '''
+# Purpose - hilbert_keys(x, y, order) computes the position of each point along a Hilbert curve laid over the extent of the points, for all points at once.
+#     The points are scaled onto a 2^order by 2^order grid, and the curve position is built up one bit of the grid coordinates at a time, from the top bit down, so the work is order passes over the arrays rather than a loop over the points.
+# Inputs - x: an array of x coordinates Ex) np.array([-95.36, -95.37, -80.19])
+#          y: an array of y coordinates Ex) np.array([29.76, 29.75, 25.76])
+#          order: the number of bits of each grid coordinate Ex) 15
+# Outputs - an array of Hilbert keys between 0 and 4^order - 1 Ex) array([1073741823, 1073741820, 0])
+# '''
+def hilbert_keys(x, y, order=15):
+    n = 1 << order
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    if len(x) == 0:
+        return np.zeros(0, dtype=np.int64)
+
+    span = max(x.max() - x.min(), y.max() - y.min()) or 1.0
+    xi = np.clip(((x - x.min()) / span * (n - 1)).round(), 0, n - 1).astype(np.int64)
+    yi = np.clip(((y - y.min()) / span * (n - 1)).round(), 0, n - 1).astype(np.int64)
+    keys = np.zeros(len(x), dtype=np.int64)
+
+    s = n >> 1
+    while s > 0:
+        rx = (xi & s) != 0
+        ry = (yi & s) != 0
+        keys += (s * s) * ((3 * rx) ^ ry)
+
+        # Rotate the quadrant so that the curve inside it runs the right way: flip both coordinates where rx and not ry (n - 1 - x is x XOR n - 1), then swap them where not ry
+        xi ^= (n - 1) * (rx & ~ry)
+        yi ^= (n - 1) * (rx & ~ry)
+        swap = (xi ^ yi) * ~ry
+        xi ^= swap
+        yi ^= swap
+        s >>= 1
+
+    return keys
+
+# '''
+# Purpose - time_queries(fc, dict_extents, lst_queries) times a standard set of queries against a national layer: for each extent, reading the shapes of every feature in the extent (as drawing the map there would), and for each where clause, reading the ObjectIDs of the matching rows.
+# Inputs - fc: a file pathway to a national feature class / table Ex) r'C:\Users\CaitlinHartig\Documents\Tools\Master_GDB.gdb\Hydro_NatFloodHaz_HazArea_FEMA'
+#          dict_extents: a dictionary of extent names and (xmin, ymin, xmax, ymax) extents in NAD83 degrees Ex) {'Houston': (-95.8, 29.5, -95.0, 30.1)}
+#          lst_queries: a list of where clauses Ex) ["FLD_ZONE = 'AE'"]
+# Outputs - dict_timings: a dictionary of the number of rows found and the time in seconds for each extent / where clause Ex) {'Houston': [41250, 3.82], "FLD_ZONE = 'AE'": [1825300, 21.4]}
+# '''
+def time_queries(fc, dict_extents, lst_queries):
+    dict_timings = {}
+    lst_names = [field.name.upper() for field in arcpy.ListFields(fc)]
+
+    if arcpy.Describe(fc).dataType == 'FeatureClass':
+        for name, (xmin, ymin, xmax, ymax) in dict_extents.items():
+            start = time.perf_counter()
+            count = 0
+            with arcpy.da.SearchCursor(fc, ['SHAPE@'], spatial_filter=arcpy.Extent(xmin, ymin, xmax, ymax).polygon) as cursor:
+                for row in cursor:
+                    count += 1
+            dict_timings[name] = [count, time.perf_counter() - start]
+
+    for where in lst_queries:
+        if where.split()[0].upper() not in lst_names: # Only where clauses on fields of the layer are timed
+            continue
+        start = time.perf_counter()
+        count = 0
+        with arcpy.da.SearchCursor(fc, ['OID@'], where) as cursor:
+            for row in cursor:
+                count += 1
+        dict_timings[where] = [count, time.perf_counter() - start]
+
+    return dict_timings
+
+# '''
+# Purpose - finish_national_layer(merge_output, lst_index_fields, dict_extents, lst_queries, timings_path) is the optional finishing stage for a national layer, run once it has been built.
+#     A national feature class is rewritten in Hilbert-curve order of its feature centroids (see hilbert_keys(x, y, order)): the keys are computed with NumPy, joined onto the layer with ExtendTable, and the layer is sorted on them into a new feature class, which then replaces the national layer along with its metadata.
+#     Attribute indexes are then built on the fields of lst_index_fields that the layer has. Tables are only indexed.
+#     The standard queries are timed before and after (see time_queries(fc, dict_extents, lst_queries)), and the timings are added to a JSON file.
+#     Sorting renumbers the ObjectIDs, so the manifest should be saved again afterwards (see save_manifest(zip_folder, master_gdb, dict_fcs, manifest_path)).
+# Inputs - merge_output: a file pathway to a national layer Ex) r'C:\Users\CaitlinHartig\Documents\Tools\Master_GDB.gdb\Hydro_NatFloodHaz_HazArea_FEMA'
+#          lst_index_fields: a list of the fields to index Ex) ['DFIRM_ID', 'FLD_ZONE', 'FIRM_PAN']
+#          dict_extents: the extents to time (see time_queries(fc, dict_extents, lst_queries))
+#          lst_queries: the where clauses to time (see time_queries(fc, dict_extents, lst_queries))
+#          timings_path: a file pathway for the JSON timings, or None to save them as NFHL_finish_timings.json next to the Master GDB
+# Outputs - dict_timings: a dictionary of the timings before and after Ex) {'before': {'Houston': [41250, 3.82]}, 'after': {'Houston': [41250, 0.94]}}
+# '''
+def finish_national_layer(merge_output, lst_index_fields, dict_extents, lst_queries, timings_path=None):
+    arcpy.env.overwriteOutput = 1
+    master_gdb, name_new = os.path.split(merge_output)
+    if timings_path is None:
+        timings_path = os.path.join(os.path.dirname(master_gdb), 'NFHL_finish_timings.json')
+
+    dict_timings = {'before': time_queries(merge_output, dict_extents, lst_queries)}
+
+    if arcpy.Describe(merge_output).dataType == 'FeatureClass':
+        start = time.perf_counter()
+        array = arcpy.da.FeatureClassToNumPyArray(merge_output, ['OID@', 'SHAPE@XY'], null_value=0)
+        keys = hilbert_keys(array['SHAPE@XY'][:, 0], array['SHAPE@XY'][:, 1])
+
+        # Join the Hilbert keys onto the national layer by ObjectID, then sort on them
+        array_keys = np.empty(len(array), dtype=[('OID_JOIN', np.int64), ('HILBERT', np.int64)])
+        array_keys['OID_JOIN'] = array['OID@']
+        array_keys['HILBERT'] = keys
+        oid_field = arcpy.Describe(merge_output).OIDFieldName
+        arcpy.da.ExtendTable(merge_output, oid_field, array_keys, 'OID_JOIN', append_only=False)
+
+        sorted_output = merge_output + '_Hilbert'
+        arcpy.management.Sort(merge_output, sorted_output, [['HILBERT', 'ASCENDING']])
+        meta = arcpy.metadata.Metadata(sorted_output)
+        meta.copy(arcpy.metadata.Metadata(merge_output))
+        meta.save()
+        arcpy.management.Delete(merge_output)
+        arcpy.management.Rename(sorted_output, merge_output)
+        arcpy.management.DeleteField(merge_output, ['HILBERT'])
+        print('{0}: {1} features rewritten in Hilbert order in {2:.1f} s.'.format(name_new, len(array), time.perf_counter() - start))
+
+    lst_names = {field.name.upper(): field.name for field in arcpy.ListFields(merge_output)}
+    for field in lst_index_fields:
+        if field.upper() in lst_names:
+            arcpy.management.AddIndex(merge_output, [lst_names[field.upper()]], 'IDX_{0}'.format(field.upper()))
+    print('{0}: attribute indexes built on {1}.'.format(name_new, ', '.join(field for field in lst_index_fields if field.upper() in lst_names) or 'no fields'))
+
+    dict_timings['after'] = time_queries(merge_output, dict_extents, lst_queries)
+    for name in dict_timings['before']:
+        print('\t{0:<32} {1:>10} rows {2:>8.2f} s before {3:>8.2f} s after'.format(name, dict_timings['before'][name][0], dict_timings['before'][name][1], dict_timings['after'][name][1]))
+
+    dict_all = {}
+    if os.path.exists(timings_path):
+        with open(timings_path, 'r') as infile:
+            dict_all = json.load(infile)
+    dict_all[name_new] = dict_timings
+    with open(timings_path, 'w') as outfile:
+        json.dump(dict_all, outfile, indent=1)
+
+    print('')
+    return dict_timings
+
+# '''
+# Purpose - simplify_national_layer(merge_output, dict_levels, workers, chunk_size) writes simplified copies of a national polygon layer, one for each tolerance in dict_levels, named after the national layer and the level Ex) Hydro_NatFloodHaz_HazArea_FEMA_1km.
+#     The polygons are read once, in batches. The rings of each chunk of chunk_size polygons are packed into flat NumPy buffers and simplified in a pool of worker processes, which returns the significance of each vertex (see NFHL_Simplify.dp_significance(xy, ring_offsets, min_tolerance)). Every level is then cut from the same significance arrays, and the polygons are written to all the levels with their attributes, in the order of the national layer.
+#     Polygons with curves, z-values, or m-values are copied as they are. Simplifying can make a polygon cross itself, so the geometry of each level is repaired at the end. A table of the vertices kept at each level is printed.
+#     The simplified layers are not part of the manifest, so they should be written again after a refresh (see refresh_national_layers(zip_folder, dict_fcs, master_gdb, manifest_path, workers, max_buffer_mb, schema_path)).
+# Inputs - merge_output: a file pathway to a national polygon layer Ex) r'C:\Users\CaitlinHartig\Documents\Tools\Master_GDB.gdb\Hydro_NatFloodHaz_HazArea_FEMA'
+#          dict_levels: a dictionary of level names and tolerances in meters Ex) {'10m': 10, '100m': 100, '1km': 1000}
+#          workers: the number of worker processes Ex) 8
+#          chunk_size: the number of polygons handed to a worker process at a time Ex) 20000
+# Outputs - dict_report: a dictionary of the output layer, the vertices kept, and the share of the vertices kept for each level Ex) {'1km': {'output': r'...\Hydro_NatFloodHaz_HazArea_FEMA_1km', 'vertices': 9120400, 'percent': 2.1}}
+# '''
+def simplify_national_layer(merge_output, dict_levels, workers=1, chunk_size=20000):
+    arcpy.env.overwriteOutput = 1
+    master_gdb, name_new = os.path.split(merge_output)
+    desc = arcpy.Describe(merge_output)
+    lst_fields = [field.name for field in desc.fields if not field.required and field.type not in ('Geometry', 'OID', 'GlobalID', 'Raster')]
+    geographic = desc.spatialReference.type == 'Geographic'
+    min_tolerance = min(dict_levels.values())
+
+    dict_outputs = {} # This dictionary holds the output layer of each level
+    for label in dict_levels:
+        dict_outputs[label] = os.path.join(master_gdb, '{0}_{1}'.format(name_new, label))
+        arcpy.management.CreateFeatureclass(master_gdb, os.path.basename(dict_outputs[label]), 'POLYGON', merge_output, spatial_reference=desc.spatialReference)
+
+    dict_vertices = {label: 0 for label in dict_levels} # This dictionary holds the vertices kept at each level
+    count_vertices = 0 # The vertices of the national layer
+    count_features = 0
+    start = time.perf_counter()
+
+    # Simplify one batch of polygons and write it to every level
+    def write_batch(lst_rows, pool):
+        nonlocal count_vertices
+        lst_chunks = [] # This list holds the (coords, ring_offsets) buffers of each chunk
+        lst_layouts = [] # This list holds, for each chunk, the row, spatial reference, and first ring of each polygon that is simplified
+
+        for chunk_start in range(0, len(lst_rows), chunk_size):
+            lst_coords = []
+            lst_counts = []
+            lst_layout = []
+            for row_index in range(chunk_start, min(chunk_start + chunk_size, len(lst_rows))):
+                dict_shape = json.loads(lst_rows[row_index][0]) if lst_rows[row_index][0] else {}
+                if 'rings' not in dict_shape or dict_shape.get('hasZ') or dict_shape.get('hasM'):
+                    continue # Polygons with curves, z-values, or m-values and empty polygons are copied as they are
+                lst_layout.append((row_index, dict_shape.get('spatialReference'), len(lst_counts), len(lst_counts) + len(dict_shape['rings'])))
+                for ring in dict_shape['rings']:
+                    lst_coords.append(np.asarray(ring, dtype=np.float64).reshape(-1, 2))
+                    lst_counts.append(len(ring))
+            coords = np.concatenate(lst_coords) if len(lst_coords) != 0 else np.zeros((0, 2))
+            lst_chunks.append((coords, np.concatenate(([0], np.cumsum(lst_counts))).astype(np.int64)))
+            lst_layouts.append(lst_layout)
+
+        lst_significance = NFHL_Simplify.simplify_chunks(lst_chunks, min_tolerance, pool, geographic)
+
+        dict_shapes = {label: {} for label in dict_levels} # This dictionary holds the simplified shape of each row at each level
+        for (coords, ring_offsets), significance, lst_layout in zip(lst_chunks, lst_significance, lst_layouts):
+            count_vertices += len(coords)
+            for label, tolerance in dict_levels.items():
+                keep, level_offsets = NFHL_Simplify.level_rings(significance, ring_offsets, tolerance)
+                lst_kept = coords[keep].tolist()
+                dict_vertices[label] += len(lst_kept)
+                for row_index, sr_json, ring_first, ring_last in lst_layout:
+                    lst_rings = [lst_kept[level_offsets[ring]:level_offsets[ring + 1]] for ring in range(ring_first, ring_last)]
+                    dict_shapes[label][row_index] = json.dumps({'rings': lst_rings, 'spatialReference': sr_json})
+
+        for label in dict_levels:
+            for row_index, row in enumerate(lst_rows):
+                dict_cursors[label].insertRow([dict_shapes[label].get(row_index, row[0])] + list(row[1:]))
+
+    dict_cursors = {label: arcpy.da.InsertCursor(dict_outputs[label], ['SHAPE@JSON'] + lst_fields) for label in dict_levels}
+    try:
+        with multiprocessing.Pool(workers) if workers > 1 else contextlib.nullcontext() as pool:
+            lst_rows = []
+            with arcpy.da.SearchCursor(merge_output, ['SHAPE@JSON'] + lst_fields) as cursor:
+                for row in cursor:
+                    lst_rows.append(row)
+                    count_features += 1
+                    if len(lst_rows) == chunk_size * max(workers, 1):
+                        write_batch(lst_rows, pool)
+                        lst_rows = []
+            if len(lst_rows) != 0:
+                write_batch(lst_rows, pool)
+    finally:
+        dict_cursors.clear() # Release the insert cursors so that the levels can be repaired
+
+    dict_report = {}
+    print('{0}: {1} polygons with {2} vertices simplified in {3:.1f} s.'.format(name_new, count_features, count_vertices, time.perf_counter() - start))
+    print('\t{0:<8} {1:>12} {2:>14} {3:>10}'.format('Level', 'Tolerance m', 'Vertices', 'Kept %'))
+    for label, tolerance in dict_levels.items():
+        arcpy.management.RepairGeometry(dict_outputs[label]) # Simplifying can make a polygon cross itself
+        percent = 100.0 * dict_vertices[label] / max(count_vertices, 1)
+        dict_report[label] = {'output': dict_outputs[label], 'vertices': dict_vertices[label], 'percent': percent}
+        print('\t{0:<8} {1:>12} {2:>14} {3:>10.1f}'.format(label, tolerance, dict_vertices[label], percent))
+    print('')
+
+    return dict_report
+
+# '''
+# Purpose - archive_state(archive) finds the state / territory number in the name of a state / territory zip.
+# Inputs - archive: the name of the state / territory zip Ex) 'NFHL_01_20241004.zip'
+# Outputs - the state / territory number Ex) '01'
+# '''
+def archive_state(archive):
+    return archive[archive.find('_') + 1:archive.rfind('_')]
+
+# '''
+# Purpose - read_archives(zip_folder) lists the state / territory zips inside the main zip folder, along with the date in the name of each zip and its size and CRC-32 checksum.
+#     The size and checksum are read from the directory of the main zip folder, so no state / territory zip has to be unzipped or read to tell whether it has changed.
+# Inputs - zip_folder: a file pathway for the main zip folder Ex) r'C:\Users\CaitlinHartig\Documents\NFHL\Data.zip'
+# Outputs - dict_archives: a dictionary holding the archive details of each state / territory number
+#     Ex) {'01': {'archive': 'NFHL_01_20241004.zip', 'member': 'NFHL_01_20241004.zip', 'date': '20241004', 'size': 81920000, 'crc': 2316411093}, ...}
+# '''
+def read_archives(zip_folder):
+    dict_archives = {}
+
+    with zipfile.ZipFile(zip_folder, 'r') as myzip:
+        for info in myzip.infolist():
+            archive = os.path.basename(info.filename)
+            if archive[-4:].lower() != '.zip':
+                continue
+
+            state = archive_state(archive) # Find the state / territory number and date from the zip name Ex) NFHL_01_20241004.zip
+            dict_archives[state] = {'archive': archive, 'member': info.filename, 'date': archive[archive.rfind('_') + 1:-4], 'size': info.file_size, 'crc': info.CRC}
+
+    return dict_archives
+
+# '''
+# Purpose - save_manifest(zip_folder, master_gdb, dict_fcs, manifest_path, set_failed) saves the manifest of a full build of the national layers: the archive details of each state / territory zip (see read_archives(zip_folder)) and the number of rows and the lowest and highest ObjectIDs each state / territory has in each national layer.
+#     A state / territory that failed during the build, or that has no rows in any national layer, is saved without a checksum, so that it is reloaded by the next refresh (see refresh_national_layers(zip_folder, dict_fcs, master_gdb, manifest_path)).
+# Inputs - zip_folder: a file pathway for the main zip folder Ex) r'C:\Users\CaitlinHartig\Documents\NFHL\Data.zip'
+#          master_gdb: a file pathway for the Master GDB holding the national layers Ex) r'C:\Users\CaitlinHartig\Documents\Tools\Master_GDB.gdb'
+#          dict_fcs: the dictionary of NFHL feature class / table names (see create_national_layer(folder, dict_fcs, master_gdb, metadata_filepath, dict_index))
+#          manifest_path: a file pathway for the JSON manifest, or None to save it as NFHL_manifest.json next to the Master GDB
+#          set_failed: a set of the state / territory numbers that could not be unzipped or added to the national layers (see unzip_folder(zip_folder, workers) and create_national_layer(folder, dict_fcs, master_gdb, metadata_filepath, dict_index)), or None if there are none
+# Outputs - dict_manifest: the manifest Ex) {'zip_folder': r'...\Data.zip', 'states': {'01': {'archive': 'NFHL_01_20241004.zip', ..., 'layers': {'S_BFE': {'rows': 5120, 'oid_min': 1, 'oid_max': 5120}}}}}
+# '''
+def save_manifest(zip_folder, master_gdb, dict_fcs, manifest_path=None, set_failed=None):
+    if manifest_path is None:
+        manifest_path = os.path.join(os.path.dirname(master_gdb), 'NFHL_manifest.json')
+
+    dict_states = read_archives(zip_folder)
+    for state in dict_states:
+        dict_states[state]['layers'] = {}
+
+    for item in dict_fcs:
+        merge_output = os.path.join(master_gdb, dict_fcs[item])
+        if not arcpy.Exists(merge_output) or len(arcpy.ListFields(merge_output, STATE_FIELD)) == 0:
+            continue
+
+        with arcpy.da.SearchCursor(merge_output, ['OID@', STATE_FIELD]) as cursor:
+            for oid, state in cursor:
+                if state not in dict_states:
+                    continue
+                dict_rows = dict_states[state]['layers'].setdefault(item, {'rows': 0, 'oid_min': oid, 'oid_max': oid})
+                dict_rows['rows'] += 1
+                dict_rows['oid_min'] = min(dict_rows['oid_min'], oid)
+                dict_rows['oid_max'] = max(dict_rows['oid_max'], oid)
+
+    lst_incomplete = sorted(state for state in dict_states if state in (set_failed or set()) or len(dict_states[state]['layers']) == 0)
+    for state in lst_incomplete: # These states / territories are reloaded by the next refresh
+        dict_states[state]['crc'] = None
+
+    dict_manifest = {'zip_folder': zip_folder, 'states': dict_states}
+    with open(manifest_path, 'w') as outfile:
+        json.dump(dict_manifest, outfile, indent=1)
+
+    print('Manifest saved for {0} states/territories to {1}\n'.format(len(dict_states), manifest_path))
+    if len(lst_incomplete) != 0:
+        print('States/territories to reload by the next refresh: {0}.\n'.format(', '.join(lst_incomplete)))
+    return dict_manifest
+
+# '''
+# Purpose - combine_rows(dict_rows, dict_more) adds up the rows a state / territory appended to one national layer, for a state / territory whose layer is found more than once in its geodatabase.
+# Inputs - dict_rows, dict_more: dictionaries returned by append_state(in_fc, merge_output, state, sr, dict_map); dict_rows may be None
+# Outputs - a dictionary with the total number of rows and their lowest and highest ObjectIDs Ex) {'rows': 5120, 'oid_min': 80001, 'oid_max': 85120}
+# '''
+def combine_rows(dict_rows, dict_more):
+    if dict_rows is None or dict_rows['rows'] == 0:
+        return dict_more
+    if dict_more['rows'] == 0:
+        return dict_rows
+    return {'rows': dict_rows['rows'] + dict_more['rows'], 'oid_min': min(dict_rows['oid_min'], dict_more['oid_min']), 'oid_max': max(dict_rows['oid_max'], dict_more['oid_max'])}
+
+# '''
+# Purpose - delete_state_rows(merge_output, state, dict_rows) deletes the rows a state / territory added to a national layer, using the ObjectID range recorded by append_state(in_fc, merge_output, state, sr, dict_map) together with the state / territory number.
+# Inputs - merge_output: the file pathway to the national layer Ex) r'C:\Users\CaitlinHartig\Documents\Tools\Master_GDB.gdb\Hydro_NatFloodHaz_S_BFE_FEMA'
+#          state: the state / territory number Ex) '01'
+#          dict_rows: the rows to delete Ex) {'rows': 5120, 'oid_min': 80001, 'oid_max': 85120}, or None if there are none
+# Outputs - count_deleted: the number of rows deleted
+# '''
+def delete_state_rows(merge_output, state, dict_rows):
+    count_deleted = 0
+    if dict_rows is None or dict_rows['rows'] == 0:
+        return count_deleted
+
+    oid_field = arcpy.Describe(merge_output).OIDFieldName
+    where = "{0} >= {1} AND {0} <= {2} AND {3} = '{4}'".format(oid_field, dict_rows['oid_min'], dict_rows['oid_max'], STATE_FIELD, state)
+    with arcpy.da.UpdateCursor(merge_output, ['OID@'], where) as cursor:
+        for row in cursor:
+            cursor.deleteRow()
+            count_deleted += 1
+
+    return count_deleted
+
+# '''
+# Purpose - refresh_national_layers(zip_folder, dict_fcs, master_gdb, manifest_path, workers, max_buffer_mb, schema_path) updates the national layers of an earlier full build (see save_manifest(zip_folder, master_gdb, dict_fcs, manifest_path)) from a newer main zip folder.
+#     Only the states / territories whose zip has a different name, size, or checksum than in the manifest are unzipped (see unzip_state_members(args)). The new rows of each state / territory are appended to every national layer first (see append_state(in_fc, merge_output, state, sr)), and only then are its old rows deleted by the ObjectID range and state / territory number recorded in the manifest (see delete_state_rows(merge_output, state, dict_rows)). States / territories that are no longer in the main zip folder have their rows deleted.
+#     The reloaded states / territories are appended with the field mappings of the union schema saved by the full build (see build_union_schema(dict_index, dict_fcs, schema_path)), so their fields are matched by name regardless of case as in the full build, and their schema drift from it is reported. If that schema cannot be found, the fields of the national layer are used as the union schema instead.
+#     A state / territory that cannot be unzipped keeps its old rows. A state / territory that cannot be appended also keeps its old rows, has the rows it did append deleted again, and is left without a checksum in the manifest, so that it is reloaded by the next refresh. The manifest is saved at the end.
+# Inputs - zip_folder: a file pathway for the main zip folder Ex) r'C:\Users\CaitlinHartig\Documents\NFHL\Data.zip'
+#          dict_fcs: the dictionary of NFHL feature class / table names (see create_national_layer(folder, dict_fcs, master_gdb, metadata_filepath, dict_index))
+#          master_gdb: a file pathway for the Master GDB holding the national layers Ex) r'C:\Users\CaitlinHartig\Documents\Tools\Master_GDB.gdb'
+#          manifest_path: a file pathway for the JSON manifest, or None to use NFHL_manifest.json next to the Master GDB
+#          workers: the number of worker processes used to unzip the changed states / territories Ex) 8
+#          max_buffer_mb: the largest state / territory zip in MB that is read into memory rather than copied to a temporary file Ex) 512
+#          schema_path: a file pathway to the JSON union schema of the full build, or None to use NFHL_schema.json in the folder the main zip folder was unzipped into
+# Outputs - lst_changed: a list of the state / territory numbers that were reloaded Ex) ['06', '48']
+# '''
+def refresh_national_layers(zip_folder, dict_fcs, master_gdb, manifest_path=None, workers=1, max_buffer_mb=512, schema_path=None):
+    arcpy.env.overwriteOutput = 1
+
+    if manifest_path is None:
+        manifest_path = os.path.join(os.path.dirname(master_gdb), 'NFHL_manifest.json')
+
+    if not os.path.exists(manifest_path):
+        print('Error! No manifest found at {0}. Please run a full build of the national layers first.\n'.format(manifest_path))
+        quit()
+
+    with open(manifest_path, 'r') as infile:
+        dict_manifest = json.load(infile)
+    dict_states = dict_manifest['states']
+    dict_archives = read_archives(zip_folder)
+
+    lst_changed = sorted(state for state, dict_archive in dict_archives.items() if state not in dict_states or any(dict_states[state].get(key) != dict_archive[key] for key in ['archive', 'size', 'crc']))
+    lst_removed = sorted(state for state in dict_states if state not in dict_archives)
+
+    if len(lst_changed) == 0 and len(lst_removed) == 0:
+        print('No state/territory zips have changed since the last build. The national layers are up to date.\n')
+        return []
+
+    print('States/territories to reload: {0}. States/territories to remove: {1}.\n'.format(', '.join(lst_changed) or 'none', ', '.join(lst_removed) or 'none'))
+
+    # Unzip the geodatabases of the changed states / territories only
+    refresh_folder = zip_folder[:-4] + '_Refresh'
+    shutil.rmtree(refresh_folder, ignore_errors=True)
+    lst_args = [(zip_folder, dict_archives[state]['member'], os.path.join(refresh_folder, dict_archives[state]['archive'][:-4]), max_buffer_mb) for state in lst_changed]
+
+    start = time.perf_counter()
+    if workers > 1 and len(lst_args) > 1:
+        with multiprocessing.Pool(min(workers, len(lst_args))) as pool:
+            lst_results = list(pool.imap_unordered(unzip_state_members, lst_args))
+    else:
+        lst_results = [unzip_state_members(args) for args in lst_args]
+    print_unzip_summary(lst_results, time.perf_counter() - start)
+
+    dict_folders = {args[2]: state for state, args in zip(lst_changed, lst_args)}
+    set_unzipped = {dict_folders[result['folder']] for result in lst_results if result['error'] is None}
+    lst_changed = [state for state in lst_changed if state in set_unzipped] # States / territories that could not be unzipped keep their old rows
+    dict_index = obtain_layer_index(refresh_folder, dict_fcs) if len(lst_changed) != 0 else {'states': [], 'layers': {}}
+
+    # Define projection: NAD83
+    wkt = 'GEOGCS["NAD83",DATUM["North_American_Datum_1983",SPHEROID["GRS 1980",6378137,298.257222101,AUTHORITY["EPSG","7019"]],AUTHORITY["EPSG","6269"]],PRIMEM["Greenwich",0,AUTHORITY["EPSG","8901"]],UNIT["degree",0.01745329251994328,AUTHORITY["EPSG","9122"]],AUTHORITY["EPSG","4269"]]'
+    sr = arcpy.SpatialReference()
+    sr.loadFromString(wkt)
+
+    set_failed = set() # This set holds the states / territories that could not be appended
+    dict_old = {state: dict_states[state]['layers'] for state in lst_changed + lst_removed if state in dict_states} # The rows each state / territory added to each national layer in the last build
+
+    if schema_path is None:
+        schema_path = os.path.join(zip_folder[:-4], 'NFHL_schema.json')
+    dict_schema = {}
+    if os.path.exists(schema_path):
+        with open(schema_path, 'r') as infile:
+            dict_schema = json.load(infile)
+    else:
+        print('Warning: No union schema found at {0}. The fields of each national layer are used as its union schema.\n'.format(schema_path))
+
+    dict_outputs = {} # This dictionary holds the pathway of each national layer found in the Master GDB
+    dict_fields = {} # This dictionary holds the union [name, type, length, alias] fields of each national layer
+    dict_maps = {} # This dictionary holds the field map of each reloaded state / territory layer onto its national layer
+    for item in dict_fcs:
+        merge_output = os.path.join(master_gdb, dict_fcs[item])
+        if not arcpy.Exists(merge_output):
+            print('Error! {0} national layer not found in the Master GDB. Please run a full build of the national layers first.\n'.format(dict_fcs[item]))
+            continue
+        dict_outputs[item] = merge_output
+
+        if item in dict_schema:
+            dict_fields[item] = dict_schema[item]['fields']
+        else:
+            dict_fields[item] = [[field.name, field.type, field.length, field.aliasName] for field in arcpy.ListFields(merge_output) if not field.required and field.name != STATE_FIELD]
+
+        dict_drift = {} # This dictionary holds the drift of each reloaded state / territory layer that differs from the union schema
+        for state, in_fc, data_type_fc, sr_name in dict_index['layers'].get(item, []):
+            lst_layer_fields = dict_index.get('fields', {}).get(in_fc) or [[field.name, field.type, field.length, field.aliasName] for field in arcpy.ListFields(in_fc) if not field.required]
+            dict_maps[in_fc], dict_layer_drift = layer_drift(lst_layer_fields, dict_fields[item])
+            if dict_layer_drift is not None:
+                dict_drift[state] = dict_layer_drift
+        print_schema_drift(item, dict_drift)
+    dict_counts = {item: [0, 0] for item in dict_outputs} # The number of rows deleted and appended for each national layer
+
+    # Every layer of a state / territory is appended before any of its old rows are deleted, so a state / territory that fails part way through keeps its old rows, and the rows it had already appended are deleted again
+    for state in lst_changed:
+        dict_new = {} # The rows the state / territory added to each national layer
+        for item, merge_output in dict_outputs.items():
+            for entry_state, in_fc, data_type_fc, sr_name in dict_index['layers'].get(item, []):
+                if entry_state != state:
+                    continue
+                try:
+                    dict_rows = append_state(in_fc, merge_output, state, sr, dict_maps[in_fc])
+                except Exception as error:
+                    print('Error! Unable to append {0} layer for state/territory # {1} ({2}). Its old rows are kept, and it will be reloaded by the next refresh.\n'.format(item, state, error))
+                    set_failed.add(state)
+                    break
+                dict_new[item] = combine_rows(dict_new.get(item), dict_rows)
+            if state in set_failed:
+                break
+
+        if state in set_failed:
+            for item, dict_rows in dict_new.items():
+                delete_state_rows(dict_outputs[item], state, dict_rows)
+            continue
+
+        for item, merge_output in dict_outputs.items():
+            dict_counts[item][0] += delete_state_rows(merge_output, state, dict_old.get(state, {}).get(item))
+            dict_counts[item][1] += dict_new.get(item, {}).get('rows', 0)
+        dict_states[state] = dict(dict_archives[state], layers=dict_new)
+
+    for state in lst_removed:
+        for item, merge_output in dict_outputs.items():
+            dict_counts[item][0] += delete_state_rows(merge_output, state, dict_old.get(state, {}).get(item))
+        del dict_states[state]
+
+    for item, (count_deleted, count_appended) in dict_counts.items():
+        print('{0}: {1} rows deleted, {2} rows appended to {3} national layer.\n'.format(item, count_deleted, count_appended, dict_fcs[item]))
+
+    for state in set_failed:
+        if state in dict_states: # A state / territory that is new to the manifest is reloaded by the next refresh anyway
+            dict_states[state]['crc'] = None
+
+    with open(manifest_path, 'w') as outfile:
+        json.dump({'zip_folder': zip_folder, 'states': dict_states}, outfile, indent=1)
+
+    shutil.rmtree(refresh_folder, ignore_errors=True)
+    print('Refresh finished: {0} states/territories reloaded, {1} removed, {2} failed. Manifest saved to {3}\n'.format(len(lst_changed) - len(set_failed), len(lst_removed), len(set_failed), manifest_path))
+
+    return lst_changed
  
 if __name__ == '__main__':
     print("Job starting!", datetime.datetime.now(), "\n")
 
     unzip_name = r'C:\Users\CaitlinHartig\Documents\NFHL\Data.zip'  # Update me!
-    folder = unzip_folder(unzip_name)
+    workers = os.cpu_count() # Update me! Number of state/territory zips to unzip at once
+    selective = True # Update me! True to unzip only the geodatabase and metadata.xml of each state/territory, False to unzip everything
+    refresh = False # Update me! True to reload only the states/territories whose zip changed since the last build (NFHL_manifest.json), False for a full build
 
     # If updating dict_fcs, all keys (the content to the left of the ':') MUST be written in all uppercase.
     dict_fcs = {'S_FIRM_PAN':'Hydro_NatFloodHaz_Panel_FEMA', 'S_FLD_HAZ_AR':'Hydro_NatFloodHaz_HazArea_FEMA', 'S_BFE':'Hydro_NatFloodHaz_S_BFE_FEMA', 'S_XS':'Hydro_NatFloodHaz_XS_FEMA', 'S_GEN_STRUCT':'Hydro_NatFloodHaz_Struct_FEMA', 'S_LOMR':'Hydro_NatFloodHaz_LOMR_FEMA', 'S_PROFIL_BASLN':'Hydro_NatFloodHaz_PBas_FEMA', 'S_WTR_LN':'Hydro_NatFloodHaz_Wtr_FEMA', 'S_WTR_AR':'Hydro_NatFloodHaz_Wtr_Ar_FEMA', 'L_COMM_INFO':'Hydro_NatFloodHaz_Comm_FEMA', 'STUDY_INFO': 'Hydro_NatFloodHaz_Study_FEMA'}
     master_gdb = r'C:\Users\CaitlinHartig\Documents\Tools\Master_GDB.gdb' # Update me!
 
-    metadata_filepath = obtain_metadata(folder)
-    create_national_layer(folder, dict_fcs, master_gdb, metadata_filepath)
+    if refresh:
+        refresh_national_layers(unzip_name, dict_fcs, master_gdb, None, workers)
+    else:
+        folder, set_failed = unzip_folder(unzip_name, workers, selective) # The states/territories that fail are reloaded by the next refresh
+        dict_index = obtain_layer_index(folder, dict_fcs) # Saved as NFHL_layer_index.json in the folder, and reused while the geodatabases are unchanged
+        dict_schema = build_union_schema(dict_index, dict_fcs) # Prints the schema drift report. Saved as NFHL_schema.json in the folder
+        metadata_filepath = obtain_metadata(folder, dict_index) # Cached as NFHL_metadata.json in the folder
+        streaming = True # Update me! True to append each state/territory straight into the national layers, False to copy and merge them
+        set_failed |= create_national_layer(folder, dict_fcs, master_gdb, metadata_filepath, dict_index, streaming, workers, dict_schema)
+
+        finish = False # Update me! True to rewrite the national layers in Hilbert order and index them
+        if finish:
+            lst_index_fields = ['DFIRM_ID', 'FLD_ZONE', 'FIRM_PAN'] # Update me!
+            dict_extents = {'Houston': (-95.8, 29.5, -95.0, 30.1), 'Miami': (-80.5, 25.6, -80.1, 26.0), 'New Orleans': (-90.3, 29.8, -89.8, 30.1), 'Sacramento': (-121.6, 38.4, -121.3, 38.7), 'Iowa': (-96.7, 40.3, -90.1, 43.6)} # Update me!
+            lst_queries = ["FLD_ZONE = 'AE'", "DFIRM_ID = '48201C'", "FIRM_PAN = '48201C0385L'"] # Update me!
+            for item in dict_fcs:
+                if arcpy.Exists(os.path.join(master_gdb, dict_fcs[item])):
+                    finish_national_layer(os.path.join(master_gdb, dict_fcs[item]), lst_index_fields, dict_extents, lst_queries)
+
+        save_manifest(unzip_name, master_gdb, dict_fcs, None, set_failed) # Saved as NFHL_manifest.json next to the Master GDB
+
+        simplify = False # Update me! True to write simplified copies of the flood hazard areas for small-scale maps
+        if simplify:
+            dict_levels = {'10m': 10, '100m': 100, '1km': 1000} # Update me! Level names and tolerances in meters
+            simplify_national_layer(os.path.join(master_gdb, dict_fcs['S_FLD_HAZ_AR']), dict_levels, workers)
 
     print("\nJob ending!", datetime.datetime.now(), "\n")
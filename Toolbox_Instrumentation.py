@@ -0,0 +1,299 @@
+'''
+Title: Toolbox Instrumentation
+Authors: Caitlin Hartig, Justine Jedlicka
+Date: October 2026
+
+This module records how long each geoprocessing step of a Python toolbox (.pyt) takes, so that the slowest steps of each run can be found and runs can be compared over time.
+For every step it records the wall time, the CPU time, the peak memory used by the process so far, and the number of rows in the step's input and output layers. Messages are still forwarded to arcpy.AddMessage (or print), and are also saved in the run report.
+At the end of a run, a JSON run report and a Chrome trace file are written. The trace file can be opened in chrome://tracing or https://ui.perfetto.dev to see the steps on a timeline.
+
+Usage inside a toolbox:
+    Toolbox_Instrumentation.start_run('HIFLD', arcpy.AddMessage)
+    try:
+        with Toolbox_Instrumentation.stage('Clip', inputs=[roads], outputs=[clipped]):
+            arcpy.analysis.Clip(roads, fs_lands, clipped)
+    finally: # The report of a failed run is still written, and the next run starts clean
+        Toolbox_Instrumentation.finish_run(report_folder)
+
+Libraries Utilized: contextlib, datetime, functools, json, os, sys, time
+'''
+
+import contextlib, datetime, functools, json, os, sys, time
+
+_active_run = None # The run currently being recorded, set by start_run(tool_name, message) and cleared by finish_run(folder)
+
+# '''
+#     Purpose - Function peak_memory_mb() returns the peak memory (resident set size) used by the current process so far, in megabytes, or None if it cannot be read on this operating system.
+#     Inputs - None
+#     Outputs - The peak memory in megabytes Ex) 812.4.
+# '''
+def peak_memory_mb():
+    if sys.platform == 'win32':
+        try:
+            import ctypes
+            from ctypes import wintypes
+
+            class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+                _fields_ = [('cb', wintypes.DWORD), ('PageFaultCount', wintypes.DWORD), ('PeakWorkingSetSize', ctypes.c_size_t), ('WorkingSetSize', ctypes.c_size_t), ('QuotaPeakPagedPoolUsage', ctypes.c_size_t), ('QuotaPagedPoolUsage', ctypes.c_size_t), ('QuotaPeakNonPagedPoolUsage', ctypes.c_size_t), ('QuotaNonPagedPoolUsage', ctypes.c_size_t), ('PagefileUsage', ctypes.c_size_t), ('PeakPagefileUsage', ctypes.c_size_t)]
+
+            counters = PROCESS_MEMORY_COUNTERS()
+            counters.cb = ctypes.sizeof(PROCESS_MEMORY_COUNTERS)
+            ctypes.windll.kernel32.GetCurrentProcess.restype = wintypes.HANDLE
+            if ctypes.windll.psapi.GetProcessMemoryInfo(ctypes.windll.kernel32.GetCurrentProcess(), ctypes.byref(counters), counters.cb):
+                return counters.PeakWorkingSetSize / 1048576
+        except (OSError, AttributeError):
+            pass
+        return None
+
+    try:
+        import resource
+    except ImportError:
+        return None
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == 'darwin': # macOS reports bytes, Linux reports kilobytes
+        return peak / 1048576
+    return peak / 1024
+
+# '''
+#     Purpose - Function count_rows(dataset) returns the number of rows in a feature class / table using arcpy, or None if it cannot be counted (for example, if the dataset does not exist yet, or arcpy is not available).
+#     Inputs - dataset: The file pathway to the feature class / table Ex) r'C:\Users\caitl\OneDrive\Documents\Tools\Master_GDB.gdb\initial_roads'.
+#     Outputs - The number of rows Ex) 1000.
+# '''
+def count_rows(dataset):
+    try:
+        import arcpy
+        return int(arcpy.management.GetCount(dataset)[0])
+    except Exception:
+        return None
+
+# '''
+#     Purpose - Class RunRecorder(tool_name, message, row_counter) holds the timings of every step of one toolbox run.
+#     Inputs - tool_name: The name of the toolbox / tool Ex) 'HIFLD'.
+#              message: The function used to display messages Ex) arcpy.AddMessage.
+#              row_counter: The function used to count the rows of the input and output layers Ex) count_rows.
+# '''
+class RunRecorder(object):
+    def __init__(self, tool_name, message=print, row_counter=count_rows):
+        self.tool_name = tool_name
+        self.message_function = message
+        self.row_counter = row_counter
+        self.started = datetime.datetime.now()
+        self.start_wall = time.perf_counter()
+        self.start_cpu = time.process_time()
+        self.lst_stages = [] # This list holds a dictionary for each finished step, in the order the steps finished
+        self.lst_messages = [] # This list holds (seconds since the start of the run, message) tuples
+        self.depth = 0 # Tracks how many steps are currently open, so that nested steps can be shown indented
+
+    # '''
+    #     Purpose - Method message(text) displays a message with the message function (such as arcpy.AddMessage) and saves it in the run report.
+    # '''
+    def message(self, text):
+        self.lst_messages.append((round(time.perf_counter() - self.start_wall, 3), str(text)))
+        self.message_function(text)
+
+    def _count(self, lst_datasets):
+        dict_counts = {}
+        for dataset in lst_datasets:
+            dict_counts[str(dataset)] = self.row_counter(dataset) if self.row_counter is not None else None
+        return dict_counts
+
+    # '''
+    #     Purpose - Method stage(name, inputs, outputs) is a context manager that times the code inside the with-block as one step.
+    #               The rows in the input layers are counted before the step, and the rows in the output layers are counted after it. Output layers that are only known once the step has finished can be added to the 'outputs' list of the yielded record.
+    #     Inputs - name: The name of the step Ex) 'DeleteIdentical'.
+    #              inputs: A list of file pathways to the input layers Ex) [initial_roads].
+    #              outputs: A list of file pathways to the output layers Ex) [hifld_attributed].
+    #     Outputs - record: A dictionary that will hold the timings of the step once it has finished.
+    # '''
+    @contextlib.contextmanager
+    def stage(self, name, inputs=(), outputs=()):
+        record = {'name': name, 'depth': self.depth, 'inputs': self._count(inputs), 'outputs': list(outputs), 'status': 'running'}
+        start_wall = time.perf_counter()
+        start_cpu = time.process_time()
+        record['start'] = round(start_wall - self.start_wall, 6)
+        self.depth += 1
+
+        try:
+            yield record
+            record['status'] = 'completed'
+        except BaseException as error:
+            record['status'] = 'failed: {0}'.format(error)
+            raise
+        finally:
+            self.depth -= 1
+            record['wall_seconds'] = round(time.perf_counter() - start_wall, 6)
+            record['cpu_seconds'] = round(time.process_time() - start_cpu, 6)
+            record['peak_memory_mb'] = peak_memory_mb()
+            record['outputs'] = self._count(record['outputs'])
+            self.lst_stages.append(record)
+
+            rows_in = sum(count for count in record['inputs'].values() if count is not None)
+            rows_out = sum(count for count in record['outputs'].values() if count is not None)
+            memory = record['peak_memory_mb']
+            self.message('{0}[{1}] {2:.1f} s wall, {3:.1f} s CPU, peak memory {4}, rows in {5}, rows out {6}'.format('  ' * record['depth'], name, record['wall_seconds'], record['cpu_seconds'], '{0:.0f} MB'.format(memory) if memory is not None else 'n/a', rows_in, rows_out))
+
+    # '''
+    #     Purpose - Method report() returns the run report as a dictionary.
+    # '''
+    def report(self):
+        return {'tool': self.tool_name,
+                'started': self.started.isoformat(timespec='seconds'),
+                'wall_seconds': round(time.perf_counter() - self.start_wall, 6),
+                'cpu_seconds': round(time.process_time() - self.start_cpu, 6),
+                'peak_memory_mb': peak_memory_mb(),
+                'stages': sorted(self.lst_stages, key=lambda record: record['start']),
+                'messages': self.lst_messages}
+
+    # '''
+    #     Purpose - Method chrome_trace() returns the steps of the run in the Chrome trace event format (one complete 'X' event per step, with times in microseconds).
+    # '''
+    def chrome_trace(self):
+        lst_events = []
+        pid = os.getpid()
+
+        for record in sorted(self.lst_stages, key=lambda record: record['start']):
+            lst_events.append({'name': record['name'], 'cat': self.tool_name, 'ph': 'X', 'pid': pid, 'tid': 1,
+                               'ts': int(record['start'] * 1e6), 'dur': int(record['wall_seconds'] * 1e6),
+                               'args': {'cpu_seconds': record['cpu_seconds'], 'peak_memory_mb': record['peak_memory_mb'], 'inputs': record['inputs'], 'outputs': record['outputs'], 'status': record['status']}})
+
+        return {'traceEvents': lst_events, 'displayTimeUnit': 'ms'}
+
+    # '''
+    #     Purpose - Method write(folder) writes the JSON run report and the Chrome trace file into a folder, named after the tool and the start time of the run.
+    #     Inputs - folder: The folder pathway to save the files in. It is created if it does not exist Ex) r'C:\Users\caitl\OneDrive\Documents\Tools\RunReports'.
+    #     Outputs - report_path: The file pathway to the run report.
+    #               trace_path: The file pathway to the Chrome trace file.
+    # '''
+    def write(self, folder):
+        if not os.path.exists(folder):
+            os.makedirs(folder)
+
+        name = '{0}_{1}'.format(self.tool_name, self.started.strftime('%Y%m%d_%H%M%S'))
+        report_path = os.path.join(folder, name + '_report.json')
+        trace_path = os.path.join(folder, name + '_trace.json')
+
+        with open(report_path, 'w') as outfile:
+            json.dump(self.report(), outfile, indent=2)
+        with open(trace_path, 'w') as outfile:
+            json.dump(self.chrome_trace(), outfile)
+
+        return report_path, trace_path
+
+# '''
+#     Purpose - Function report_folder(path) returns the RunReports folder that sits next to the geodatabase (or folder / file) holding a dataset, so that every toolbox saves its run reports in a predictable place.
+#     Inputs - path: A file pathway to a geodatabase, a dataset inside it, a folder, or a file Ex) r'C:\Users\caitl\OneDrive\Documents\Tools\Master_GDB.gdb\Streets'.
+#     Outputs - The folder pathway Ex) r'C:\Users\caitl\OneDrive\Documents\Tools\RunReports'.
+# '''
+def report_folder(path):
+    head = path.rstrip('\\/')
+    while head:
+        if head.lower().endswith(('.gdb', '.sde', '.mdb')):
+            return os.path.join(os.path.dirname(head), 'RunReports')
+        parent = os.path.dirname(head)
+        if parent == head:
+            break
+        head = parent
+
+    if os.path.splitext(path)[1] != '': # A file, such as a shapefile or .txt file
+        return os.path.join(os.path.dirname(path), 'RunReports')
+    return os.path.join(path, 'RunReports')
+
+# '''
+#     Purpose - Function start_run(tool_name, message, row_counter) starts recording a new toolbox run. Steps recorded with stage(name, inputs, outputs) or timed_stage(name) are added to this run until finish_run(folder) is called.
+#     Inputs - tool_name: The name of the toolbox / tool Ex) 'HIFLD'.
+#              message: The function used to display messages Ex) arcpy.AddMessage.
+#              row_counter: The function used to count the rows of the input and output layers. The default counts feature classes / tables with arcpy Ex) count_rows.
+#     Outputs - recorder: The RunRecorder for the run.
+# '''
+def start_run(tool_name, message=print, row_counter=count_rows):
+    global _active_run
+    _active_run = RunRecorder(tool_name, message, row_counter)
+    return _active_run
+
+# '''
+#     Purpose - Function finish_run(folder) writes the run report and Chrome trace file for the current run and stops recording.
+#     Inputs - folder: The folder pathway to save the files in Ex) r'C:\Users\caitl\OneDrive\Documents\Tools\RunReports'.
+#     Outputs - report_path, trace_path: The file pathways to the two files, or (None, None) if no run was being recorded.
+# '''
+def finish_run(folder):
+    global _active_run
+    recorder = _active_run
+    _active_run = None
+
+    if recorder is None:
+        return None, None
+
+    report_path, trace_path = recorder.write(folder)
+    recorder.message_function('Run report saved: {0}\nTrace file saved: {1}\n'.format(report_path, trace_path))
+
+    return report_path, trace_path
+
+# '''
+#     Purpose - Function stage(name, inputs, outputs) times one step of the current run (see RunRecorder.stage). If no run has been started, the code inside the with-block simply runs without being recorded.
+# '''
+@contextlib.contextmanager
+def stage(name, inputs=(), outputs=()):
+    if _active_run is None:
+        yield {'name': name, 'outputs': list(outputs)}
+    else:
+        with _active_run.stage(name, inputs, outputs) as record:
+            yield record
+
+# '''
+#     Purpose - Function timed_stage(name) is a decorator that times every call of a function as one step of the current run.
+#     Inputs - name: The name of the step, or None to use the name of the function Ex) 'create_initial_roads'.
+# '''
+def timed_stage(name=None):
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with stage(name or function.__name__):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+# '''
+#     Purpose - Function message(text) displays a message and saves it in the report of the current run. If no run has been started, the message is only printed.
+# '''
+def message(text):
+    if _active_run is None:
+        print(text)
+    else:
+        _active_run.message(text)
+
+# '''
+#     Purpose - Function compare_reports(old_report_path, new_report_path) compares the step timings of two run reports and prints a table of the wall time of each step in both runs.
+#               Steps are matched by name. When a step ran more than once in a run, the times are added together.
+#     Inputs - old_report_path: The file pathway to the older run report.
+#              new_report_path: The file pathway to the newer run report.
+#     Outputs - lst_rows: A list of (step name, old seconds, new seconds) tuples. A time is None if the step only ran in one of the two runs.
+# '''
+def compare_reports(old_report_path, new_report_path):
+    lst_totals = []
+
+    for report_path in [old_report_path, new_report_path]:
+        with open(report_path, 'r') as infile:
+            report = json.load(infile)
+        dict_totals = {}
+        for record in report['stages']:
+            dict_totals[record['name']] = dict_totals.get(record['name'], 0) + record['wall_seconds']
+        lst_totals.append(dict_totals)
+
+    lst_names = list(lst_totals[0]) + [name for name in lst_totals[1] if name not in lst_totals[0]]
+    lst_rows = [(name, lst_totals[0].get(name), lst_totals[1].get(name)) for name in lst_names]
+
+    print('{0:<50} {1:>12} {2:>12} {3:>8}'.format('step', 'old (s)', 'new (s)', 'ratio'))
+    for name, old, new in lst_rows:
+        old_text = '{0:.1f}'.format(old) if old is not None else '-'
+        new_text = '{0:.1f}'.format(new) if new is not None else '-'
+        ratio_text = '{0:.2f}'.format(new / old) if old and new is not None else '-'
+        print('{0:<50} {1:>12} {2:>12} {3:>8}'.format(name[:50], old_text, new_text, ratio_text))
+
+    return lst_rows
+
+if __name__ == '__main__':
+    old_report = r'C:\Users\caitl\OneDrive\Documents\Tools\RunReports\HIFLD_20241201_090000_report.json' # Update me!
+    new_report = r'C:\Users\caitl\OneDrive\Documents\Tools\RunReports\HIFLD_20241215_090000_report.json' # Update me!
+
+    compare_reports(old_report, new_report)